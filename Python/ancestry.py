@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from business_logic import genotype_matrix
+from dosage_encoding import NA_DOSAGE, encode_dosages
+
+# Allele frequencies are kept away from 0 and 1 so one unexpected allele cannot rule a population out
+FREQUENCY_FLOOR = 1e-3
+
+# Samples with fewer called ancestry markers get posteriors but no assigned population
+MIN_MARKERS = 10
+
+BASES = ('A', 'C', 'G', 'T')
+
+
+class AncestryReference:
+    """Counted-allele frequencies of the ancestry-informative markers in each reference population."""
+
+    def __init__(self, markers, alleles, populations, frequencies):
+        self.markers = list(markers)
+        self.alleles = list(alleles)  # (other allele, counted allele) per marker
+        self.populations = list(populations)
+        frequencies = np.clip(np.asarray(frequencies, dtype=np.float64), FREQUENCY_FLOOR, 1 - FREQUENCY_FLOOR)
+
+        # markers x populations log-frequency matrices of the counted and the other allele
+        self.log_counted = np.log(frequencies)
+        self.log_other = np.log1p(-frequencies)
+
+
+def load_reference(path) -> AncestryReference:
+    """Read a reference table with columns marker, other_allele, counted_allele and one frequency column per population.
+
+    A frequency missing for a population is replaced by the marker's mean over the other populations.
+    """
+    try:
+        table = pd.read_csv(path, encoding='utf-8-sig')
+    except Exception as e:
+        raise Exception(f"Failed to read ancestry reference: {str(e)}")
+    required = ['marker', 'other_allele', 'counted_allele']
+    missing = [column for column in required if column not in table.columns]
+    if missing:
+        raise Exception(f"Ancestry reference is missing the columns {', '.join(missing)}.")
+    populations = [column for column in table.columns if column not in required]
+    if not populations:
+        raise Exception("Ancestry reference has no population frequency columns.")
+
+    table = table.drop_duplicates('marker')
+    frequencies = table[populations].apply(pd.to_numeric, errors='coerce')
+    frequencies = frequencies.T.fillna(frequencies.mean(axis=1)).T.fillna(0.5)
+    alleles = list(zip(table['other_allele'].astype(str).str.upper(), table['counted_allele'].astype(str).str.upper()))
+    invalid = [marker for marker, (other, counted) in zip(table['marker'], alleles)
+               if other == counted or other not in BASES or counted not in BASES]
+    if invalid:
+        raise Exception(f"Ancestry reference markers need two different single-base alleles: {', '.join(map(str, invalid))}.")
+    return AncestryReference(table['marker'], alleles, populations, frequencies.to_numpy())
+
+
+def ancestry_log_likelihoods(dosages: np.ndarray, reference: AncestryReference) -> np.ndarray:
+    """Return samples x populations log-likelihoods of counted-allele dosages under Hardy-Weinberg.
+
+    Missing dosages add nothing to any population, which marginalizes them out. The binomial
+    coefficient is the same for every population and is left out.
+    """
+    called = dosages != NA_DOSAGE
+    counted = np.where(called, dosages, 0).astype(np.float64)
+    other = np.where(called, 2 - dosages, 0).astype(np.float64)
+    return counted @ reference.log_counted + other @ reference.log_other
+
+
+def posteriors(log_likelihoods: np.ndarray, prior=None) -> np.ndarray:
+    """Normalize log-likelihoods into posterior probabilities; the prior defaults to uniform."""
+    if prior is not None:
+        log_likelihoods = log_likelihoods + np.log(np.asarray(prior, dtype=np.float64))
+    shifted = np.exp(log_likelihoods - log_likelihoods.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+def infer_ancestry(data, reference: AncestryReference, samples=None, edits=None, genotype_codes=None, prior=None) -> pd.DataFrame:
+    """Classify every sample in one batch: posterior per population, best population and markers used."""
+    if samples is None:
+        samples = data['SampleName'].unique()
+    codes = genotype_matrix(data, samples, reference.markers, edits, genotype_codes)
+    dosages = encode_dosages(codes, reference.alleles)
+    probabilities = posteriors(ancestry_log_likelihoods(dosages, reference), prior)
+
+    result = pd.DataFrame(probabilities, columns=reference.populations)
+    markers_used = (dosages != NA_DOSAGE).sum(axis=1)
+    best = np.array(reference.populations, dtype=object)[probabilities.argmax(axis=1)]
+    result.insert(0, 'sampleid', list(samples))
+    result.insert(1, 'markers_used', markers_used)
+    result.insert(2, 'best_population', np.where(markers_used >= MIN_MARKERS, best, ""))
+    return result
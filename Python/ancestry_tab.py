@@ -1,15 +1,110 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
+import os
+from datetime import datetime
+from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QPushButton, QFileDialog, QMessageBox, QTableView
+from ancestry import load_reference
+from config import ANCESTRY_REFERENCE_FILE
+from log_console import LogConsole
+from table_model import DataFrameModel
+from threads import InferAncestryThread
 
 class AncestryTab(QWidget):
-    def __init__(self):
+    def __init__(self, prepare_files_tab):
         super().__init__()
+        self.prepare_files_tab = prepare_files_tab  # Source of the loaded run and its genotype edits
+        self.reference = None  # Reference allele frequencies per population
+        self.result = None  # Posteriors of the last classified run
+        self.ancestry_thread = None
         self.init_ui()
 
+        # Use the configured reference table when it is there
+        if os.path.exists(ANCESTRY_REFERENCE_FILE):
+            self.set_reference(ANCESTRY_REFERENCE_FILE)
+        else:
+            self.display_message(f"Ancestry reference {ANCESTRY_REFERENCE_FILE} not found; use Load Reference to choose one.")
+
     def init_ui(self):
-        layout = QVBoxLayout()
+        layout = QGridLayout()
+
+        self.reference_label = QLabel("Reference: none loaded")
+        layout.addWidget(self.reference_label, 0, 0, 1, 2)
+
+        self.reference_button = QPushButton("Load Reference")
+        self.reference_button.clicked.connect(self.on_load_reference)
+        layout.addWidget(self.reference_button, 0, 2)
+
+        # Classify every sample of the run loaded in the Prepare Files tab
+        self.classify_button = QPushButton("Classify All Samples")
+        self.classify_button.clicked.connect(self.on_classify)
+        layout.addWidget(self.classify_button, 1, 0)
 
-        # Placeholder ancestry analysis UI
-        ancestry_label = QLabel("Ancestry Analysis - Under Construction")
-        layout.addWidget(ancestry_label)
+        self.export_button = QPushButton("Export Posteriors")
+        self.export_button.clicked.connect(self.on_export)
+        layout.addWidget(self.export_button, 1, 1)
+
+        # Posterior probability per sample and population
+        self.posterior_model = DataFrameModel(float_format="{:.4f}")
+        self.posterior_table = QTableView()
+        self.posterior_table.setModel(self.posterior_model)
+        self.posterior_table.setSortingEnabled(True)
+        self.posterior_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.posterior_table, 2, 0, 1, 3)
+
+        self.text_output_ancestry = LogConsole(max_lines=1000)
+        layout.addWidget(self.text_output_ancestry, 3, 0, 1, 3)
 
         self.setLayout(layout)
+
+    def set_reference(self, path):
+        try:
+            self.reference = load_reference(path)
+        except Exception as e:
+            self.on_error(str(e))
+            return
+        self.reference_label.setText(f"Reference: {os.path.basename(path)} ({len(self.reference.markers)} markers, {len(self.reference.populations)} populations)")
+        self.display_message(f"Loaded ancestry reference {path}.")
+
+    def on_load_reference(self):
+        filepath, _ = QFileDialog.getOpenFileName(self, "Open Reference", "", "CSV Files (*.csv);;All Files (*)")
+        if filepath:
+            self.set_reference(filepath)
+
+    def on_classify(self):
+        store = self.prepare_files_tab.store
+        if store is None:
+            QMessageBox.critical(self, "Error", "Load a run in the Prepare Files tab first.")
+            return
+        if self.reference is None:
+            QMessageBox.critical(self, "Error", "Load an ancestry reference first.")
+            return
+        if self.ancestry_thread is not None and self.ancestry_thread.isRunning():
+            self.display_message("Classification is already running.")
+            return
+
+        self.classify_button.setEnabled(False)
+        edits = self.prepare_files_tab.modified_genotypes.as_dict()
+        self.ancestry_thread = InferAncestryThread(store, self.reference, edits)
+        self.ancestry_thread.ancestry_inferred.connect(self.on_ancestry_inferred)
+        self.ancestry_thread.error_occurred.connect(self.on_error)
+        self.ancestry_thread.finished.connect(lambda: self.classify_button.setEnabled(True))
+        self.ancestry_thread.start()
+
+    def on_ancestry_inferred(self, result):
+        self.result = result
+        self.posterior_model.set_data(result)
+        unassigned = (result['best_population'] == "").sum()
+        self.display_message(f"Classified {len(result)} samples; {unassigned} had too few called markers to assign a population.")
+
+    def on_export(self):
+        if self.result is None:
+            QMessageBox.critical(self, "Error", "No classification to export.")
+            return
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = f"ancestry_posteriors_{timestamp}.csv"
+        self.result.to_csv(path, index=False)
+        self.display_message(f"Ancestry posteriors saved to {path}.")
+
+    def on_error(self, error_msg: str):
+        self.display_message(f"Error: {error_msg}")
+
+    def display_message(self, message: str):
+        self.text_output_ancestry.log(message)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from business_logic import APPEARANCE_HEADER, appearance_dosages
+from dosage_encoding import NA_DOSAGE
+
+# Traits missing more of their model SNPs than this are not predicted
+MAX_MISSING_SNPS = 3
+
+
+class AppearanceModel:
+    """Multinomial logistic models of the appearance traits over the appearance input columns.
+
+    All traits are stacked into one columns x categories coefficient matrix, so scoring a run is
+    a single matrix product followed by a softmax over each trait's block of categories.
+    """
+
+    def __init__(self, coefficients: pd.DataFrame):
+        columns = APPEARANCE_HEADER[1:]
+        self.traits = list(dict.fromkeys(coefficients['trait']))
+        self.categories = []  # (trait, category) per stacked column
+        intercepts, betas, self.blocks = [], [], {}
+        for trait in self.traits:
+            trait_rows = coefficients[coefficients['trait'] == trait]
+            start = len(self.categories)
+            for category in dict.fromkeys(trait_rows['category']):
+                terms = trait_rows[trait_rows['category'] == category].set_index('term')['coefficient']
+                unknown = sorted(set(terms.index) - set(columns) - {'intercept'})
+                if unknown:
+                    raise Exception(f"Appearance model terms not in the appearance input: {', '.join(unknown)}.")
+                self.categories.append((trait, category))
+                intercepts.append(terms.get('intercept', 0.0))
+                betas.append(terms.reindex(columns, fill_value=0.0).to_numpy(dtype=np.float64))
+            self.blocks[trait] = slice(start, len(self.categories))
+        self.intercepts = np.asarray(intercepts, dtype=np.float64)
+        self.betas = np.column_stack(betas) if betas else np.zeros((len(columns), 0))
+
+        # Which SNPs each trait's model uses, to count the missing ones per sample
+        self.uses = np.column_stack([np.abs(self.betas[:, block]).sum(axis=1) > 0 for block in self.blocks.values()])
+
+
+def load_model(path) -> AppearanceModel:
+    """Read model coefficients with columns trait, category, term and coefficient.
+
+    term is 'intercept' or an appearance input column such as rs12913832_T; a category without
+    rows for a term has a zero coefficient, so the reference category only needs an intercept of 0.
+    """
+    try:
+        coefficients = pd.read_csv(path, encoding='utf-8-sig')
+    except Exception as e:
+        raise Exception(f"Failed to read appearance model: {str(e)}")
+    missing = [column for column in ('trait', 'category', 'term', 'coefficient') if column not in coefficients.columns]
+    if missing:
+        raise Exception(f"Appearance model is missing the columns {', '.join(missing)}.")
+    return AppearanceModel(coefficients)
+
+
+def read_appearance_input(path):
+    """Return the sample ids and the dosage matrix of an appearance input CSV; anything but 0/1/2 is NA."""
+    table = pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    values = table.reindex(columns=APPEARANCE_HEADER[1:], fill_value='NA').to_numpy()
+    dosages = np.full(values.shape, NA_DOSAGE, dtype=np.int8)
+    for dosage in (0, 1, 2):
+        dosages[values == str(dosage)] = dosage
+    return table['sampleid'].tolist(), dosages
+
+
+def predict_dosages(samples, dosages: np.ndarray, model: AppearanceModel) -> pd.DataFrame:
+    """Score a samples x appearance columns dosage matrix.
+
+    A missing SNP is scored as dosage 0, no copy of its allele. That imputes a homozygote, so
+    the missing SNPs of each trait are counted, and a trait missing more than MAX_MISSING_SNPS
+    of its SNPs is left unpredicted: its probabilities are NaN, its prediction NA and its
+    reliable column False.
+    """
+    missing = dosages == NA_DOSAGE
+    x = np.where(missing, 0, dosages).astype(np.float64)
+    logits = x @ model.betas + model.intercepts
+    missing_per_trait = missing.astype(np.int32) @ model.uses.astype(np.int32)
+
+    result = pd.DataFrame({'sampleid': list(samples)})
+    for t, (trait, block) in enumerate(model.blocks.items()):
+        reliable = missing_per_trait[:, t] <= MAX_MISSING_SNPS
+        trait_logits = logits[:, block]
+        probabilities = np.exp(trait_logits - trait_logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        probabilities[~reliable] = np.nan
+        categories = [category for _, category in model.categories[block]]
+        for i, category in enumerate(categories):
+            result[f"{trait}_{category}"] = probabilities[:, i]
+        prediction = np.array(categories, dtype=object)[np.nan_to_num(probabilities, nan=0.0).argmax(axis=1)]
+        result[f"{trait}_prediction"] = np.where(reliable, prediction, 'NA')
+        result[f"{trait}_missing_snps"] = missing_per_trait[:, t]
+        result[f"{trait}_reliable"] = reliable
+    return result
+
+
+def predict_appearance(data, model: AppearanceModel, samples=None, edits=None, genotype_codes=None) -> pd.DataFrame:
+    """Predict the appearance traits of every sample of a run in one batch."""
+    if samples is None:
+        samples = data['SampleName'].unique()
+    return predict_dosages(samples, appearance_dosages(data, samples, edits, genotype_codes), model)
@@ -1,15 +1,132 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
+import os
+from datetime import datetime
+import pandas as pd
+from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QPushButton, QFileDialog, QMessageBox, QTableView
+from appearance import load_model, predict_dosages, read_appearance_input
+from config import APPEARANCE_MODEL_FILE
+from log_console import LogConsole
+from table_model import DataFrameModel
+from threads import PredictAppearanceThread
 
 class AppearanceTab(QWidget):
-    def __init__(self):
+    def __init__(self, prepare_files_tab):
         super().__init__()
+        self.prepare_files_tab = prepare_files_tab  # Source of the loaded run and its genotype edits
+        self.model = None  # Trait model coefficients
+        self.result = None  # Predictions shown in the table
+        self.appearance_thread = None
         self.init_ui()
 
+        # Use the configured model when it is there
+        if os.path.exists(APPEARANCE_MODEL_FILE):
+            self.set_model(APPEARANCE_MODEL_FILE)
+        else:
+            self.display_message(f"Appearance model {APPEARANCE_MODEL_FILE} not found; use Load Model to choose one.")
+
     def init_ui(self):
-        layout = QVBoxLayout()
+        layout = QGridLayout()
+
+        self.model_label = QLabel("Model: none loaded")
+        layout.addWidget(self.model_label, 0, 0, 1, 2)
+
+        self.model_button = QPushButton("Load Model")
+        self.model_button.clicked.connect(self.on_load_model)
+        layout.addWidget(self.model_button, 0, 2)
+
+        # Predict every sample of the run loaded in the Prepare Files tab
+        self.predict_button = QPushButton("Predict All Samples")
+        self.predict_button.clicked.connect(self.on_predict)
+        layout.addWidget(self.predict_button, 1, 0)
+
+        # Score appearance input files written earlier
+        self.score_file_button = QPushButton("Predict From Input Files")
+        self.score_file_button.clicked.connect(self.on_predict_files)
+        layout.addWidget(self.score_file_button, 1, 1)
+
+        self.export_button = QPushButton("Export Predictions")
+        self.export_button.clicked.connect(self.on_export)
+        layout.addWidget(self.export_button, 1, 2)
+
+        self.prediction_model = DataFrameModel(float_format="{:.3f}")
+        self.prediction_table = QTableView()
+        self.prediction_table.setModel(self.prediction_model)
+        self.prediction_table.setSortingEnabled(True)
+        layout.addWidget(self.prediction_table, 2, 0, 1, 3)
+
+        self.text_output_appearance = LogConsole(max_lines=1000)
+        layout.addWidget(self.text_output_appearance, 3, 0, 1, 3)
+
+        self.setLayout(layout)
+
+    def set_model(self, path):
+        try:
+            self.model = load_model(path)
+        except Exception as e:
+            self.on_error(str(e))
+            return
+        self.model_label.setText(f"Model: {os.path.basename(path)} ({', '.join(self.model.traits)})")
+        self.display_message(f"Loaded appearance model {path}.")
+
+    def on_load_model(self):
+        filepath, _ = QFileDialog.getOpenFileName(self, "Open Model", "", "CSV Files (*.csv);;All Files (*)")
+        if filepath:
+            self.set_model(filepath)
+
+    def on_predict(self):
+        store = self.prepare_files_tab.store
+        if store is None:
+            QMessageBox.critical(self, "Error", "Load a run in the Prepare Files tab first.")
+            return
+        if self.model is None:
+            QMessageBox.critical(self, "Error", "Load an appearance model first.")
+            return
+        if self.appearance_thread is not None and self.appearance_thread.isRunning():
+            self.display_message("Prediction is already running.")
+            return
+
+        self.predict_button.setEnabled(False)
+        edits = self.prepare_files_tab.modified_genotypes.as_dict()
+        self.appearance_thread = PredictAppearanceThread(store, self.model, edits)
+        self.appearance_thread.appearance_predicted.connect(self.on_appearance_predicted)
+        self.appearance_thread.error_occurred.connect(self.on_error)
+        self.appearance_thread.finished.connect(lambda: self.predict_button.setEnabled(True))
+        self.appearance_thread.start()
+
+    def on_predict_files(self):
+        if self.model is None:
+            QMessageBox.critical(self, "Error", "Load an appearance model first.")
+            return
+        filepaths, _ = QFileDialog.getOpenFileNames(self, "Open Appearance Input Files", "", "CSV Files (*.csv);;All Files (*)")
+        if not filepaths:
+            return
+        results = []
+        for filepath in filepaths:
+            try:
+                samples, dosages = read_appearance_input(filepath)
+            except Exception as e:
+                self.on_error(f"{filepath}: {str(e)}")
+                continue
+            results.append(predict_dosages(samples, dosages, self.model))
+        if results:
+            self.on_appearance_predicted(pd.concat(results, ignore_index=True))
+
+    def on_appearance_predicted(self, result):
+        self.result = result
+        self.prediction_model.set_data(result)
+        reliable = result[[column for column in result.columns if column.endswith("_reliable")]]
+        self.display_message(f"Predicted {len(result)} samples; {(~reliable.all(axis=1)).sum()} have a trait left unpredicted for too many missing SNPs.")
+
+    def on_export(self):
+        if self.result is None:
+            QMessageBox.critical(self, "Error", "No predictions to export.")
+            return
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = f"appearance_predictions_{timestamp}.csv"
+        self.result.to_csv(path, index=False)
+        self.display_message(f"Appearance predictions saved to {path}.")
 
-        # Placeholder appearance analysis UI
-        appearance_label = QLabel("Appearance Analysis - Under Construction")
-        layout.addWidget(appearance_label)
+    def on_error(self, error_msg: str):
+        self.display_message(f"Error: {error_msg}")
 
-        self.setLayout(layout)
\ No newline at end of file
+    def display_message(self, message: str):
+        self.text_output_appearance.log(message)
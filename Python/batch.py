@@ -0,0 +1,86 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import DATA_DIRECTORY, DATA_DIRECTORY_INPUT
+from business_logic import load_data, create_appearance_input, qc_summary
+from dosage_encoding import encode_genotypes
+from ancestry import infer_ancestry, load_reference
+from appearance import load_model, predict_appearance
+
+
+def output_name(run_name, sample):
+    """Return a file name prefix that keeps samples of different runs apart."""
+    return f"{run_name}_{sample}".replace(os.sep, "_")
+
+
+def process_report(filepath, output_directory, reference_path=None, model_path=None):
+    """Write the appearance input and QC summary for every sample of one run report.
+
+    With an ancestry reference or an appearance model, the posteriors or trait predictions of all
+    samples are also written to one file per run.
+    """
+    start = time.perf_counter()
+    data = load_data(filepath)
+    genotype_codes = encode_genotypes(data['Genotype'])
+    appearance = create_appearance_input(data, genotype_codes=genotype_codes)
+    qc = qc_summary(data, genotype_codes).set_index('SampleName', drop=False)
+
+    run_name = os.path.splitext(os.path.basename(filepath))[0]
+    for i, sample in enumerate(appearance['sampleid']):
+        prefix = os.path.join(output_directory, output_name(run_name, sample))
+        appearance.iloc[[i]].to_csv(f"{prefix}_appearance_input.csv", index=False)
+        qc.loc[[sample]].to_csv(f"{prefix}_qc_summary.csv", index=False)
+
+    if reference_path is not None:
+        ancestry = infer_ancestry(data, load_reference(reference_path), appearance['sampleid'], genotype_codes=genotype_codes)
+        ancestry.to_csv(os.path.join(output_directory, f"{run_name}_ancestry_posteriors.csv"), index=False)
+    if model_path is not None:
+        predictions = predict_appearance(data, load_model(model_path), appearance['sampleid'], genotype_codes=genotype_codes)
+        predictions.to_csv(os.path.join(output_directory, f"{run_name}_appearance_predictions.csv"), index=False)
+
+    return filepath, len(appearance), len(data), time.perf_counter() - start
+
+
+def process_directory(directory=DATA_DIRECTORY, output_directory=DATA_DIRECTORY_INPUT, workers=None, reference_path=None, model_path=None):
+    """Process every CSV report in a directory in a process pool and print timings."""
+    filepaths = sorted(glob.glob(os.path.join(directory, "*.csv")))
+    if not filepaths:
+        print(f"No run reports found in {directory}.")
+        return []
+    os.makedirs(output_directory, exist_ok=True)
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_report, filepath, output_directory, reference_path, model_path): filepath for filepath in filepaths}
+        for future in as_completed(futures):
+            try:
+                filepath, n_samples, n_rows, seconds = future.result()
+            except Exception as e:
+                print(f"Error: {futures[future]}: {str(e)}")
+                continue
+            results.append((filepath, n_samples, n_rows, seconds))
+            print(f"{os.path.basename(filepath)}: {n_samples} samples, {n_rows} rows in {seconds:.2f} s")
+    elapsed = time.perf_counter() - start
+
+    total_samples = sum(result[1] for result in results)
+    print(f"Processed {len(results)}/{len(filepaths)} reports, {total_samples} samples in {elapsed:.2f} s "
+          f"({total_samples / elapsed:.1f} samples/sec).")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create appearance input and QC summary files for every run report in a directory.")
+    parser.add_argument("directory", nargs="?", default=DATA_DIRECTORY, help="directory with run report CSV files")
+    parser.add_argument("--output", default=DATA_DIRECTORY_INPUT, help="directory for the derived files")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--ancestry-reference", default=None, help="reference allele frequency table; also write ancestry posteriors")
+    parser.add_argument("--appearance-model", default=None, help="appearance model coefficients; also write trait predictions")
+    args = parser.parse_args()
+    process_directory(args.directory, args.output, args.workers, args.ancestry_reference, args.appearance_model)
+
+
+if __name__ == "__main__":
+    main()
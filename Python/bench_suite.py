@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # The tab runs without a display
+
+from PyQt5.QtWidgets import QApplication
+from business_logic import csv_engine, load_data
+from genotype_store import GenotypeStore
+from perf import resident_bytes
+from synthetic_report import write_synthetic_report
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)  # Report rows
+N_MARKERS = 153  # Markers per sample, like Raw_Data/raw_data_test.csv
+DUPLICATE_FRACTION = 0.01
+# The committed baseline comes from "python bench_suite.py --sizes 1000 10000 100000 1000000 --repeat 3
+# --save-baseline". 10M rows needs more memory than the 6 GB machine it was recorded on. Timings depend
+# on the machine, so regenerate it with the same command on the machine you compare on; sizes missing
+# from the baseline are measured but not compared.
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+TOLERANCE = 0.25  # A benchmark regresses when it is this much slower than the baseline
+SHORT_TOLERANCE = 0.5  # Allowed slowdown of benchmarks under SHORT_SECONDS, which scheduling and disk caches sway more
+SHORT_SECONDS = 1.0
+MIN_SLOWDOWN = 0.05  # Seconds; smaller differences are noise
+RSS_INTERVAL = 0.005  # Seconds between resident set size samples
+
+
+class PeakRSS:
+    """Sample the resident set size in a thread to find its peak growth over a block of code.
+
+    tracemalloc only sees allocations made through Python, not native buffers such as pyarrow's,
+    so the CSV parser and the Feather cache need this to show their real footprint.
+    """
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.start = self.peak = None
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.start = self.peak = resident_bytes()
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, resident_bytes())
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, resident_bytes())
+        return False
+
+    @property
+    def growth_mb(self):
+        return None if self.start is None else (self.peak - self.start) / 1e6
+
+
+def measure(func, repeat=1):
+    """Return the median seconds of func(), its peak traced memory and its peak RSS growth in MB.
+
+    Tracing slows allocation-heavy code down, so traced memory is taken from one extra run. RSS is
+    sampled during the first timed run; it includes native allocations tracemalloc misses, but
+    memory the process already holds is reused, so it can read lower than the traced peak.
+    """
+    timings = []
+    rss = PeakRSS()
+    for i in range(repeat):
+        start = time.perf_counter()
+        if i == 0:
+            with rss:
+                func()
+        else:
+            func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return float(np.median(timings)), peak / 1e6, rss.growth_mb
+
+
+def prepare_files_tab(store):
+    """Return a Prepare Files tab with the store loaded, as after Load Data."""
+    from prepare_files_tab import PrepareFilesTab
+    from threads import LoadDataThread
+    tab = PrepareFilesTab()
+    tab.load_thread = LoadDataThread([], tab.dataset)  # on_data_loaded reports whether the load hit the cache
+    tab.on_data_loaded(store)
+    return tab
+
+
+def bench_size(app, n_rows, directory, repeat):
+    """Run every hot path on a synthetic report of about n_rows rows."""
+    n_samples = max(1, round(n_rows / N_MARKERS / (1 + DUPLICATE_FRACTION)))
+    path = os.path.join(directory, f"report_{n_rows}.csv")
+    if not os.path.exists(path):
+        write_synthetic_report(path, n_samples, N_MARKERS, DUPLICATE_FRACTION)
+
+    results = {}
+    store = None
+
+    def load():
+        nonlocal store
+        store = GenotypeStore(load_data(path, columns=None))
+    results['csv_load'] = measure(load, repeat)
+    # Each parser on its own, where installed
+    for engine in ('pandas', 'arrow'):
+        if csv_engine(engine) == engine:
+            results[f'csv_load_{engine}'] = measure(lambda: load_data(path, columns=None, engine=engine), repeat)
+    tab = prepare_files_tab(store)
+    samples = store.samples()[:20]
+
+    def switch():
+        for sample in samples:
+            tab.populate_genotype_fields(sample)
+    start = time.perf_counter()
+    switch()  # First visits build the per-sample views
+    results['sample_switch_cold'] = (time.perf_counter() - start, None, None)
+    results['sample_switch_warm'] = measure(switch, repeat)
+
+    tab.sample_dropdown.setCurrentIndex(0)
+    results['create_analysis_input_file'] = measure(lambda: tab.create_analysis_input_file(None), repeat)
+    results['list_markers_by_maf'] = measure(tab.list_markers_by_maf, repeat)
+
+    def analyze():
+        tab.on_analyze_data()
+        tab.thread_pool.waitForDone()
+        app.processEvents()
+    results['analysis_job'] = measure(analyze, repeat)
+
+    # One edit so the writer merges an edited chunk
+    marker = tab.markers_of_interest[0]
+    tab.genotype_entries[marker].setText("NN")
+    tab.on_genotype_change(marker)
+
+    def save():
+        tab.save_to_csv()
+        tab.save_thread.wait()
+        app.processEvents()
+    results['save_to_csv'] = measure(save, repeat)
+
+    rows = len(store.data)
+    tab.deleteLater()
+    app.processEvents()
+    return [{'rows': rows, 'benchmark': name, 'seconds': seconds, 'peak_mb': peak_mb, 'peak_rss_mb': peak_rss_mb}
+            for name, (seconds, peak_mb, peak_rss_mb) in results.items()]
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Return the results slower than the same benchmark at the same size in the baseline."""
+    previous = {(entry['benchmark'], entry['size']): entry for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry['benchmark'], entry['size']))
+        if before is None:
+            continue
+        slowdown = entry['seconds'] - before['seconds']
+        allowed = max(tolerance, SHORT_TOLERANCE) if before['seconds'] < SHORT_SECONDS else tolerance
+        if slowdown > before['seconds'] * allowed and slowdown > MIN_SLOWDOWN:
+            regressions.append((entry, before))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile the hot paths on synthetic run reports.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="report sizes in rows")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the median is reported")
+    parser.add_argument("--output", default=None, help="JSON results file (default: bench_results_<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help=f"allowed slowdown before flagging, e.g. 0.25; at least {SHORT_TOLERANCE} under {SHORT_SECONDS:g} s")
+    parser.add_argument("--data-directory", default=None, help="keep the generated reports here for later runs")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.abspath(args.data_directory) if args.data_directory else tmp
+        os.makedirs(directory, exist_ok=True)
+        # The tab writes its output files to the working directory
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for size in args.sizes:
+                for entry in bench_size(app, size, directory, args.repeat):
+                    entry['size'] = size
+                    results.append(entry)
+                    peak = "" if entry['peak_mb'] is None else f"{entry['peak_mb']:.1f} MB"
+                    rss = "" if entry['peak_rss_mb'] is None else f"{entry['peak_rss_mb']:.1f} MB RSS"
+                    print(f"{size:>10} {entry['benchmark']:>28} {entry['seconds'] * 1000:>10.1f} ms {peak:>12} {rss:>16}")
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    output = args.output or f"bench_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"Results saved to {output}.")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; store one with --save-baseline.")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for entry, before in regressions:
+        print(f"REGRESSION {entry['benchmark']} at {entry['size']} rows: "
+              f"{entry['seconds'] * 1000:.1f} ms vs {before['seconds'] * 1000:.1f} ms in the baseline")
+    if not regressions:
+        print("No regressions against the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from genotype_store import GenotypeStore
+from business_logic import APPEARANCE_HEADER, create_appearance_input, load_data, report_dtypes
+from report_cache import ReportCache
+from sample_cache import SampleCache
+from ancestry import AncestryReference, infer_ancestry
+from appearance import AppearanceModel, predict_dosages
+from packed_genotypes import PackedGenotypeMatrix
+from qc_metrics import QCMetrics
+from concordance import sample_concordance
+from report_merge import concat_reports
+from synthetic_report import generate_samples, panel
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Raw_Data", "raw_data_test.csv")
+
+
+def make_run(n_samples, n_markers, marker_names=()):
+    """Build a synthetic run report with one row per (sample, marker)."""
+    marker_names = list(marker_names) + [f"rs{i}" for i in range(n_markers - len(marker_names))]
+    samples = np.repeat([f"sample_{i:05d}" for i in range(n_samples)], n_markers)
+    markers = np.tile(marker_names, n_samples)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'SampleName': samples,
+        'Target ID': markers,
+        'Genotype': rng.choice(['AA', 'AC', 'AG', 'AT', 'CC', 'CG', 'CT', 'GG', 'GT', 'TT', 'NN'], size=len(samples)),
+        'Maj Allele Freq': rng.uniform(50, 100, size=len(samples)),
+    })
+
+
+def time_per_call(func, repeat):
+    """Return the mean duration of func() in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench_genotype_store(sample_counts=(96, 384, 1536, 6144), n_markers=450, repeat=200):
+    """Compare store lookups with boolean-mask scans as the sample count grows."""
+    print(f"{'samples':>8} {'rows':>10} {'mask scan us':>14} {'store get us':>14} {'store slice us':>16}")
+    for n_samples in sample_counts:
+        data = make_run(n_samples, n_markers)
+        store = GenotypeStore(data)
+        sample, marker = f"sample_{n_samples // 2:05d}", f"rs{n_markers // 2}"
+
+        def mask_scan():
+            rows = data[(data['SampleName'] == sample) & (data['Target ID'] == marker)]
+            return rows.iloc[0]['Genotype']
+
+        scan_us = time_per_call(mask_scan, max(repeat // 20, 1))
+        get_us = time_per_call(lambda: store.get(sample, marker, 'Genotype'), repeat)
+        slice_us = time_per_call(lambda: store.sample_data(sample), repeat)
+        print(f"{n_samples:>8} {len(data):>10} {scan_us:>14.1f} {get_us:>14.1f} {slice_us:>16.1f}")
+
+
+def bench_appearance_export(sample_counts=(96, 384, 1536), n_markers=450):
+    """Time the batch appearance export over every sample of a run."""
+    panel = [column.split('_')[0] for column in APPEARANCE_HEADER[1:]]
+    print(f"{'samples':>8} {'rows':>10} {'export ms':>10}")
+    for n_samples in sample_counts:
+        data = make_run(n_samples, n_markers, panel)
+        export_us = time_per_call(lambda: create_appearance_input(data), 3)
+        print(f"{n_samples:>8} {len(data):>10} {export_us / 1000:>10.1f}")
+
+
+def memory_mb(data):
+    """Return the deep in-memory size of a DataFrame in MB."""
+    return data.memory_usage(deep=True).sum() / 1e6
+
+
+def bench_load_memory(path=REPORT_PATH, copies=(1, 100, 1000)):
+    """Compare the memory footprint of untyped, typed and column-pruned loads of a run report."""
+    report = pd.read_csv(path)
+    print(f"{'rows':>10} {'untyped MB':>11} {'typed MB':>9} {'pruned MB':>10} {'reduction':>10}")
+    for n_copies in copies:
+        # Replicate the report with distinct sample names to get a merged multi-chip run
+        merged = pd.concat(
+            [report.assign(SampleName=report['SampleName'] + f"_{i}") for i in range(n_copies)],
+            ignore_index=True,
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            merged_path = os.path.join(tmp, "merged.csv")
+            merged.to_csv(merged_path, index=False, encoding='utf-8-sig')
+            untyped = memory_mb(pd.read_csv(merged_path))
+            typed = memory_mb(load_data(merged_path, columns=None))
+            pruned = memory_mb(load_data(merged_path))
+        print(f"{len(merged):>10} {untyped:>11.2f} {typed:>9.2f} {pruned:>10.2f} {untyped / pruned:>9.1f}x")
+
+
+def bench_report_cache(path=REPORT_PATH, copies=1000):
+    """Time a first (parsing) and a repeated (cached) load of a merged run report."""
+    report = pd.read_csv(path)
+    merged = pd.concat(
+        [report.assign(SampleName=report['SampleName'] + f"_{i}") for i in range(copies)],
+        ignore_index=True,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        merged_path = os.path.join(tmp, "merged.csv")
+        merged.to_csv(merged_path, index=False, encoding='utf-8-sig')
+        cache = ReportCache(os.path.join(tmp, "cache"))
+        print(f"{'rows':>10} {'first load ms':>14} {'cached load ms':>15}")
+        first_us = time_per_call(lambda: cache.load(merged_path), 1)
+        cached_us = time_per_call(lambda: cache.load(merged_path), 5)
+        print(f"{len(merged):>10} {first_us / 1000:>14.1f} {cached_us / 1000:>15.1f}")
+
+
+def bench_sample_cache(path=REPORT_PATH, copies=1000, switches=200):
+    """Time switching between two samples of a merged run, building views versus reusing cached ones."""
+    report = pd.read_csv(path, encoding='utf-8-sig')
+    merged = pd.concat(
+        [report.assign(SampleName=report['SampleName'] + f"_{i}") for i in range(copies)],
+        ignore_index=True,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        merged_path = os.path.join(tmp, "merged.csv")
+        merged.to_csv(merged_path, index=False)
+        store = GenotypeStore(load_data(merged_path, columns=None))
+    markers = ["rs312262906", "rs2196051", "rs1495085", "rs2789823", "rs7148809", "rs310644"]
+    samples = store.samples()[:2]
+    cache = SampleCache(store, markers)
+    for sample in samples:
+        cache.get(sample)
+    print(f"{'rows':>10} {'build view us':>14} {'cached view us':>15}")
+    build_us = time_per_call(lambda: SampleCache(store, markers).get(samples[0]), 20)
+    cached_us = time_per_call(lambda: [cache.get(sample) for sample in samples], switches) / 2
+    print(f"{len(store.data):>10} {build_us:>14.1f} {cached_us:>15.1f}")
+
+
+def bench_ancestry(sample_counts=(96, 1536, 24576), n_markers=150, n_populations=5):
+    """Time classifying every sample of a run in one batch against a random reference."""
+    rng = np.random.default_rng(0)
+    print(f"{'samples':>8} {'rows':>10} {'classify ms':>12} {'samples/sec':>12}")
+    for n_samples in sample_counts:
+        data = make_run(n_samples, n_markers)
+        markers = data['Target ID'].iloc[:n_markers]
+        reference = AncestryReference(markers, [('A', 'G')] * n_markers, [f"pop{i}" for i in range(n_populations)],
+                                      rng.uniform(0, 1, (n_markers, n_populations)))
+        store = GenotypeStore(data)
+        us = time_per_call(lambda: infer_ancestry(data, reference, store.samples(), genotype_codes=store.genotype_codes), 3)
+        print(f"{n_samples:>8} {len(data):>10} {us / 1000:>12.1f} {n_samples / (us / 1e6):>12.0f}")
+
+
+def bench_appearance_prediction(sample_counts=(1000, 10000, 100000)):
+    """Time scoring a dosage matrix with a random three-trait model."""
+    rng = np.random.default_rng(0)
+    columns = APPEARANCE_HEADER[1:]
+    rows = []
+    for trait, categories in (('eye', 3), ('hair', 4), ('skin', 5)):
+        for category in range(categories):
+            rows.append((trait, category, 'intercept', rng.normal()))
+            rows.extend((trait, category, column, rng.normal()) for column in columns)
+    model = AppearanceModel(pd.DataFrame(rows, columns=['trait', 'category', 'term', 'coefficient']))
+    print(f"{'samples':>8} {'predict ms':>11}")
+    for n_samples in sample_counts:
+        dosages = rng.integers(-1, 3, (n_samples, len(columns))).astype(np.int8)
+        us = time_per_call(lambda: predict_dosages(range(n_samples), dosages, model), 3)
+        print(f"{n_samples:>8} {us / 1000:>11.1f}")
+
+
+def bench_packed_genotypes(sample_counts=(1000, 10000, 100000), n_markers=153):
+    """Compare the memory of a loaded run with its packed genotype matrix and time cohort statistics on it."""
+    markers = panel(n_markers)
+    print(f"{'samples':>8} {'frame MB':>9} {'packed MB':>10} {'ratio':>6} {'pack ms':>8} {'stats ms':>9} {'mmap ms':>8}")
+    for n_samples in sample_counts:
+        # Generated in blocks; the strings of a whole cohort do not fit in memory before they are categorical
+        data = concat_reports([generate_samples(markers, first, min(2000, n_samples - first)).astype(report_dtypes())
+                               for first in range(0, n_samples, 2000)])
+        store = GenotypeStore(data)
+        frame_mb = memory_mb(data)
+        pack_us = time_per_call(lambda: PackedGenotypeMatrix.from_store(store), 1)
+        matrix = PackedGenotypeMatrix.from_store(store)
+        stats_us = time_per_call(lambda: (matrix.sample_stats(), matrix.marker_stats()), 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            matrix.save(tmp)
+            load_us = time_per_call(lambda: PackedGenotypeMatrix.load(tmp).marker_stats(), 3)
+        print(f"{n_samples:>8} {frame_mb:>9.1f} {matrix.nbytes / 1e6:>10.2f} {frame_mb / (matrix.nbytes / 1e6):>6.0f} "
+              f"{pack_us / 1000:>8.1f} {stats_us / 1000:>9.1f} {load_us / 1000:>8.1f}")
+
+
+def bench_qc_metrics(sample_counts=(1000, 10000, 50000), n_markers=153, n_edits=20):
+    """Time computing the QC dashboard metrics of a run and updating them after a few edits."""
+    markers = panel(n_markers)
+    print(f"{'samples':>8} {'rows':>10} {'compute ms':>11} {'edit update ms':>15}")
+    for n_samples in sample_counts:
+        data = concat_reports([generate_samples(markers, first, min(2000, n_samples - first)).astype(report_dtypes())
+                               for first in range(0, n_samples, 2000)])
+        store = GenotypeStore(data)
+        compute_us = time_per_call(lambda: QCMetrics(store), 1)
+        metrics = QCMetrics(store)
+        edits = [{(store.samples()[i], markers[i][2]): genotype for i in range(n_edits)} for genotype in ('NN', 'AA')]
+
+        def update():
+            for edit in edits:
+                metrics.apply_edits(edit)
+                metrics.sample_metrics()
+                metrics.marker_metrics()
+        update_us = time_per_call(update, 3) / len(edits)
+        print(f"{n_samples:>8} {len(data):>10} {compute_us / 1000:>11.1f} {update_us / 1000:>15.1f}")
+
+
+def bench_concordance(sample_counts=(1000, 5000, 10000), n_markers=153, workers=(1, 2)):
+    """Time comparing all pairs of samples of a cohort, in process and split over worker processes."""
+    markers = panel(n_markers)
+    print(f"{'samples':>8} {'pairs':>11} {'workers':>8} {'compare ms':>11} {'pairs/sec':>12}")
+    for n_samples in sample_counts:
+        data = concat_reports([generate_samples(markers, first, min(2000, n_samples - first)).astype(report_dtypes())
+                               for first in range(0, n_samples, 2000)])
+        matrix = PackedGenotypeMatrix.from_store(GenotypeStore(data))
+        n_pairs = n_samples * (n_samples - 1) // 2
+        for n_workers in workers:
+            us = time_per_call(lambda: sample_concordance(matrix, workers=n_workers), 1)
+            print(f"{n_samples:>8} {n_pairs:>11} {n_workers:>8} {us / 1000:>11.1f} {n_pairs / (us / 1e6):>12.0f}")
+
+
+if __name__ == "__main__":
+    bench_genotype_store()
+    bench_appearance_export()
+    bench_load_memory()
+    bench_report_cache()
+    bench_sample_cache()
+    bench_ancestry()
+    bench_appearance_prediction()
+    bench_packed_genotypes()
+    bench_qc_metrics()
+    bench_concordance()
@@ -1,16 +1,201 @@
+import csv
+import numpy as np
 import pandas as pd
-from config import DATA_DIRECTORY, DATA_DIRECTORY_INPUT
+from config import CSV_ENGINE, DATA_DIRECTORY, DATA_DIRECTORY_INPUT
+from dosage_encoding import MISSING_CODE, encode_dosages, encode_genotypes, normalize_genotype
+from perf import span
 import os
 
-def load_data(filename):
-    """Load data from a file."""
-    full_path = f"{filename}"
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # Without pyarrow every report is parsed by pandas
+    pa_csv = None
+
+APPEARANCE_HEADER = [
+    "sampleid", "rs312262906_A", "rs11547464_A", "rs885479_T", "rs1805008_T", "rs1805005_T", "rs1805006_A",
+    "rs1805007_T", "rs1805009_C", "rs201326893_A", "rs2228479_A", "rs1110400_C", "rs28777_C", "rs16891982_C",
+    "rs12821256_G", "rs4959270_A", "rs12203592_T", "rs1042602_T", "rs1800407_A", "rs2402130_G", "rs12913832_T",
+    "rs2378249_C", "rs12896399_T", "rs1393350_T", "rs683_G", "rs3114908_T", "rs1800414_C", "rs10756819_G",
+    "rs2238289_C", "rs17128291_C", "rs6497292_C", "rs1129038_G", "rs1667394_C", "rs1126809_A", "rs1470608_A",
+    "rs1426654_G", "rs6119471_C", "rs1545397_T", "rs6059655_T", "rs12441727_A", "rs3212355_A", "rs8051733_C"
+]
+
+# Column types of the Ion Torrent run report (Raw_Data/raw_data_test.csv)
+REPORT_SCHEMA = {
+    'BarcodeName': 'category',
+    'SampleName': 'category',
+    'Chrom': 'category',
+    'Position': 'int32',
+    'Target ID': 'category',
+    'HotSpot ID': 'category',
+    'Genotype': 'category',
+    'Coverage': 'int32',
+    'A Reads': 'int32',
+    'C Reads': 'int32',
+    'G Reads': 'int32',
+    'T Reads': 'int32',
+    'Pos Cov': 'int32',
+    'Neg Cov': 'int32',
+    'Perc Pos Cov': 'float32',
+    'GQ': 'int32',
+    'Maj Allele Freq': 'float32',
+    'QC': 'category',
+}
+
+# Every report column except the locus annotations, which no tab reads
+ANALYSIS_COLUMNS = [column for column in REPORT_SCHEMA if column not in ('Chrom', 'Position', 'HotSpot ID')]
+
+# (other allele, counted allele) on the reported strand for every appearance column
+APPEARANCE_ALLELES = {
+    'rs312262906_A': ('C', 'A'),
+    'rs11547464_A': ('G', 'A'),
+    'rs885479_T': ('G', 'A'),
+    'rs1805008_T': ('C', 'T'),
+    'rs1805005_T': ('G', 'T'),
+    'rs1805006_A': ('C', 'A'),
+    'rs1805007_T': ('C', 'T'),
+    'rs1805009_C': ('G', 'C'),
+    'rs201326893_A': ('C', 'A'),
+    'rs2228479_A': ('G', 'A'),
+    'rs1110400_C': ('T', 'C'),
+    'rs28777_C': ('A', 'C'),
+    'rs16891982_C': ('G', 'C'),
+    'rs12821256_G': ('T', 'C'),
+    'rs4959270_A': ('C', 'A'),
+    'rs12203592_T': ('C', 'T'),
+    'rs1042602_T': ('C', 'A'),
+    'rs1800407_A': ('C', 'T'),
+    'rs2402130_G': ('A', 'G'),
+    'rs12913832_T': ('G', 'A'),
+    'rs2378249_C': ('A', 'G'),
+    'rs12896399_T': ('G', 'T'),
+    'rs1393350_T': ('G', 'A'),
+    'rs683_G': ('A', 'C'),
+    'rs3114908_T': ('C', 'T'),
+    'rs1800414_C': ('T', 'C'),
+    'rs10756819_G': ('A', 'G'),
+    'rs2238289_C': ('A', 'G'),
+    'rs17128291_C': ('A', 'G'),
+    'rs6497292_C': ('A', 'G'),
+    'rs1129038_G': ('T', 'C'),
+    'rs1667394_C': ('T', 'C'),
+    'rs1126809_A': ('G', 'A'),
+    'rs1470608_A': ('G', 'T'),
+    'rs1426654_G': ('A', 'G'),
+    'rs6119471_C': ('C', 'G'),
+    'rs1545397_T': ('A', 'T'),
+    'rs6059655_T': ('G', 'A'),
+    'rs12441727_A': ('G', 'A'),
+    'rs3212355_A': ('C', 'T'),
+    'rs8051733_C': ('A', 'G'),
+}
+
+
+def report_dtypes(columns=None, categorical=True, exact=False):
+    """Return the read_csv dtypes for the selected report columns (all columns if None).
+
+    exact keeps the float columns float64, so a report saved back repeats every unedited value.
+    """
+    dtypes = {column: dtype for column, dtype in REPORT_SCHEMA.items() if columns is None or column in columns}
+    if exact:
+        dtypes = {column: ('float64' if dtype == 'float32' else dtype) for column, dtype in dtypes.items()}
+    if not categorical:
+        # Chunks read separately get different categories, so keep strings as plain objects
+        dtypes = {column: (object if dtype == 'category' else dtype) for column, dtype in dtypes.items()}
+    return dtypes
+
+# CSV parsers for run reports, by the CSV_ENGINE name
+CSV_ENGINE_NAMES = {
+    'arrow': "pyarrow multithreaded reader",
+    'pandas': "pandas C parser",
+}
+
+ARROW_BLOCK_SIZE = 16 * 1024 ** 2  # Bytes of CSV each pyarrow thread parses at a time
+
+# Cells read as missing, the pd.read_csv defaults
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+             '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+def csv_engine(engine=CSV_ENGINE):
+    """Return the parser engine resolves to: 'arrow' when pyarrow is installed and not ruled out, else 'pandas'."""
+    if engine not in ('auto', 'arrow', 'pandas'):
+        raise Exception(f"Unknown CSV engine {engine}; use auto, arrow or pandas.")
+    return 'arrow' if engine != 'pandas' and pa_csv is not None else 'pandas'
+
+def _read_csv_pandas(path, columns):
+    return pd.read_csv(
+        path,
+        encoding='utf-8-sig',  # Strips the BOM in front of 'BarcodeName'
+        usecols=columns,
+        dtype=report_dtypes(columns, exact=columns is None),
+    )
+
+def _read_csv_arrow(path, columns):
+    """Parse a report with pyarrow into the same columns and dtypes as _read_csv_pandas."""
+    # pyarrow skips the BOM itself; the header is read here to keep the file's column order like usecols does
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        header = next(csv.reader(f), [])
+    if columns is not None and not set(columns) <= set(header):
+        raise ValueError("Columns missing from the report.")
+    included = [column for column in header if columns is None or column in columns]
+    dtypes = report_dtypes(included, exact=columns is None)
+    arrow_types = {'category': pa.dictionary(pa.int32(), pa.string()), 'int32': pa.int32(), 'float32': pa.float32(),
+                   'float64': pa.float64()}
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(use_threads=True, block_size=ARROW_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=included,
+            column_types={column: arrow_types[dtype] for column, dtype in dtypes.items()},
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    data = table.to_pandas()
+    for column, dtype in dtypes.items():
+        if dtype == 'category':
+            # pandas sorts the categories; pyarrow keeps them in order of appearance
+            data[column] = data[column].cat.reorder_categories(sorted(data[column].cat.categories))
+        elif data[column].dtype != dtype:
+            # An integer column with missing cells; pandas refuses it with a clear message
+            raise ValueError(f"{column} does not parse as {dtype}.")
+    return data
+
+def read_report(filename, columns=ANALYSIS_COLUMNS, engine=CSV_ENGINE):
+    """Load an Ion Torrent run report using the typed report schema; returns the data and the engine that parsed it.
+
+    With columns=None the whole report is loaded to be saved back, so its float columns stay float64.
+    A report the pyarrow reader rejects is parsed again by pandas.
+    """
+    used = csv_engine(engine)
     try:
-        data = pd.read_csv(full_path)
-        return data
+        with span("load_data") as s:
+            data = None
+            if used == 'arrow':
+                try:
+                    data = _read_csv_arrow(filename, columns)
+                except (pa.ArrowException, ValueError):
+                    used = 'pandas'
+            if data is None:
+                data = _read_csv_pandas(filename, columns)
+            s.count(len(data))
+        return data, used
     except Exception as e:
         raise Exception(f"Failed to load data: {str(e)}")
 
+def load_data(filename, columns=ANALYSIS_COLUMNS, engine=CSV_ENGINE):
+    """Load an Ion Torrent run report using the typed report schema."""
+    return read_report(filename, columns, engine)[0]
+
+def add_genotype_categories(data, genotypes):
+    """Register new genotype values before they are written into a categorical Genotype column."""
+    column = data['Genotype']
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        new_genotypes = sorted(set(genotypes) - set(column.cat.categories))
+        if new_genotypes:
+            data['Genotype'] = column.cat.add_categories(new_genotypes)
+
 def analyze_data(data, sample_name):
     """Analyze data to extract genotypes and major allele frequencies for specific markers and a given sample."""
     markers = ['rs16830500', 'rs10497191', 'rs7568054', 'rs2302013']
@@ -29,6 +214,75 @@ def analyze_data(data, sample_name):
     except Exception as e:
         raise Exception(f"Failed to analyze data: {str(e)}")
 
+def analyze_sample(sample_data, markers, edits=None):
+    """Return genotype and major allele frequency of the given markers for one sample, with edits applied."""
+    with span("analyze_sample", rows=len(sample_data)):
+        result = sample_data.loc[sample_data['Target ID'].isin(markers), ['Target ID', 'Genotype', 'Maj Allele Freq']]
+        result = result.drop_duplicates('Target ID').astype({'Target ID': object, 'Genotype': object})
+        if edits:
+            edited = result['Target ID'].map(edits)
+            result['Genotype'] = edited.where(edited.notna(), result['Genotype'])
+        return result.reset_index(drop=True)
+
+def genotype_matrix(data, samples, markers, edits=None, genotype_codes=None) -> np.ndarray:
+    """Pivot genotype codes into a samples x markers matrix; missing pairs get MISSING_CODE."""
+    if genotype_codes is None:
+        genotype_codes = encode_genotypes(data['Genotype'])
+
+    # First row wins, like iloc[0]
+    sample_labels, marker_labels = pd.Index(samples), pd.Index(markers)
+    sample_index = sample_labels.get_indexer(data['SampleName'])
+    marker_index = marker_labels.get_indexer(data['Target ID'])
+    rows = np.flatnonzero((sample_index >= 0) & (marker_index >= 0))[::-1]
+    codes = np.full((len(sample_labels), len(marker_labels)), MISSING_CODE, dtype=np.uint8)
+    codes[sample_index[rows], marker_index[rows]] = genotype_codes[rows]
+
+    # Apply manual genotype edits keyed by (sample, marker)
+    for (sample, marker), genotype in (edits or {}).items():
+        if sample in sample_labels and marker in marker_labels:
+            codes[sample_labels.get_loc(sample), marker_labels.get_loc(marker)] = normalize_genotype(genotype)
+    return codes
+
+def appearance_dosages(data, samples, edits=None, genotype_codes=None) -> np.ndarray:
+    """Return the samples x appearance columns int8 dosage matrix; NA_DOSAGE marks missing genotypes."""
+    columns = APPEARANCE_HEADER[1:]
+    markers = [column.split('_')[0] for column in columns]
+    codes = genotype_matrix(data, samples, markers, edits, genotype_codes)
+    return encode_dosages(codes, [APPEARANCE_ALLELES[column] for column in columns])
+
+def create_appearance_input(data, samples=None, edits=None, genotype_codes=None):
+    """Build the appearance input table with one row of allele dosages per sample."""
+    columns = APPEARANCE_HEADER[1:]
+    if samples is None:
+        samples = data['SampleName'].unique()
+
+    with span("create_appearance_input", rows=len(data)):
+        dosages = appearance_dosages(data, samples, edits, genotype_codes)
+        output_data = pd.DataFrame(np.array(['0', '1', '2', 'NA'], dtype=object)[dosages], columns=columns)
+        output_data.insert(0, 'sampleid', list(samples))
+        return output_data
+
+def qc_summary(data, genotype_codes=None):
+    """Summarize call rate, coverage and instrument QC flags for every sample."""
+    with span("qc_summary", rows=len(data)):
+        if genotype_codes is None:
+            genotype_codes = encode_genotypes(data['Genotype'])
+        per_row = pd.DataFrame({
+            'SampleName': data['SampleName'],
+            'called': genotype_codes != MISSING_CODE,
+            'Coverage': data['Coverage'],
+            'flagged': data['QC'].notna(),
+        })
+        summary = per_row.groupby('SampleName', sort=False, observed=True).agg(
+            markers=('called', 'size'),
+            called=('called', 'sum'),
+            median_coverage=('Coverage', 'median'),
+            min_coverage=('Coverage', 'min'),
+            qc_flagged=('flagged', 'sum'),
+        )
+        summary['call_rate'] = summary['called'] / summary['markers']
+        return summary.reset_index()
+
 # def create_analysis_input_file(data, sample_name, analysis_type):
 #     """Create input file for specific analysis type."""
 #     # Define the header as specified
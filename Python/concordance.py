@@ -0,0 +1,147 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from config import CONCORDANCE_WORKERS
+from packed_genotypes import MISSING, PackedGenotypeMatrix, unpack
+from perf import span
+
+# Pairs with fewer markers called in both samples are not compared
+MIN_COMPARED = 20
+
+# Different samples at least this concordant are listed, and flagged as duplicates from DUPLICATE_CONCORDANCE
+REPORT_CONCORDANCE = 0.9
+DUPLICATE_CONCORDANCE = 0.95
+
+# The same sample in two runs below this concordance was probably swapped in one of them
+SWAP_CONCORDANCE = 0.8
+
+BLOCK_SAMPLES = 2048  # Samples per block; a block pair compares BLOCK_SAMPLES ** 2 pairs at once
+
+# Flags from most to least suspicious
+FLAGS = ['possible swap', 'duplicate', 'high concordance', 'same sample']
+
+
+def _indicators(packed, n_markers):
+    """Return one-hot genotype states (samples x 3 markers) and called markers (samples x markers) as float32."""
+    states = unpack(packed, n_markers)
+    one_hot = np.concatenate([states == state for state in range(MISSING)], axis=1).astype(np.float32)
+    return one_hot, (states != MISSING).astype(np.float32)
+
+
+def compare_blocks(packed_a, packed_b, n_markers, diagonal, names_a, names_b, min_compared=MIN_COMPARED,
+                   report_concordance=REPORT_CONCORDANCE):
+    """Compare every sample of one packed block with every sample of another.
+
+    Equal genotypes are counted as products of the one-hot state matrices, so a block pair is two
+    matrix multiplications. Returns the block positions, compared and matching marker counts of the
+    pairs worth reporting: different names at least report_concordance alike, and every pair of
+    samples with the same name.
+    """
+    one_hot_a, called_a = _indicators(packed_a, n_markers)
+    one_hot_b, called_b = (one_hot_a, called_a) if diagonal else _indicators(packed_b, n_markers)
+    matching = np.rint(one_hot_a @ one_hot_b.T).astype(np.int32)
+    compared = np.rint(called_a @ called_b.T).astype(np.int32)
+
+    same_name = names_a[:, None] == names_b[None, :]
+    keep = (compared >= min_compared) & (same_name | (matching >= report_concordance * compared))
+    if diagonal:
+        keep = np.triu(keep, k=1)
+    i, j = np.nonzero(keep)
+    return i, j, compared[i, j], matching[i, j]
+
+
+def sample_concordance(matrix: PackedGenotypeMatrix, names=None, runs=None, min_compared=MIN_COMPARED,
+                       report_concordance=REPORT_CONCORDANCE, block_samples=BLOCK_SAMPLES, workers=CONCORDANCE_WORKERS):
+    """Compare all pairs of samples in the matrix and return the suspicious pairs, most suspicious first.
+
+    names gives the sample name of each matrix row (the row labels if None); rows with the same name,
+    e.g. one sample sequenced in several runs, are always compared and flagged when they disagree.
+    With more than one worker the block pairs are split over a process pool.
+    """
+    names = np.asarray(matrix.samples if names is None else names).astype(str)
+    name_ids = pd.factorize(names)[0]
+    starts = range(0, matrix.n_samples, block_samples)
+    tasks = [(a, b) for a in starts for b in starts if b >= a]
+
+    def arguments(a, b):
+        return (np.asarray(matrix.packed[a:a + block_samples]), np.asarray(matrix.packed[b:b + block_samples]),
+                matrix.n_markers, a == b, name_ids[a:a + block_samples], name_ids[b:b + block_samples],
+                min_compared, report_concordance)
+
+    with span("sample_concordance", rows=matrix.n_samples, pairs=matrix.n_samples * (matrix.n_samples - 1) // 2):
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(compare_blocks, *arguments(a, b)) for a, b in tasks]
+                results = [future.result() for future in futures]
+        else:
+            results = [compare_blocks(*arguments(a, b)) for a, b in tasks]
+
+    first = np.concatenate([i + a for (a, _), (i, *_) in zip(tasks, results)] + [np.zeros(0, dtype=np.int64)])
+    second = np.concatenate([j + b for (_, b), (_, j, *_) in zip(tasks, results)] + [np.zeros(0, dtype=np.int64)])
+    compared = np.concatenate([result[2] for result in results] + [np.zeros(0, dtype=np.int32)])
+    matching = np.concatenate([result[3] for result in results] + [np.zeros(0, dtype=np.int32)])
+    return rank_pairs(matrix.samples, names, runs, first, second, compared, matching)
+
+
+def rank_pairs(labels, names, runs, first, second, compared, matching) -> pd.DataFrame:
+    """Flag compared pairs and sort them from most to least suspicious."""
+    concordance = matching / np.maximum(compared, 1)
+    same_name = names[first] == names[second]
+    flag = np.select(
+        [same_name & (concordance < SWAP_CONCORDANCE), same_name,
+         concordance >= DUPLICATE_CONCORDANCE],
+        [FLAGS[0], FLAGS[3], FLAGS[1]],
+        FLAGS[2],
+    )
+    pairs = pd.DataFrame({
+        'sample_a': np.asarray(labels)[first],
+        'sample_b': np.asarray(labels)[second],
+        'compared': compared,
+        'matching': matching,
+        'concordance': concordance,
+        'flag': flag,
+    })
+    if runs is not None:
+        runs = np.asarray(runs)
+        pairs.insert(1, 'run_a', runs[first])
+        pairs.insert(3, 'run_b', runs[second])
+    # Swaps are worst when least concordant, everything else when most concordant
+    pairs['rank_key'] = np.where(same_name, -concordance, concordance)
+    pairs['flag_order'] = pd.Categorical(pairs['flag'], categories=FLAGS, ordered=True).codes
+    pairs = pairs.sort_values(['flag_order', 'rank_key', 'compared'], ascending=[True, False, False], kind='stable')
+    return pairs.drop(columns=['rank_key', 'flag_order']).reset_index(drop=True)
+
+
+def run_sample_matrix(all_rows: pd.DataFrame):
+    """Pack every (run, sample) of a merged dataset's rows as its own matrix row.
+
+    Returns the matrix and the sample name and run of each row, so the same sample in two runs
+    can be compared with itself.
+    """
+    keys = pd.MultiIndex.from_arrays([all_rows['Run'], all_rows['SampleName']])
+    codes, uniques = keys.factorize()
+    runs = np.array([str(run) for run, _ in uniques], dtype=object)
+    names = np.array([str(sample) for _, sample in uniques], dtype=object)
+    labels = [f"{run}/{sample}" for run, sample in zip(runs, names)]
+    rows = all_rows.assign(SampleName=pd.Categorical.from_codes(codes, categories=labels))
+    return PackedGenotypeMatrix.from_data(rows, samples=labels), names, runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate and swapped samples in a packed genotype matrix.")
+    parser.add_argument("matrix", help="directory written by packed_genotypes.py")
+    parser.add_argument("--output", default="sample_concordance.csv", help="CSV file for the suspicious pairs")
+    parser.add_argument("--workers", type=int, default=CONCORDANCE_WORKERS, help="processes comparing blocks of samples")
+    parser.add_argument("--min-compared", type=int, default=MIN_COMPARED, help="markers called in both samples at least")
+    args = parser.parse_args()
+
+    matrix = PackedGenotypeMatrix.load(args.matrix)
+    pairs = sample_concordance(matrix, min_compared=args.min_compared, workers=args.workers)
+    pairs.to_csv(args.output, index=False)
+    print(f"Compared {matrix.n_samples * (matrix.n_samples - 1) // 2} pairs of {matrix.n_samples} samples; "
+          f"{(pairs['flag'] == 'duplicate').sum()} duplicates, saved {len(pairs)} pairs to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,17 @@
 # Configuration for data analyzer application
 DATA_DIRECTORY = "../Raw_Data/"  # You need to update this path
-DATA_DIRECTORY_INPUT = "../Derived_Data"
\ No newline at end of file
+DATA_DIRECTORY_INPUT = "../Derived_Data"
+CACHE_DIRECTORY = "../Derived_Data/.cache"  # Binary copies of parsed run reports
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # Least recently used entries are evicted above this size
+SAMPLE_CACHE_MAX_BYTES = 256 * 1024 ** 2  # Per-sample views kept in memory by the Prepare Files tab
+LOG_MAX_LINES = 10000  # Older lines are dropped from the log view
+LOG_MIRROR_FILE = None  # Set to a file name to also write the log to a rotating file
+ANCESTRY_REFERENCE_FILE = "../Reference_Data/ancestry_allele_frequencies.csv"  # marker, other_allele, counted_allele, one column per population
+APPEARANCE_MODEL_FILE = "../Reference_Data/appearance_model_coefficients.csv"  # trait, category, term, coefficient
+MERGE_DEDUP_RULE = "coverage"  # Row kept for a sample and marker in several runs: "coverage", "gq" or "latest"
+WATCH_INTERVAL = 10  # Seconds between polls of DATA_DIRECTORY in watch mode
+WATCH_WORKERS = 2  # Reports processed at the same time in watch mode
+WATCH_QUEUE_SIZE = 8  # Reports waiting at most; scanning pauses while the queue is full
+CSV_ENGINE = "auto"  # Report parser: "auto" uses the multithreaded pyarrow reader when installed, "arrow" or "pandas"
+CONCORDANCE_WORKERS = 1  # Processes comparing blocks of sample pairs; 1 compares in the calling process
+SAVE_FORMAT = "csv"  # "csv", "csv.gz" or "parquet" for "Save Changes to CSV"
\ No newline at end of file
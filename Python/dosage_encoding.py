@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Unordered diallelic genotypes; a genotype's code is its position in this list
+GENOTYPE_CODES = ['AA', 'AC', 'AG', 'AT', 'CC', 'CG', 'CT', 'GG', 'GT', 'TT']
+MISSING_CODE = len(GENOTYPE_CODES)  # No-calls ('NN', '-', './.'), single alleles and anything unparsable
+NA_DOSAGE = -1
+
+_CODE_LOOKUP = {genotype: code for code, genotype in enumerate(GENOTYPE_CODES)}
+
+# Compiled code -> dosage tables, keyed on the (other allele, counted allele) pairs they were built from
+_DOSAGE_TABLES = {}
+
+
+def normalize_genotype(genotype):
+    """Return the integer code of a genotype string such as 'A/G', 'GA' or 'ag'."""
+    if not isinstance(genotype, str):
+        return MISSING_CODE
+    alleles = genotype.strip().upper().replace('/', '').replace('|', '')
+    return _CODE_LOOKUP.get(''.join(sorted(alleles)), MISSING_CODE)
+
+
+def encode_genotypes(genotypes) -> np.ndarray:
+    """Encode a column of genotype strings as uint8 codes, normalizing each distinct spelling once."""
+    codes, uniques = pd.factorize(pd.Series(genotypes, dtype=object))
+    table = np.array([normalize_genotype(genotype) for genotype in uniques] + [MISSING_CODE], dtype=np.uint8)
+    return table[codes]
+
+
+def apply_row_edits(codes: np.ndarray, positions, genotypes) -> np.ndarray:
+    """Return genotype codes with edits at sorted row positions applied; codes itself is left as is."""
+    if not len(positions):
+        return codes
+    codes = codes.copy()
+    codes[positions] = [normalize_genotype(genotype) for genotype in genotypes]
+    return codes
+
+
+def edited_genotypes(column: pd.Series, rows, positions, genotypes) -> np.ndarray:
+    """Return the genotype strings of the given rows of a Genotype column, edited ones from the edits."""
+    values = column.iloc[rows].to_numpy(dtype=object)
+    if len(positions):
+        at = np.minimum(np.searchsorted(positions, rows), len(positions) - 1)
+        hit = positions[at] == rows
+        values[hit] = np.asarray(genotypes, dtype=object)[at[hit]]
+    return values
+
+
+def dosage_tables(alleles) -> np.ndarray:
+    """Return a markers x codes int8 table giving the count of the counted allele (0/1/2, or NA_DOSAGE)."""
+    key = tuple(alleles)
+    table = _DOSAGE_TABLES.get(key)
+    if table is None:
+        table = np.full((len(key), MISSING_CODE + 1), NA_DOSAGE, dtype=np.int8)
+        for i, (other, counted) in enumerate(key):
+            table[i, _CODE_LOOKUP[''.join(sorted(other * 2))]] = 0
+            table[i, _CODE_LOOKUP[''.join(sorted(other + counted))]] = 1
+            table[i, _CODE_LOOKUP[''.join(sorted(counted * 2))]] = 2
+        table.setflags(write=False)
+        _DOSAGE_TABLES[key] = table
+    return table
+
+
+def encode_dosages(codes: np.ndarray, alleles) -> np.ndarray:
+    """Map a samples x markers matrix of genotype codes to allele dosages in one indexing step."""
+    table = dosage_tables(alleles)
+    return table[np.arange(table.shape[0]), codes]
@@ -0,0 +1,94 @@
+import getpass
+import json
+import os
+import time
+from datetime import datetime
+import pandas as pd
+from business_logic import load_data, add_genotype_categories
+
+
+class EditJournal:
+    """Append-only JSONL journal of genotype edits.
+
+    The file is opened once, on the first edit. Every record is flushed to the OS so a crash of the
+    application loses nothing. fsync runs at most every fsync_interval seconds while edits come in,
+    on close, and from sync_pending, which the owner calls every fsync_interval seconds so a crash of
+    the machine loses at most that much of the last edits.
+    """
+
+    def __init__(self, path, fsync_interval=5.0, user=None):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.user = user or getpass.getuser()
+        self._file = None
+        self._last_sync = time.monotonic()
+        self._unsynced = False  # Records written since the last fsync
+
+    def record(self, sample, marker, old_genotype, new_genotype):
+        """Append one edit."""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8', buffering=64 * 1024)
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'user': self.user,
+            'sample': sample,
+            'marker': marker,
+            'old': old_genotype,
+            'new': new_genotype,
+        }
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self._unsynced = True
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """Force written edits to disk."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+
+    def sync_pending(self):
+        """Force edits to disk if any were written since the last sync."""
+        if self._unsynced:
+            self.sync()
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+def read_journal(path):
+    """Return the journal entries in the order they were written, skipping a torn last line."""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def replay(data, entries) -> pd.DataFrame:
+    """Return a copy of the run with every journaled edit applied; later edits of a cell win."""
+    edited = data.copy()
+    if not entries:
+        return edited
+    latest = pd.DataFrame(entries).drop_duplicates(['sample', 'marker'], keep='last')
+    edits = pd.Series(latest['new'].to_numpy(), index=pd.MultiIndex.from_frame(latest[['sample', 'marker']]))
+
+    keys = pd.MultiIndex.from_arrays([edited['SampleName'], edited['Target ID']])
+    rows = keys.isin(edits.index)
+    add_genotype_categories(edited, edits.unique())
+    edited.loc[rows, 'Genotype'] = edits.reindex(keys[rows]).to_numpy()
+    return edited
+
+
+def replay_report(report_path, journal_path) -> pd.DataFrame:
+    """Rebuild the edited dataset from the raw run report and its edit journal."""
+    return replay(load_data(report_path, columns=None), read_journal(journal_path))
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from dosage_encoding import encode_genotypes
+
+
+class GenotypeStore:
+    """Loaded run report indexed on (SampleName, Target ID)."""
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+
+        # Normalized integer genotype codes, one per row
+        self.genotype_codes = encode_genotypes(data['Genotype'])
+
+        # Row positions for every sample, in the order samples appear in the file
+        self._sample_rows = data.groupby('SampleName', sort=False).indices
+
+        # First row for every (sample, marker) pair, like the iloc[0] lookups this replaces
+        keys = pd.MultiIndex.from_arrays([data['SampleName'], data['Target ID']])
+        first = ~keys.duplicated()
+        self._positions = dict(zip(keys[first], np.flatnonzero(first)))
+
+    def samples(self):
+        """Return the sample names in file order."""
+        return list(self._sample_rows)
+
+    def has(self, sample, marker):
+        """Return True if the sample has a row for the marker."""
+        return (sample, marker) in self._positions
+
+    def position(self, sample, marker):
+        """Return the row position for a (sample, marker) pair, or None."""
+        return self._positions.get((sample, marker))
+
+    def get(self, sample, marker, column, default=None):
+        """Return a single cell for a (sample, marker) pair."""
+        pos = self._positions.get((sample, marker))
+        if pos is None:
+            return default
+        return self.data.iat[pos, self.data.columns.get_loc(column)]
+
+    def sample_data(self, sample) -> pd.DataFrame:
+        """Return the rows of a single sample without scanning the table."""
+        rows = self._sample_rows.get(sample)
+        if rows is None:
+            return self.data.iloc[0:0]
+        return self.data.iloc[rows]
@@ -4,6 +4,9 @@ from concurrent.futures import ThreadPoolExecutor
 import queue
 import os
 import pandas as pd
+from ancestry import infer_ancestry, load_reference
+from business_logic import add_genotype_categories, read_report
+from config import ANCESTRY_REFERENCE_FILE
 
 # Directory configurations
 DATA_DIRECTORY = "path_to_your_data_directory"
@@ -30,6 +33,7 @@ class DataAnalyzerApp(ctk.CTk):
         self.grid_rowconfigure(3, weight=1)
 
         self.queue = queue.Queue()
+        self.max_log_lines = 10000  # Older log lines are dropped
         self.executor = ThreadPoolExecutor(max_workers=4)  # Adjust based on your need
         self.create_widgets()
         self.setup_layout()
@@ -96,12 +100,9 @@ class DataAnalyzerApp(ctk.CTk):
         # Optionally populate markers here or wait for analysis
 
     def load_data(self, filename):
-        """Load data from a file."""
-        try:
-            data = pd.read_csv(filename)
-            return data
-        except Exception as e:
-            raise Exception(f"Failed to load data: {str(e)}")
+        """Load data from a file, typed by the report schema."""
+        data, _ = read_report(filename, columns=None)
+        return data
 
     def populate_markers(self, sample_name):
         """Extract markers, genotypes, and MAF for the specific markers and populate the UI."""
@@ -147,6 +148,7 @@ class DataAnalyzerApp(ctk.CTk):
     def analyze_data_thread(self, sample):
         try:
             # Overwrite genotype values from the UI before analysis
+            add_genotype_categories(self.data, [entry.get() for entry in self.genotype_entries.values()])
             for marker, entry in self.genotype_entries.items():
                 self.data.loc[self.data['Target ID'] == marker, 'Genotype'] = entry.get()
             
@@ -179,7 +181,11 @@ class DataAnalyzerApp(ctk.CTk):
         if not self.is_loading:
             self.is_loading = True
             sample = self.sample_entry.get()
-            if hasattr(self, 'data') and sample:
+            if analysis_type == 'ancestry' and not os.path.exists(ANCESTRY_REFERENCE_FILE):
+                messagebox.showerror("Error", f"Ancestry reference {ANCESTRY_REFERENCE_FILE} not found; "
+                                              "place it there or point ANCESTRY_REFERENCE_FILE in config.py at it.")
+                self.is_loading = False
+            elif hasattr(self, 'data') and sample:
                 self.executor.submit(self.create_file_thread, sample, analysis_type)
             else:
                 messagebox.showerror("Error", "Data not loaded or no sample provided.")
@@ -196,6 +202,13 @@ class DataAnalyzerApp(ctk.CTk):
 
     def create_analysis_input_file(self, data, sample_name, analysis_type):
         """Create input file for specific analysis type."""
+        if analysis_type == 'ancestry':
+            # Posterior probabilities from the local ancestry classifier instead of raw genotypes
+            output_data = infer_ancestry(data, load_reference(ANCESTRY_REFERENCE_FILE), [sample_name])
+            filename = os.path.join(DATA_DIRECTORY_INPUT, f"{sample_name}_ancestry_posteriors.csv")
+            output_data.to_csv(filename, index=False)
+            return filename
+
         # Define the header as specified
         header = ["sampleid", "rs312262906_A", "rs11547464_A", "rs885479_T", "rs1805008_T", "rs1805005_T", "rs1805006_A", "rs1805007_T", "rs1805009_C", "rs201326893_A", "rs2228479_A", "rs1110400_C", "rs28777_C", "rs16891982_C", "rs12821256_G", "rs4959270_A", "rs12203592_T", "rs1042602_T", "rs1800407_A", "rs2402130_G", "rs12913832_T", "rs2378249_C", "rs12896399_T", "rs1393350_T", "rs683_G", "rs3114908_T", "rs1800414_C", "rs10756819_G", "rs2238289_C", "rs17128291_C", "rs6497292_C", "rs1129038_G", "rs1667394_C", "rs1126809_A", "rs1470608_A", "rs1426654_G", "rs6119471_C", "rs1545397_T", "rs6059655_T", "rs12441727_A", "rs3212355_A", "rs8051733_C"]  # This list should be completed based on your specific needs
 
@@ -223,21 +236,31 @@ class DataAnalyzerApp(ctk.CTk):
         return filename
 
     def display_message(self, message):
-        def update_text():
-            self.text_output.configure(state="normal")
-            self.text_output.insert("end", message + "\n")
-            self.text_output.configure(state="disabled")
-        self.after(50, update_text)  # Schedule update to run after 50ms
+        # Safe from any thread; process_queue writes queued messages in batches
+        self.queue.put(message)
 
     def process_queue(self):
         try:
-            result = self.queue.get_nowait()
-            self.display_message(result)
+            messages = []
+            while True:
+                messages.append(self.queue.get_nowait())
         except queue.Empty:
             pass
         finally:
+            if messages:
+                self.write_messages(messages[-self.max_log_lines:])
             self.after(100, self.process_queue)  # Check queue every 100 ms
 
+    def write_messages(self, messages):
+        """Append a batch of messages and drop the oldest lines beyond max_log_lines."""
+        self.text_output.configure(state="normal")
+        self.text_output.insert("end", "\n".join(messages) + "\n")
+        line_count = int(self.text_output.index("end-1c").split(".")[0])
+        if line_count > self.max_log_lines:
+            self.text_output.delete("1.0", f"{line_count - self.max_log_lines + 1}.0")
+        self.text_output.see("end")
+        self.text_output.configure(state="disabled")
+
 def main():
     app = DataAnalyzerApp()
     app.mainloop()
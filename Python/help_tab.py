@@ -13,8 +13,11 @@ class HelpTab(QWidget):
         help_text.setPlainText(
             "Help Guide\n\n"
             "1. Go to the 'Prepare Files' tab to load your data and prepare files for analysis.\n"
-            "2. Use the 'Appearance' and 'Ancestry' tabs for corresponding analyses (coming soon).\n"
-            "3. If you need further assistance, contact support."
+            "2. Use the 'Ancestry' tab to classify every sample of the loaded run against a reference allele frequency table.\n"
+            "3. Use the 'Appearance' tab to predict eye, hair and skin colour from a local model file, for the loaded run or for appearance input files.\n"
+            "4. Use the 'QC' tab to compute call rate, coverage, GQ, strand balance and heterozygosity for every sample and marker; edits are picked up when you return to it. 'Find Duplicates and Swaps' compares every sample of every loaded run with every other one.\n"
+            "5. Open 'Performance' below the tabs to see how long recent operations took. Set DATA_ANALYZER_TRACE to a file name before starting to record a Chrome trace.\n"
+            "6. If you need further assistance, contact support."
         )
         help_text.setReadOnly(True)
         layout.addWidget(help_text)
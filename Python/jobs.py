@@ -0,0 +1,75 @@
+import threading
+from types import MappingProxyType
+import pandas as pd
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from business_logic import analyze_sample
+from recaller import recall_genotypes
+from qc_rules import run_qc_rules
+from perf import span
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobSignals(QObject):
+    progress = pyqtSignal(str, int)
+    completed = pyqtSignal(str, object)
+    cancelled = pyqtSignal(str)
+    error_occurred = pyqtSignal(str, str)
+
+
+class AnalysisJob(QRunnable):
+    """Analyze one sample from a snapshot taken on the GUI thread.
+
+    The job owns a copy of the sample's rows and a read-only view of its edits, so it never touches
+    widgets or the shared run while it works.
+    """
+
+    def __init__(self, sample, sample_data: pd.DataFrame, edits, markers, qc_flags=None):
+        super().__init__()
+        self.sample = sample
+        self.sample_data = sample_data.copy()
+        self.edits = MappingProxyType(dict(edits))
+        self.markers = tuple(markers)
+        self.qc_flags = None if qc_flags is None else qc_flags.copy()  # Flags already computed for the edited rows
+        self.signals = JobSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _step(self, percent):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        self.signals.progress.emit(self.sample, percent)
+
+    def run(self):
+        with span("analysis_job", rows=len(self.sample_data), sample=self.sample):
+            try:
+                self._step(0)
+                result = analyze_sample(self.sample_data, self.markers, self.edits)
+                self._step(40)
+
+                # Suggested genotype from the read counts for the same markers
+                rows = self.sample_data[self.sample_data['Target ID'].isin(self.markers)].drop_duplicates('Target ID')
+                recalled = recall_genotypes(rows)
+                suggested = dict(zip(rows['Target ID'].astype(object), recalled['Suggested Genotype']))
+                result['Suggested Genotype'] = result['Target ID'].map(suggested)
+                self._step(70)
+
+                # QC rule messages, evaluated on the edited genotypes
+                flags = self.qc_flags
+                if flags is None:
+                    edited_rows = rows.astype({'Genotype': object}).reset_index(drop=True)
+                    edited_rows['Genotype'] = result.set_index('Target ID')['Genotype'].reindex(edited_rows['Target ID'].astype(object)).to_numpy()
+                    flags = run_qc_rules(edited_rows)
+                messages = flags.groupby(flags['Target ID'].astype(object))['Message'].agg(" ".join)
+                result['QC Flags'] = result['Target ID'].map(messages).fillna("")
+                self._step(100)
+
+                self.signals.completed.emit(self.sample, result)
+            except JobCancelled:
+                self.signals.cancelled.emit(self.sample)
+            except Exception as e:
+                self.signals.error_occurred.emit(self.sample, str(e))
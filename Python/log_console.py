@@ -0,0 +1,62 @@
+import logging
+import logging.handlers
+import queue
+from collections import deque
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+
+
+class LogConsole(QPlainTextEdit):
+    """Read-only log view that batches messages from any thread and keeps only the last max_lines."""
+
+    def __init__(self, max_lines=10000, interval_ms=50, mirror_path=None, mirror_max_bytes=10 * 1024 * 1024,
+                 mirror_backup_count=3):
+        super().__init__()
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self.max_lines = max_lines
+        self._pending = deque()  # append/popleft are thread-safe
+
+        # One timer drains everything queued since the last tick in a single append
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+        # Optional rotating log file, written from a listener thread so logging never waits on disk
+        self._listener = None
+        self._logger = None
+        if mirror_path:
+            records = queue.SimpleQueue()
+            file_handler = logging.handlers.RotatingFileHandler(
+                mirror_path, maxBytes=mirror_max_bytes, backupCount=mirror_backup_count
+            )
+            file_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self._listener = logging.handlers.QueueListener(records, file_handler)
+            self._listener.start()
+            self._logger = logging.getLogger(f"{__name__}.{id(self)}")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            self._logger.addHandler(logging.handlers.QueueHandler(records))
+            QApplication.instance().aboutToQuit.connect(self.close_mirror)
+
+    def log(self, message: str):
+        """Queue a message; safe to call from worker threads."""
+        self._pending.append(message)
+        if self._logger is not None:
+            self._logger.info(message)
+
+    def flush(self):
+        """Append every queued message to the view in one block."""
+        count = len(self._pending)
+        if not count:
+            return
+        batch = [self._pending.popleft() for _ in range(count)]
+        # Lines older than max_lines would be dropped by the view straight away
+        self.appendPlainText("\n".join(batch[-self.max_lines:]))
+
+    def close_mirror(self):
+        """Write out the remaining file records and stop the listener thread."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
@@ -1,9 +1,16 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QVBoxLayout, QTabWidget, QWidget
+import pandas as pd
+from PyQt5.QtWidgets import QApplication, QVBoxLayout, QTabWidget, QWidget, QToolButton, QTableView
+from PyQt5.QtCore import Qt, QTimer
 from prepare_files_tab import PrepareFilesTab
 from appearance_tab import AppearanceTab
 from ancestry_tab import AncestryTab
+from qc_tab import QCTab
 from help_tab import HelpTab
+from table_model import DataFrameModel
+import perf
+
+PERF_REFRESH_MS = 500  # How often the open performance panel picks up new spans
 
 class DataAnalyzerApp(QWidget):
     def __init__(self):
@@ -26,16 +33,66 @@ class DataAnalyzerApp(QWidget):
         """)
 
         # Add tabs
-        self.tab_widget.addTab(PrepareFilesTab(), "Prepare Files")
-        # self.tab_widget.addTab(AppearanceTab(), "Appearance")
-        # self.tab_widget.addTab(AncestryTab(), "Ancestry")
+        self.prepare_files_tab = PrepareFilesTab()
+        self.tab_widget.addTab(self.prepare_files_tab, "Prepare Files")
+        self.tab_widget.addTab(AppearanceTab(self.prepare_files_tab), "Appearance")
+        self.tab_widget.addTab(AncestryTab(self.prepare_files_tab), "Ancestry")
+        self.tab_widget.addTab(QCTab(self.prepare_files_tab), "QC")
         self.tab_widget.addTab(HelpTab(), "Help")
 
+        # Collapsible panel with the most recent timed operations
+        self.perf_toggle = QToolButton(self)
+        self.perf_toggle.setText("Performance")
+        self.perf_toggle.setCheckable(True)
+        self.perf_toggle.setToolButtonStyle(Qt.ToolButtonTextBesideIcon)
+        self.perf_toggle.setArrowType(Qt.RightArrow)
+        self.perf_toggle.toggled.connect(self.on_perf_toggled)
+        self.perf_model = DataFrameModel(float_format="{:.1f}")
+        self.perf_table = QTableView()
+        self.perf_table.setModel(self.perf_model)
+        self.perf_table.horizontalHeader().setStretchLastSection(True)
+        self.perf_table.setMaximumHeight(180)
+        self.perf_table.hide()
+        self.perf_timer = QTimer(self)
+        self.perf_timer.setInterval(PERF_REFRESH_MS)
+        self.perf_timer.timeout.connect(self.refresh_perf_panel)
+        self._perf_shown = None
+
         # Set main layout
         main_layout = QVBoxLayout(self)
         main_layout.addWidget(self.tab_widget)
+        main_layout.addWidget(self.perf_toggle)
+        main_layout.addWidget(self.perf_table)
         self.setLayout(main_layout)
 
+    def on_perf_toggled(self, checked):
+        # Spans are only recorded while the panel is open (or a trace file is requested)
+        self.perf_toggle.setArrowType(Qt.DownArrow if checked else Qt.RightArrow)
+        self.perf_table.setVisible(checked)
+        if checked:
+            perf.enable()
+            self.refresh_perf_panel()
+            self.perf_timer.start()
+        else:
+            self.perf_timer.stop()
+            perf.disable()
+
+    def refresh_perf_panel(self):
+        spans = perf.recent()
+        latest = spans[-1] if spans else None
+        if latest is self._perf_shown:
+            return
+        self._perf_shown = latest
+        timings = pd.DataFrame([{
+            'Operation': record['name'],
+            'ms': record['seconds'] * 1000,
+            'Rows': record['rows'],
+            'Memory (MB)': record['memory_delta_mb'],
+            'Thread': record['thread'],
+            'Error': record['error'] or "",
+        } for record in reversed(spans)], columns=['Operation', 'ms', 'Rows', 'Memory (MB)', 'Thread', 'Error']).astype({'Rows': 'Int64'})
+        self.perf_model.set_data(timings)
+
 def main():
     app = QApplication(sys.argv)
     analyzer = DataAnalyzerApp()
@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from business_logic import genotype_matrix, load_data
+from dosage_encoding import GENOTYPE_CODES, MISSING_CODE, NA_DOSAGE, encode_dosages, encode_genotypes
+from genotype_store import GenotypeStore
+from report_merge import MergedDataset
+from perf import span
+
+# 2-bit genotype states: dosage of the second allele (0, 1, 2) or missing, four genotypes to a byte
+MISSING = 3
+GENOTYPES_PER_BYTE = 4
+
+BASES = ('A', 'C', 'G', 'T')
+
+# Read count columns that can be kept next to the genotypes
+READ_COLUMNS = ('Coverage', 'Pos Cov', 'Neg Cov')
+
+BLOCK_SAMPLES = 8192  # Samples unpacked at a time by the per-marker statistics
+
+# Byte -> its four 2-bit states, first marker in the low bits
+_UNPACK = ((np.arange(256, dtype=np.uint16)[:, None] >> np.arange(0, 8, 2, dtype=np.uint16)) & 3).astype(np.uint8)
+_CALLED = (_UNPACK != MISSING).sum(axis=1).astype(np.uint8)
+_HETEROZYGOUS = (_UNPACK == 1).sum(axis=1).astype(np.uint8)
+
+# Genotype code -> how many copies of each base it holds
+_BASE_COUNTS = np.zeros((MISSING_CODE + 1, len(BASES)), dtype=np.int64)
+for _code, _genotype in enumerate(GENOTYPE_CODES):
+    for _base in _genotype:
+        _BASE_COUNTS[_code, BASES.index(_base)] += 1
+
+
+def pack(states: np.ndarray) -> np.ndarray:
+    """Pack a samples x markers matrix of 2-bit states into samples x ceil(markers / 4) bytes."""
+    n_samples, n_markers = states.shape
+    padded = np.full((n_samples, -(-n_markers // GENOTYPES_PER_BYTE) * GENOTYPES_PER_BYTE), MISSING, dtype=np.uint8)
+    padded[:, :n_markers] = states
+    quads = padded.reshape(n_samples, -1, GENOTYPES_PER_BYTE)
+    return quads[:, :, 0] | (quads[:, :, 1] << 2) | (quads[:, :, 2] << 4) | (quads[:, :, 3] << 6)
+
+
+def unpack(packed: np.ndarray, n_markers) -> np.ndarray:
+    """Return the samples x markers 2-bit states of packed rows."""
+    return _UNPACK[packed].reshape(len(packed), -1)[:, :n_markers]
+
+
+def major_minor_alleles(codes: np.ndarray):
+    """Return the most and second most common base of every marker column of a genotype code matrix.
+
+    A marker with one observed base gets '' as its second allele, one without calls '' for both.
+    """
+    histogram = np.stack([(codes == code).sum(axis=0) for code in range(MISSING_CODE + 1)], axis=1)
+    base_counts = histogram @ _BASE_COUNTS
+    ranked = np.argsort(-base_counts, axis=1, kind='stable')  # Ties go to the base first in ACGT order
+    bases = np.array(BASES + ('',))
+    first, second = ranked[:, 0], ranked[:, 1]
+    rows = np.arange(len(base_counts))
+    first = np.where(base_counts[rows, first] > 0, first, len(BASES))
+    second = np.where(base_counts[rows, second] > 0, second, len(BASES))
+    return bases[first], bases[second]
+
+
+def _pivot(values, sample_index, marker_index, rows, shape, dtype):
+    # First row of a (sample, marker) pair wins, like genotype_matrix
+    matrix = np.zeros(shape, dtype=dtype)
+    matrix[sample_index[rows], marker_index[rows]] = values[rows]
+    return matrix
+
+
+class PackedGenotypeMatrix:
+    """Samples x markers genotypes of a cohort at 2 bits per genotype.
+
+    Each marker has two alleles; a genotype is stored as the dosage of the second one (0, 1, 2)
+    or MISSING. Genotypes with a third allele count as missing. Read counts can be kept alongside
+    in uint16 or uint32 samples x markers arrays. All arrays can be memory-mapped from disk.
+    """
+
+    def __init__(self, samples, markers, alleles, packed, reads=None):
+        self.samples = np.asarray(samples)
+        self.markers = np.asarray(markers)
+        self.alleles = np.asarray(alleles)  # markers x 2: first (usually major) and second allele
+        self.packed = packed
+        self.reads = dict(reads or {})
+        self._sample_index = None
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame, samples=None, markers=None, edits=None, genotype_codes=None, read_columns=()):
+        """Build the matrix from report rows, with genotype edits keyed by (sample, marker) applied."""
+        with span("pack_genotypes", rows=len(data)):
+            if samples is None:
+                samples = data['SampleName'].drop_duplicates().to_numpy()
+            if markers is None:
+                markers = data['Target ID'].drop_duplicates().to_numpy()
+            if genotype_codes is None:
+                genotype_codes = encode_genotypes(data['Genotype'])
+            samples, markers = np.asarray(samples).astype(str), np.asarray(markers).astype(str)
+
+            codes = genotype_matrix(data, samples, markers, edits, genotype_codes)
+            first, second = major_minor_alleles(codes)
+            single = second == ''
+            dosages = encode_dosages(codes, list(zip(np.where(single, 'A', first), np.where(single, 'C', second))))
+            # A marker without a second allele only has calls homozygous for the first
+            dosages[:, single] = np.where(codes[:, single] == MISSING_CODE, NA_DOSAGE, 0)
+            packed = pack(np.where(dosages < 0, MISSING, dosages).astype(np.uint8))
+            del codes, dosages
+
+            reads = {}
+            if read_columns:
+                sample_index = pd.Index(samples).get_indexer(data['SampleName'].astype(str))
+                marker_index = pd.Index(markers).get_indexer(data['Target ID'].astype(str))
+                rows = np.flatnonzero((sample_index >= 0) & (marker_index >= 0))[::-1]
+                for column in read_columns:
+                    values = data[column].fillna(0).to_numpy()
+                    dtype = np.uint16 if len(values) == 0 or values.max() <= np.iinfo(np.uint16).max else np.uint32
+                    reads[column] = _pivot(values.astype(dtype), sample_index, marker_index, rows, (len(samples), len(markers)), dtype)
+            return cls(samples, markers, np.stack([first, second], axis=1), packed, reads)
+
+    @classmethod
+    def from_store(cls, store: GenotypeStore, edits=None, read_columns=()):
+        """Build the matrix from a loaded run."""
+        return cls.from_data(store.data, store.samples(), edits=edits, genotype_codes=store.genotype_codes, read_columns=read_columns)
+
+    @property
+    def n_samples(self):
+        return len(self.samples)
+
+    @property
+    def n_markers(self):
+        return len(self.markers)
+
+    @property
+    def nbytes(self):
+        arrays = [self.samples, self.markers, self.alleles, self.packed] + list(self.reads.values())
+        return int(sum(array.nbytes for array in arrays))
+
+    def sample_position(self, sample):
+        if self._sample_index is None:
+            self._sample_index = pd.Index(self.samples)
+        return self._sample_index.get_loc(sample)
+
+    def states(self, start=0, stop=None) -> np.ndarray:
+        """Return the 2-bit states of a range of samples as a samples x markers uint8 matrix."""
+        return unpack(self.packed[start:stop], self.n_markers)
+
+    def dosages(self, alleles=None, start=0, stop=None) -> np.ndarray:
+        """Return int8 dosages of a range of samples; NA_DOSAGE marks missing genotypes.
+
+        Without alleles the second allele of each marker is counted. With (other allele, counted
+        allele) per marker, e.g. from a reference, the dosages are flipped where the reference
+        counts the first allele, and NA_DOSAGE where its alleles do not match the marker.
+        """
+        states = self.states(start, stop)
+        dosages = np.where(states == MISSING, NA_DOSAGE, states).astype(np.int8)
+        if alleles is None:
+            return dosages
+        other, counted = (np.asarray(column).astype(str) for column in zip(*alleles))
+        first, second = self.alleles[:, 0], self.alleles[:, 1]
+        # A marker seen with one base only matches any reference that has that base
+        keep = (other == first) & ((counted == second) | (second == ''))
+        flip = (counted == first) & ((other == second) | (second == ''))
+        flipped = np.where(dosages == NA_DOSAGE, NA_DOSAGE, 2 - dosages)
+        return np.where(keep, dosages, np.where(flip, flipped, NA_DOSAGE)).astype(np.int8)
+
+    def sample_stats(self) -> pd.DataFrame:
+        """Return call rate and heterozygous fraction of every sample, counted on the packed bytes."""
+        called = _CALLED[self.packed].sum(axis=1, dtype=np.int64)
+        heterozygous = _HETEROZYGOUS[self.packed].sum(axis=1, dtype=np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame({
+                'SampleName': self.samples,
+                'called': called,
+                'call_rate': called / max(self.n_markers, 1),
+                'heterozygous_fraction': heterozygous / called,
+            })
+
+    def marker_stats(self) -> pd.DataFrame:
+        """Return call rate, second-allele frequency and heterozygous fraction of every marker."""
+        counts = np.zeros((MISSING + 1, self.n_markers), dtype=np.int64)
+        for start in range(0, self.n_samples, BLOCK_SAMPLES):
+            states = self.states(start, start + BLOCK_SAMPLES)
+            for state in range(MISSING + 1):
+                counts[state] += (states == state).sum(axis=0)
+        called = counts[:MISSING].sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame({
+                'Target ID': self.markers,
+                'allele1': self.alleles[:, 0],
+                'allele2': self.alleles[:, 1],
+                'called': called,
+                'call_rate': called / max(self.n_samples, 1),
+                'allele2_frequency': (counts[1] + 2 * counts[2]) / (2 * called),
+                'heterozygous_fraction': counts[1] / called,
+            })
+
+    def concordance(self, sample_a, sample_b):
+        """Return (markers called in both samples, markers with the same genotype) for two samples."""
+        a, b = (self.states(i, i + 1)[0] for i in (self.sample_position(sample_a), self.sample_position(sample_b)))
+        both = (a != MISSING) & (b != MISSING)
+        return int(both.sum()), int((both & (a == b)).sum())
+
+    def save(self, directory):
+        """Write the matrix as .npy files that load() can memory-map."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "genotypes.npy"), np.ascontiguousarray(self.packed))
+        np.save(os.path.join(directory, "samples.npy"), self.samples.astype(str))
+        np.save(os.path.join(directory, "markers.npy"), self.markers.astype(str))
+        np.save(os.path.join(directory, "alleles.npy"), self.alleles.astype(str))
+        reads = {}
+        for column, values in self.reads.items():
+            reads[column] = f"reads_{column.lower().replace(' ', '_')}.npy"
+            np.save(os.path.join(directory, reads[column]), values)
+        with open(os.path.join(directory, "matrix.json"), 'w') as f:
+            json.dump({'n_samples': self.n_samples, 'n_markers': self.n_markers, 'reads': reads}, f, indent=1)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved matrix; with mmap the genotypes and read counts stay on disk until used."""
+        try:
+            with open(os.path.join(directory, "matrix.json")) as f:
+                meta = json.load(f)
+            mode = 'r' if mmap else None
+            packed = np.load(os.path.join(directory, "genotypes.npy"), mmap_mode=mode)
+            samples = np.load(os.path.join(directory, "samples.npy"))
+            markers = np.load(os.path.join(directory, "markers.npy"))
+            alleles = np.load(os.path.join(directory, "alleles.npy"))
+            reads = {column: np.load(os.path.join(directory, name), mmap_mode=mode) for column, name in meta['reads'].items()}
+        except Exception as e:
+            raise Exception(f"Failed to load genotype matrix from {directory}: {str(e)}")
+        if packed.shape != (meta['n_samples'], -(-meta['n_markers'] // GENOTYPES_PER_BYTE)) or len(markers) != meta['n_markers']:
+            raise Exception(f"Genotype matrix in {directory} is incomplete.")
+        return cls(samples, markers, alleles, packed, reads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the genotypes of run reports into a memory-mappable matrix.")
+    parser.add_argument("reports", nargs="+", help="run report CSV files, merged like Load Data does")
+    parser.add_argument("output", help="directory for the matrix files")
+    parser.add_argument("--reads", action="store_true", help=f"also keep {', '.join(READ_COLUMNS)}")
+    args = parser.parse_args()
+
+    dataset = MergedDataset()
+    for path in args.reports:
+        dataset.add_run(dataset.name_run(path), load_data(path, columns=None))
+    matrix = PackedGenotypeMatrix.from_store(GenotypeStore(dataset.data), read_columns=READ_COLUMNS if args.reads else ())
+    matrix.save(args.output)
+    print(f"Packed {matrix.n_samples} samples x {matrix.n_markers} markers into {matrix.nbytes / 1e6:.1f} MB in {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Set to a file name to record every span and write it as Chrome trace-event JSON on exit
+# (open it in chrome://tracing or https://ui.perfetto.dev)
+TRACE_ENV = "DATA_ANALYZER_TRACE"
+
+RECENT_SPANS = 500  # Spans kept for the performance panel
+
+_enabled = False
+_recent = deque(maxlen=RECENT_SPANS)
+_trace_events = []
+_trace_path = None
+_lock = threading.Lock()
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def resident_bytes():
+    """Return the resident set size of the process in bytes, or None where it cannot be read cheaply."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Span:
+    __slots__ = ('name', 'rows', 'args', '_start', '_rss')
+
+    def __init__(self, name, rows, args):
+        self.name = name
+        self.rows = rows
+        self.args = args
+
+    def count(self, rows):
+        """Record how many rows the operation handled."""
+        self.rows = rows
+
+    def __enter__(self):
+        self._rss = resident_bytes()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        rss = resident_bytes()
+        record = {
+            'name': self.name,
+            'start': self._start,
+            'seconds': end - self._start,
+            'rows': self.rows,
+            'memory_delta_mb': None if rss is None or self._rss is None else (rss - self._rss) / 1e6,
+            'thread': threading.current_thread().name,
+            'error': exc_type.__name__ if exc_type is not None else None,
+        }
+        if self.args:
+            record.update(self.args)
+        with _lock:
+            _recent.append(record)
+            if _trace_path is not None:
+                _trace_events.append((record, threading.get_ident()))
+        return False
+
+
+class _NullSpan:
+    """Returned while recording is off, so an instrumented call costs one flag check."""
+    __slots__ = ()
+
+    def count(self, rows):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, rows=None, **args):
+    """Time a block: with span("load_data") as s: ...; s.count(len(data))."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, rows, args)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording, unless a trace file is being written."""
+    global _enabled
+    _enabled = _trace_path is not None
+
+
+def is_enabled():
+    return _enabled
+
+
+def recent():
+    """Return the most recent spans, oldest first."""
+    with _lock:
+        return list(_recent)
+
+
+def write_trace(path=None):
+    """Write the recorded spans as Chrome trace-event JSON."""
+    path = path or _trace_path
+    with _lock:
+        events = list(_trace_events)
+    origin = min((record['start'] for record, _ in events), default=0.0)
+    trace = {'traceEvents': [
+        {
+            'name': record['name'],
+            'ph': 'X',
+            'ts': (record['start'] - origin) * 1e6,
+            'dur': record['seconds'] * 1e6,
+            'pid': os.getpid(),
+            'tid': thread_id,
+            'args': {key: value for key, value in record.items() if key not in ('name', 'start', 'seconds')},
+        }
+        for record, thread_id in events
+    ]}
+    with open(path, 'w') as f:
+        json.dump(trace, f)
+    return path
+
+
+def _start_trace_from_environment():
+    global _trace_path
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        _trace_path = path
+        enable()
+        atexit.register(write_trace)
+
+
+_start_trace_from_environment()
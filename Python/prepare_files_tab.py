@@ -1,27 +1,57 @@
-from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QLineEdit, QTextEdit, QPushButton, QFileDialog, QComboBox, QMessageBox, QToolButton, QToolTip
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QWidget, QGridLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QComboBox, QMessageBox, QToolButton, QToolTip, QProgressBar, QTableView
+from PyQt5.QtCore import Qt, QThreadPool, QTimer
 from PyQt5.QtGui import QIcon
 from datetime import datetime
+import os
 import pandas as pd
-from threads import LoadDataThread, AnalyzeDataThread
+from threads import LoadDataThread, StreamReportThread, SaveReportThread
+from jobs import AnalysisJob
+from genotype_store import GenotypeStore
+from sample_cache import SampleCache
+from business_logic import CSV_ENGINE_NAMES, create_appearance_input
+from recaller import recall_disagreements
+from qc_rules import run_qc_rules, marker_messages
+from table_model import DataFrameModel
+from log_console import LogConsole
+from edit_journal import EditJournal
+from config import LOG_MAX_LINES, LOG_MIRROR_FILE, SAVE_FORMAT
+from report_writer import EditOverlay
+from report_merge import MergedDataset, report_columns, run_name
+from watcher import ReportWatcher
+from perf import span
 
 class PrepareFilesTab(QWidget):
     def __init__(self):
         super().__init__()
         self.data = None  # Data loaded from CSV
+        self.store = None  # Genotype store indexed on (SampleName, Target ID)
+        self.dataset = MergedDataset()  # Every loaded run, merged into one row per (SampleName, Target ID)
+        self.watcher = None  # Ingests new reports from DATA_DIRECTORY while watching is on
+        self.sample_cache = None  # Per-sample rows, genotypes, dosages and QC flags of recently viewed samples
+        self.save_thread = None  # Background writer for "Save Changes to CSV"
         self.sample_dropdown = None  # Dropdown for sample selection
-        self.is_loading = False  # To prevent concurrent clicks
+        self.thread_pool = QThreadPool.globalInstance()  # Runs analysis jobs, several samples at once
+        self.analysis_jobs = {}  # Running analysis job per sample
         self.genotype_entries = {}  # To store genotype entries for markers
         self.maf_labels = {}  # To store MAF labels for markers
         self.original_genotypes = {}  # To store original genotypes for comparison
-        self.modified_genotypes = {}  # To track modified genotypes
+        self.modified_genotypes = EditOverlay()  # To track modified genotypes per (sample, marker)
         # self.log_file = "genotype_changes_log.txt"  # Log file for genotype changes
         
         # Prepare timestamp for filenames
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        # Log file with timestamp
-        self.log_file = f"genotype_changes_log_{self.timestamp}.txt"
+        # Journal of genotype changes with timestamp, replayable onto the raw run report
+        self.log_file = f"genotype_changes_log_{self.timestamp}.jsonl"
+        self.edit_journal = EditJournal(self.log_file)
+        QApplication.instance().aboutToQuit.connect(self.edit_journal.close)
+        # The last edits before a pause reach the disk within fsync_interval, not only at the next edit
+        self.journal_timer = QTimer(self)
+        self.journal_timer.setInterval(int(self.edit_journal.fsync_interval * 1000))
+        self.journal_timer.timeout.connect(self.edit_journal.sync_pending)
+        self.journal_timer.start()
+        self.stopped_watchers = []  # Watchers still winding down after being switched off
+        QApplication.instance().aboutToQuit.connect(self.shutdown_watchers)
         
         self.markers_of_interest = ["rs312262906", "rs2196051", "rs1495085", "rs2789823", "rs7148809", "rs310644"]  # Markers of interest
         self.init_ui()
@@ -48,9 +78,16 @@ class PrepareFilesTab(QWidget):
         self.analyze_button.clicked.connect(self.on_analyze_data)
         layout.addWidget(self.analyze_button, 0, 3)
 
-        # Text output for logs and messages
-        self.text_output_prepare = QTextEdit()
-        self.text_output_prepare.setReadOnly(True)
+        # Forget the loaded runs and edits, so the next load starts a new dataset
+        self.clear_button = QPushButton("Clear Data")
+        self.clear_button.clicked.connect(self.on_clear_data)
+        layout.addWidget(self.clear_button, 0, 4)
+
+        # Ingest new run reports from the data directory into derived files as they arrive
+        self.watch_button = QPushButton("Watch Data Directory")
+        self.watch_button.setCheckable(True)
+        self.watch_button.toggled.connect(self.on_watch_toggled)
+        layout.addWidget(self.watch_button, 0, 5)
 
         # Create editable genotype fields and MAF labels for each marker
         for i, marker in enumerate(self.markers_of_interest):
@@ -80,28 +117,68 @@ class PrepareFilesTab(QWidget):
                 # Button to filter markers by MAF between 65 and 85
         self.filter_maf_button = QPushButton("List Markers with MAF > 65 and < 85")
         self.filter_maf_button.clicked.connect(self.list_markers_by_maf)
-        layout.addWidget(self.filter_maf_button, len(self.markers_of_interest) + 1, 0, 1, 6)
+        layout.addWidget(self.filter_maf_button, len(self.markers_of_interest) + 1, 0, 1, 3)
+
+        # Button to re-call genotypes from the A/C/G/T read counts
+        self.recall_button = QPushButton("Re-call Genotypes from Reads")
+        self.recall_button.clicked.connect(self.recall_from_reads)
+        layout.addWidget(self.recall_button, len(self.markers_of_interest) + 1, 3, 1, 3)
 
         # Save changes button to save modified data to CSV
         self.save_button = QPushButton("Save Changes to CSV")
         self.save_button.clicked.connect(self.save_to_csv)
-        layout.addWidget(self.save_button, len(self.markers_of_interest) + 2, 0, 1, 6)
+        layout.addWidget(self.save_button, len(self.markers_of_interest) + 2, 0, 1, 3)
+
+        # Button to run the marker QC rules over the whole run
+        self.qc_rules_button = QPushButton("Run QC Rules")
+        self.qc_rules_button.clicked.connect(self.run_qc_rules)
+        layout.addWidget(self.qc_rules_button, len(self.markers_of_interest) + 2, 3, 1, 3)
 
         # Button to create appearance input file
         self.create_file_button = QPushButton("Create Appearance Input File")
         self.create_file_button.clicked.connect(self.create_analysis_input_file)
-        layout.addWidget(self.create_file_button, len(self.markers_of_interest) +3, 0, 1, 6)
+        layout.addWidget(self.create_file_button, len(self.markers_of_interest) +3, 0, 1, 3)
+
+        # Button to create one appearance input file for all samples
+        self.create_batch_file_button = QPushButton("Create Appearance Input File (All Samples)")
+        self.create_batch_file_button.clicked.connect(self.create_batch_analysis_input_file)
+        layout.addWidget(self.create_batch_file_button, len(self.markers_of_interest) + 3, 3, 1, 3)
+
+        # Button to process a report too large to load, sample by sample
+        self.stream_button = QPushButton("Stream Large Report")
+        self.stream_button.clicked.connect(self.on_stream_report)
+        layout.addWidget(self.stream_button, len(self.markers_of_interest) + 4, 0, 1, 3)
+
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar, len(self.markers_of_interest) + 4, 3, 1, 3)
 
-        # Text output area for logs and messages
-        self.text_output_prepare = QTextEdit()
-        self.text_output_prepare.setReadOnly(True)
+        # Text output area for logs and messages, batched and bounded so bulk logging does not stall the UI
+        self.text_output_prepare = LogConsole(max_lines=LOG_MAX_LINES, mirror_path=LOG_MIRROR_FILE)
 
          # Spanning across columns
 
         # Add the output text area below the genotype fields and span across all columns
         # layout.addWidget(self.text_output_prepare, len(self.markers_of_interest) + 2, 0, 1, 6)
 
-        layout.addWidget(self.text_output_prepare, len(self.markers_of_interest) + 4, 0, 1, 6)
+        # Marker table with a column filter ("70", ">65" or "65-85" for MAF)
+        self.marker_filter_column = QComboBox()
+        self.marker_filter_column.addItems(["Target ID", "Genotype", "Maj Allele Freq"])
+        self.marker_filter_column.currentIndexChanged.connect(self.on_marker_filter_changed)
+        layout.addWidget(self.marker_filter_column, len(self.markers_of_interest) + 5, 0)
+
+        self.marker_filter = QLineEdit()
+        self.marker_filter.setPlaceholderText("Filter markers...")
+        self.marker_filter.textChanged.connect(self.on_marker_filter_changed)
+        layout.addWidget(self.marker_filter, len(self.markers_of_interest) + 5, 1, 1, 5)
+
+        self.marker_table_model = DataFrameModel()
+        self.marker_table = QTableView()
+        self.marker_table.setModel(self.marker_table_model)
+        self.marker_table.setSortingEnabled(True)
+        self.marker_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.marker_table, len(self.markers_of_interest) + 6, 0, 1, 6)
+
+        layout.addWidget(self.text_output_prepare, len(self.markers_of_interest) + 7, 0, 1, 6)
 
 
 
@@ -135,118 +212,45 @@ class PrepareFilesTab(QWidget):
 
     def create_analysis_input_file(self, data: pd.DataFrame):
         """Create input file for appearance analysis."""
-        header = [
-            "sampleid", "rs312262906_A", "rs11547464_A", "rs885479_T", "rs1805008_T", "rs1805005_T", "rs1805006_A", 
-            "rs1805007_T", "rs1805009_C", "rs201326893_A", "rs2228479_A", "rs1110400_C", "rs28777_C", "rs16891982_C", 
-            "rs12821256_G", "rs4959270_A", "rs12203592_T", "rs1042602_T", "rs1800407_A", "rs2402130_G", "rs12913832_T", 
-            "rs2378249_C", "rs12896399_T", "rs1393350_T", "rs683_G", "rs3114908_T", "rs1800414_C", "rs10756819_G", 
-            "rs2238289_C", "rs17128291_C", "rs6497292_C", "rs1129038_G", "rs1667394_C", "rs1126809_A", "rs1470608_A", 
-            "rs1426654_G", "rs6119471_C", "rs1545397_T", "rs6059655_T", "rs12441727_A", "rs3212355_A", "rs8051733_C"
-        ]
+        if self.data is None:
+            QMessageBox.critical(self, "Error", "No data loaded to create appearance input file.")
+            return
 
         sample_name = self.sample_dropdown.currentText()
 
-        # Create DataFrame for output
-        output_data = pd.DataFrame(columns=header)
-        output_data.loc[0, 'sampleid'] = sample_name
-
-        transformations = {
-        'rs312262906_A': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
-        'rs11547464_A': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs885479_T': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs1805008_T': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
-        'rs1805005_T': {'G/G': '0', 'GG': '0', 'T/T': '2', 'TT': '2', 'G/T': '1', 'GT': '1', 'T/G': '1', 'TG': '1'},
-        'rs1805006_A': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
-        'rs1805007_T': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
-        'rs1805009_C': {'G/G': '0', 'GG': '0', 'C/C': '2', 'CC': '2', 'G/C': '1', 'GC': '1', 'C/G': '1', 'CG': '1'},
-        'rs201326893_A': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
-        'rs2228479_A': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs1110400_C': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
-        'rs28777_C': {'A/A': '0', 'AA': '0', 'C/C': '2', 'CC': '2', 'A/C': '1', 'AC': '1', 'C/A': '1', 'CA': '1'},
-        'rs16891982_C': {'G/G': '0', 'GG': '0', 'C/C': '2', 'CC': '2', 'G/C': '1', 'GC': '1', 'C/G': '1', 'CG': '1'},
-        'rs12821256_G': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
-        'rs4959270_A': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
-        'rs12203592_T': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
-        'rs1042602_T': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
-        'rs1800407_A': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
-        'rs2402130_G': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs12913832_T': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs2378249_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
-        'rs12896399_T': {'G/G': '0', 'GG': '0', 'T/T': '2', 'TT': '2', 'G/T': '1', 'GT': '1', 'T/G': '1', 'TG': '1'},
-        'rs1393350_T': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs683_G': {'A/A': '0', 'AA': '0', 'C/C': '2', 'CC': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
-        'rs3114908_T': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
-        'rs1800414_C': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
-        'rs10756819_G': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
-        'rs2238289_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
-        'rs17128291_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
-        'rs6497292_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
-        'rs1129038_G': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
-        'rs1667394_C': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
-        'rs1126809_A': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs1470608_A': {'G/G': '0', 'GG': '0', 'T/T': '2', 'TT': '2', 'G/T': '1', 'GT': '1', 'T/G': '1', 'TG': '1'},
-        'rs1426654_G': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs6119471_C': {'C/C': '0', 'CC': '0', 'G/G': '2', 'GG': '2', 'C/G': '1', 'CG': '1', 'G/C': '1', 'GC': '1'},
-        'rs1545397_T': {'A/A': '0', 'AA': '0', 'T/T': '2', 'TT': '2', 'A/T': '1', 'AT': '1', 'T/A': '1', 'TA': '1'},
-        'rs6059655_T': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs12441727_A': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-        'rs3212355_A': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
-        'rs8051733_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
-    
-        # Default transformation for unknown genotypes
-        './.': 'NA', 'C': 'NA', 'A': 'NA', 'G': 'NA', 'T': 'NA'
-        }
-
-        # Fill in the genotype data
-        for column in header[1:]:  # Skip the first 'sampleid' column
-            marker = column.split('_')[0]
-
-            # Check if the marker has a modified genotype, else use the original data
-            if marker in self.modified_genotypes:
-                original_genotype = self.modified_genotypes[marker]
-
-                # Apply the transformation if the marker is in the transformation dictionary
-                if column in transformations and original_genotype in transformations[column]:
-                    output_data.loc[0, column] = transformations[column][original_genotype]
-                else:
-                    output_data.loc[0, column] = 'NA'  # Handle missing transformations
+        # The cached view already holds this sample's dosages with its genotype edits applied
+        with span("create_analysis_input_file", sample=sample_name):
+            output_data = self.sample_view(sample_name).dosages.to_frame().T
 
-            else:
-                # Use the original genotype from the data
-                row = self.data[self.data['Target ID'] == marker]
-                if not row.empty:
-                    original_genotype = row.iloc[0]['Genotype']
-                    # Apply transformation if needed
-                    if column in transformations and original_genotype in transformations[column]:
-                        output_data.loc[0, column] = transformations[column][original_genotype]
-                    else:
-                        output_data.loc[0, column] = 'NA'  # Handle missing transformations
-                else:
-                    output_data.loc[0, column] = 'NA'
-
-        # # Save to CSV with a timestamp, consistent with the other CSV saving logic
-        # timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        # filename = os.path.join(DATA_DIRECTORY_INPUT, f"{sample_name}_{analysis_type}_input_{timestamp}.csv")
-        # output_data.to_csv(filename, index=False)
-        
-        appearance_file_path = f"{sample_name}_appearance_input_file_{self.timestamp}.csv"
-        output_data.to_csv(appearance_file_path, index=False)
+            # # Save to CSV with a timestamp, consistent with the other CSV saving logic
+            # timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # filename = os.path.join(DATA_DIRECTORY_INPUT, f"{sample_name}_{analysis_type}_input_{timestamp}.csv")
+            # output_data.to_csv(filename, index=False)
+
+            appearance_file_path = f"{sample_name}_appearance_input_file_{self.timestamp}.csv"
+            output_data.to_csv(appearance_file_path, index=False)
         self.display_message(f"Appearance data saved to {appearance_file_path}.")
 
+    def create_batch_analysis_input_file(self):
+        """Create one appearance input file covering every sample in the loaded run."""
+        if self.data is None:
+            QMessageBox.critical(self, "Error", "No data loaded to create appearance input file.")
+            return
+
+        edits = self.modified_genotypes.as_dict()
+        output_data = create_appearance_input(self.data, self.store.samples(), edits, self.store.genotype_codes)
+
+        appearance_file_path = f"all_samples_appearance_input_file_{self.timestamp}.csv"
+        with span("write_appearance_input", rows=len(output_data)):
+            output_data.to_csv(appearance_file_path, index=False)
+        self.display_message(f"Appearance data for {len(output_data)} samples saved to {appearance_file_path}.")
+
 
 
     def show_info(self, marker):
-            """Shows a message box with detailed information for each marker."""
-            info_text = {
-                "rs312262906": "This is an indel marker and you need to check the genotype yourself in IGV.",
-                "rs2196051": "MAF <40 - GG?, 40< MAF <80 - AG, > 80 AA.",
-                "rs1495085": "80 < MAF - homozygous.",
-                "rs2789823": "80 < MAF - homozygous.",
-                "rs7148809": "80 < MAF - homozygous.",
-                "rs310644": "C could be lost, don't trust TT."
-            }
-
-            message = info_text.get(marker, "No additional information available for this marker.")
+            """Shows a message box with the QC rules written for a marker."""
+            messages = marker_messages(marker)
+            message = "\n".join(messages) if messages else "No additional information available for this marker."
             QMessageBox.information(self, f"Information for {marker}", message)
 
 
@@ -259,135 +263,275 @@ class PrepareFilesTab(QWidget):
 
     def on_genotype_change(self, marker):
             """Handle genotype change detection when the user finishes editing."""
+            if self.data is None:
+                return
             new_genotype = self.genotype_entries[marker].text()
             original_genotype = self.original_genotypes.get(marker, new_genotype)  # Fallback to new_genotype if not set
 
             # Check if there's an actual change (ignore if the genotype hasn't changed)
             if original_genotype != new_genotype:
-                # Store the new genotype in the modified_genotypes dictionary
-                self.modified_genotypes[marker] = new_genotype
+                # Store the new genotype in the modified_genotypes overlay
+                sample = self.sample_dropdown.currentText()
+                self.modified_genotypes.set(sample, marker, new_genotype)
+                self.sample_cache.invalidate(sample)
 
                 # Log the change from original to new
                 self.display_message(f"Genotype for {marker} changed from {original_genotype} to {new_genotype}.")
 
-                # Log change in the log file
-                with open(self.log_file, 'a') as log:
-                    log.write(f"Genotype for {marker} changed from {original_genotype} to {new_genotype}.\n")
+                # Log change in the edit journal
+                self.edit_journal.record(sample, marker, original_genotype, new_genotype)
 
                 # Update the original_genotypes to reflect the current state
                 self.original_genotypes[marker] = new_genotype
 
     def save_to_csv(self):
-        """Save modified genotypes to a CSV file."""
+        """Save the run with the modified genotypes merged in, in a background thread."""
         if self.data is not None:
-            modified_data = self.data.copy()
-
-            # Get the selected sample from the dropdown
-            sample = self.sample_dropdown.currentText()
-
-            # Ensure we update the correct rows based on both 'SampleName' and 'Target ID'
-            for marker, genotype in self.modified_genotypes.items():
-                # Update the row where both 'SampleName' and 'Target ID' match
-                mask = (modified_data['SampleName'] == sample) & (modified_data['Target ID'] == marker)
-                modified_data.loc[mask, 'Genotype'] = genotype
-
-            # Save to a CSV file with a timestamp
-            modified_file_path = f"modified_input_file_{self.timestamp}.csv"
-            modified_data.to_csv(modified_file_path, index=False)
-            self.display_message(f"Modified data saved to {modified_file_path}.")
+            if self.save_thread is not None and self.save_thread.isRunning():
+                self.display_message("A save is already in progress.")
+                return
+
+            # Only the edited rows are merged in while writing; the loaded run is not copied
+            positions, genotypes = self.modified_genotypes.row_edits(self.store)
+
+            # Save to a file with a timestamp
+            modified_file_path = f"modified_input_file_{self.timestamp}.{SAVE_FORMAT}"
+            self.save_button.setEnabled(False)
+            self.save_thread = SaveReportThread(self.data, modified_file_path, positions, genotypes, report_columns(self.data))
+            self.save_thread.progress.connect(self.progress_bar.setValue)
+            self.save_thread.report_saved.connect(lambda path: self.display_message(f"Modified data saved to {path}."))
+            self.save_thread.error_occurred.connect(self.on_error)
+            self.save_thread.finished.connect(lambda: self.save_button.setEnabled(True))
+            self.save_thread.start()
         else:
             QMessageBox.critical(self, "Error", "No data loaded to save.")
 
     def on_load_data(self):
-        filepath, _ = QFileDialog.getOpenFileName(self, "Open File", "", "CSV Files (*.csv);;All Files (*)")
-        if filepath:
-            self.load_thread = LoadDataThread(filepath)
+        # Several reports can be selected; they are added to the runs already loaded
+        filepaths, _ = QFileDialog.getOpenFileNames(self, "Open Files", "", "CSV Files (*.csv);;All Files (*)")
+        if filepaths:
+            self.load_button.setEnabled(False)
+            self.clear_button.setEnabled(False)
+            self.load_thread = LoadDataThread(filepaths, self.dataset)
             self.load_thread.data_loaded.connect(self.on_data_loaded)
             self.load_thread.error_occurred.connect(self.on_error)
+            self.load_thread.finished.connect(lambda: self.load_button.setEnabled(True))
+            self.load_thread.finished.connect(lambda: self.clear_button.setEnabled(True))
             self.load_thread.start()
 
-    def on_data_loaded(self, data: pd.DataFrame):
-        self.data = data
-        self.populate_sample_dropdown()
-        self.display_message("Data loaded successfully.")
+    def on_watch_toggled(self, checked):
+        if checked:
+            self.watcher = ReportWatcher(log=self.display_message)
+            self.watcher.start()
+        else:
+            self.stop_watcher()
+
+    def stop_watcher(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.stopped_watchers.append(self.watcher)
+            self.watcher = None
+
+    def shutdown_watchers(self):
+        """On quit, wait until the watcher workers finished the reports they are writing and their processes exited."""
+        self.stop_watcher()
+        for watcher in self.stopped_watchers:
+            watcher.join()
+        self.stopped_watchers = []
+
+    def on_clear_data(self):
+        self.cancel_analysis_jobs()
+        self.dataset = MergedDataset()
+        self.store = None
+        self.data = None
+        self.sample_cache = None
+        self.original_genotypes = {}
+        self.modified_genotypes = EditOverlay()
+        self.marker_table_model.set_data(pd.DataFrame())
+        self.sample_dropdown.clear()
+        for marker in self.markers_of_interest:
+            self.genotype_entries[marker].setText("")
+            self.maf_labels[marker].setText("MAF: N/A")
+        self.display_message("Loaded runs cleared.")
+
+    def on_stream_report(self):
+        filepath, _ = QFileDialog.getOpenFileName(self, "Open File", "", "CSV Files (*.csv);;All Files (*)")
+        if filepath:
+            self.stream_button.setEnabled(False)
+            self.progress_bar.setValue(0)
+            self.display_message(f"Streaming {filepath}...")
+            self.stream_thread = StreamReportThread(filepath)
+            self.stream_thread.progress.connect(self.progress_bar.setValue)
+            self.stream_thread.report_streamed.connect(self.on_report_streamed)
+            self.stream_thread.error_occurred.connect(self.on_error)
+            self.stream_thread.finished.connect(lambda: self.stream_button.setEnabled(True))
+            self.stream_thread.start()
+
+    def on_report_streamed(self, appearance: pd.DataFrame, qc: pd.DataFrame, n_rows: int):
+        self.progress_bar.setValue(100)
+        appearance_file_path = f"streamed_appearance_input_file_{self.timestamp}.csv"
+        qc_file_path = f"streamed_qc_summary_{self.timestamp}.csv"
+        appearance.to_csv(appearance_file_path, index=False)
+        qc.to_csv(qc_file_path, index=False)
+        self.display_message(f"Streamed {n_rows} rows of {len(appearance)} samples.")
+        self.display_message(f"Appearance data saved to {appearance_file_path}, QC summary saved to {qc_file_path}.")
+
+    def on_data_loaded(self, store: GenotypeStore):
+        self.cancel_analysis_jobs()
+        with span("on_data_loaded", rows=len(store.data)):
+            self.store = store
+            self.data = store.data
+            # Edits are keyed by (sample, marker), so they stay valid when more runs are merged in
+            self.sample_cache = SampleCache(store, self.markers_of_interest)
+            self.populate_sample_dropdown()
+        for filepath, run in self.load_thread.run_names.items():
+            if run != run_name(filepath):
+                self.display_message(f"A different report named {os.path.basename(filepath)} is already loaded; {filepath} was loaded as run {run}.")
+        runs = f"{len(self.dataset.runs())} run(s), {len(self.store.samples())} samples"
+        if self.load_thread.from_cache:
+            self.display_message(f"Data loaded successfully (from cache): {runs}.")
+        else:
+            engines = sorted({CSV_ENGINE_NAMES[source] for source in self.load_thread.sources.values() if source != 'cache'})
+            self.display_message(f"Data loaded successfully (parsed with the {', '.join(engines)}): {runs}.")
 
     def populate_sample_dropdown(self):
         if self.data is not None and 'SampleName' in self.data.columns:
-            unique_samples = self.data['SampleName'].unique()
+            unique_samples = self.store.samples()
             self.sample_dropdown.clear()
             self.sample_dropdown.addItems(unique_samples)
 
+    def sample_view(self, sample_name):
+        """Return the cached view of a sample, built with its genotype edits on first use."""
+        with span("sample_view", sample=sample_name):
+            return self.sample_cache.get(sample_name, self.modified_genotypes.for_sample(sample_name))
+
     def populate_genotype_fields(self, sample_name):
         if self.data is not None:
-            sample_filtered = self.data[self.data['SampleName'] == sample_name]
+            markers = self.sample_view(sample_name).markers
+            with span("populate_genotype_fields", rows=len(markers), sample=sample_name):
+                for marker in self.markers_of_interest:
+                    if marker in markers:
+                        genotype, maf = markers[marker]
 
-            for marker in self.markers_of_interest:
-                row = sample_filtered[sample_filtered['Target ID'] == marker]
-                if not row.empty:
-                    genotype = row.iloc[0]['Genotype']
-                    maf = row.iloc[0]['Maj Allele Freq']
+                        # Set the genotype value in the corresponding QLineEdit field
+                        self.genotype_entries[marker].setText(genotype)
 
-                    # Set the genotype value in the corresponding QLineEdit field
-                    self.genotype_entries[marker].setText(genotype)
+                        # Store the original genotype for comparison later
+                        self.original_genotypes[marker] = genotype
 
-                    # Store the original genotype for comparison later
-                    self.original_genotypes[marker] = genotype
-
-                    # Set the MAF value in the corresponding QLabel field
-                    self.maf_labels[marker].setText(f"MAF: {maf:.2f}%")
-                else:
-                    self.genotype_entries[marker].setText("")
-                    self.maf_labels[marker].setText(f"MAF: N/A")
+                        # Set the MAF value in the corresponding QLabel field
+                        self.maf_labels[marker].setText(f"MAF: {maf:.2f}%")
+                    else:
+                        self.genotype_entries[marker].setText("")
+                        self.maf_labels[marker].setText(f"MAF: N/A")
 
     def on_analyze_data(self):
-        if self.is_loading:
-            return
-        self.is_loading = True
-
         # Get the selected sample from the dropdown
         sample = self.sample_dropdown.currentText()
         if self.data is not None and sample:
             self.populate_genotype_fields(sample)
-            self.analyze_thread = AnalyzeDataThread(self.data, sample, self.genotype_entries)
-            # self.analyze_thread.analysis_completed.connect(self.on_analysis_completed)
-            self.analyze_thread.error_occurred.connect(self.on_error)
-            self.analyze_thread.finished.connect(lambda: setattr(self, 'is_loading', False))
-            self.analyze_thread.start()
+
+            # A newer snapshot of the same sample replaces a running analysis; other samples run side by side
+            if sample in self.analysis_jobs:
+                self.analysis_jobs[sample].cancel()
+
+            view = self.sample_view(sample)
+            job = AnalysisJob(sample, view.rows, view.edits, self.markers_of_interest, view.qc_flags)
+            job.signals.progress.connect(lambda _, percent: self.progress_bar.setValue(percent))
+            job.signals.completed.connect(self.on_analysis_completed)
+            job.signals.cancelled.connect(lambda cancelled_sample: self.display_message(f"Analysis of {cancelled_sample} cancelled."))
+            job.signals.error_occurred.connect(lambda failed_sample, error_msg: self.on_error(f"{failed_sample}: {error_msg}"))
+            for signal in (job.signals.completed, job.signals.cancelled, job.signals.error_occurred):
+                signal.connect(self.forget_analysis_job)
+            self.analysis_jobs[sample] = job
+            self.thread_pool.start(job)
         else:
             QMessageBox.critical(self, "Error", "Data not loaded or no sample provided.")
-            self.is_loading = False
 
-    # def on_analysis_completed(self, result: pd.DataFrame):
-    #     self.display_message(f"Analysis Results:\n{result.to_string(index=False)}")
+    def forget_analysis_job(self, sample, *_):
+        # A cancelled job may finish after its replacement was submitted; only forget the job that sent this
+        job = self.analysis_jobs.get(sample)
+        if job is not None and job.signals is self.sender():
+            del self.analysis_jobs[sample]
+
+    def cancel_analysis_jobs(self):
+        for job in self.analysis_jobs.values():
+            job.cancel()
+
+    def on_analysis_completed(self, sample: str, result: pd.DataFrame):
+        self.display_message(f"Analysis Results for {sample}:\n{result.to_string(index=False)}")
 
     def list_markers_by_maf(self):
         """List all markers with MAF between 65 and 85 in the white area."""
         if self.data is not None:
             # Get the selected sample from the dropdown
             sample = self.sample_dropdown.currentText()
-            sample_filtered = self.data[self.data['SampleName'] == sample]
+            sample_filtered = self.sample_view(sample).rows
 
             # Filter markers with MAF between 65 and 85
-            filtered_markers = sample_filtered[
-                (sample_filtered['Maj Allele Freq'] > 65) &
-                (sample_filtered['Maj Allele Freq'] < 85)
-            ]
+            with span("list_markers_by_maf", rows=len(sample_filtered), sample=sample):
+                filtered_markers = sample_filtered[
+                    (sample_filtered['Maj Allele Freq'] > 65) &
+                    (sample_filtered['Maj Allele Freq'] < 85)
+                ]
 
             if not filtered_markers.empty:
-                self.display_message("Markers with MAF between 65 and 85:")
-                for _, row in filtered_markers.iterrows():
-                    marker = row['Target ID']
-                    genotype = row['Genotype']
-                    maf = row['Maj Allele Freq']
-                    self.display_message(f"Marker: {marker}, Genotype: {genotype}, MAF: {maf:.2f}%")
+                # Show the rows in the marker table; it only renders the rows in view
+                self.marker_table_model.set_data(filtered_markers[['Target ID', 'Genotype', 'Maj Allele Freq']])
+                self.on_marker_filter_changed()
+                self.display_message(f"{len(filtered_markers)} markers with MAF between 65 and 85 listed in the marker table.")
             else:
+                self.marker_table_model.set_data(pd.DataFrame())
                 self.display_message("No markers with MAF between 65 and 85.")
         else:
             self.display_message("No data loaded to list markers.")
 
 
+    def on_marker_filter_changed(self):
+        """Apply the marker table filter to the selected column."""
+        self.marker_table_model.set_filter(self.marker_filter_column.currentText(), self.marker_filter.text())
+
+    def recall_from_reads(self):
+        """Re-call the whole run from read counts and list where it disagrees with the instrument."""
+        if self.data is None:
+            self.display_message("No data loaded to re-call genotypes.")
+            return
+
+        # Compare against the genotypes as they will be saved, with the edits applied
+        row_edits = self.modified_genotypes.row_edits(self.store)
+        with span("recall_disagreements", rows=len(self.data), edited=len(row_edits[0])):
+            disagreements = recall_disagreements(self.data, genotype_codes=self.store.genotype_codes, row_edits=row_edits)
+        recall_file_path = f"recall_disagreements_{self.timestamp}.csv"
+        disagreements.to_csv(recall_file_path, index=False)
+        self.display_message(f"{len(disagreements)} re-called genotypes disagree with the instrument call, saved to {recall_file_path}.")
+
+        sample = self.sample_dropdown.currentText()
+        for _, row in disagreements[disagreements['SampleName'] == sample].iterrows():
+            self.display_message(
+                f"Marker: {row['Target ID']}, Genotype: {row['Genotype']}, Suggested: {row['Suggested Genotype']} "
+                f"(confidence {row['Recall Confidence']:.2f}), MAF: {row['Maj Allele Freq']:.2f}%"
+            )
+
+    def run_qc_rules(self):
+        """Flag every sample and marker of the run against the QC rules."""
+        if self.data is None:
+            self.display_message("No data loaded to run QC rules.")
+            return
+
+        # Flag the genotypes as they will be saved, with the edits applied
+        row_edits = self.modified_genotypes.row_edits(self.store)
+        with span("run_qc_rules", rows=len(self.data), edited=len(row_edits[0])):
+            flags = run_qc_rules(self.data, genotype_codes=self.store.genotype_codes, row_edits=row_edits)
+        flags_file_path = f"qc_flags_{self.timestamp}.csv"
+        flags.to_csv(flags_file_path, index=False)
+        self.display_message(f"{len(flags)} QC flags raised, saved to {flags_file_path}.")
+
+        sample = self.sample_dropdown.currentText()
+        for _, row in flags[flags['SampleName'] == sample].iterrows():
+            self.display_message(f"Marker: {row['Target ID']}, Genotype: {row['Genotype']}, {row['Message']}")
+
     def on_error(self, error_msg: str):
         self.display_message(f"Error: {error_msg}")
 
     def display_message(self, message: str):
-        self.text_output_prepare.append(message)
+        self.text_output_prepare.log(message)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from dosage_encoding import GENOTYPE_CODES, MISSING_CODE, normalize_genotype
+from perf import span
+
+# Thresholds of the low_gq and strand_bias QC rules
+LOW_GQ = 20
+STRAND_BIAS_PERCENT = 10
+
+# Samples and markers called below this rate are counted out in the dashboard summary
+LOW_CALL_RATE = 0.9
+
+# Genotype code -> is the genotype heterozygous
+_HETEROZYGOUS = np.array([genotype[0] != genotype[1] for genotype in GENOTYPE_CODES] + [False])
+
+
+def _aggregate(per_row, key):
+    """Aggregate the per-row columns by sample or marker in one groupby pass."""
+    grouped = per_row.groupby(key, sort=False, observed=True)
+    metrics = grouped.agg(
+        rows=('called', 'size'),
+        called=('called', 'sum'),
+        heterozygous=('heterozygous', 'sum'),
+        median_coverage=('Coverage', 'median'),
+        min_coverage=('Coverage', 'min'),
+        median_gq=('GQ', 'median'),
+        low_gq_fraction=('low_gq', 'mean'),
+        median_perc_pos_cov=('Perc Pos Cov', 'median'),
+        pos_cov=('Pos Cov', 'sum'),
+        neg_cov=('Neg Cov', 'sum'),
+        strand_bias_fraction=('strand_bias', 'mean'),
+    )
+    metrics.insert(metrics.columns.get_loc('median_gq') + 1, 'gq_p10', grouped['GQ'].quantile(0.1))
+    metrics.index = metrics.index.astype(object)
+    return metrics
+
+
+class QCMetrics:
+    """Per-sample and per-marker QC metrics of a loaded run, with genotype edits applied.
+
+    Coverage, GQ and strand metrics come from one groupby pass and never change. Call rate and
+    heterozygous fraction are kept as counts, so applying an edit only adjusts the counts of the
+    edited sample and marker.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        data = store.data
+        with span("qc_metrics", rows=len(data)):
+            self._codes = store.genotype_codes
+            called = self._codes != MISSING_CODE
+            perc_pos_cov = data['Perc Pos Cov'].to_numpy()
+            per_row = pd.DataFrame({
+                'SampleName': data['SampleName'],
+                'Target ID': data['Target ID'],
+                'called': called,
+                'heterozygous': _HETEROZYGOUS[self._codes],
+                'Coverage': data['Coverage'],
+                'GQ': data['GQ'],
+                'low_gq': data['GQ'].to_numpy() < LOW_GQ,
+                'Perc Pos Cov': data['Perc Pos Cov'],
+                'Pos Cov': data['Pos Cov'],
+                'Neg Cov': data['Neg Cov'],
+                'strand_bias': (perc_pos_cov < STRAND_BIAS_PERCENT) | (perc_pos_cov > 100 - STRAND_BIAS_PERCENT),
+            })
+            self._samples = _aggregate(per_row, 'SampleName')
+            self._markers = _aggregate(per_row, 'Target ID')
+        self._edits = {}  # Edits the counts currently include
+        self._tables = {}  # Finished metric tables, dropped when an edit changes the counts
+
+    def apply_edits(self, edits):
+        """Bring the counts in line with the given {(sample, marker): genotype} edits; returns the samples that changed."""
+        changed = set()
+        for key in set(self._edits) | set(edits):
+            if self._edits.get(key) == edits.get(key):
+                continue
+            sample, marker = key
+            pos = self.store.position(sample, marker)
+            if pos is not None:
+                old = self._code(pos, self._edits.get(key))
+                new = self._code(pos, edits.get(key))
+                for metrics, label in ((self._samples, sample), (self._markers, marker)):
+                    metrics.at[label, 'called'] += int(new != MISSING_CODE) - int(old != MISSING_CODE)
+                    metrics.at[label, 'heterozygous'] += int(_HETEROZYGOUS[new]) - int(_HETEROZYGOUS[old])
+                changed.add(sample)
+        self._edits = dict(edits)
+        if changed:
+            self._tables.clear()
+        return changed
+
+    def _code(self, pos, genotype):
+        return self._codes[pos] if genotype is None else normalize_genotype(genotype)
+
+    def sample_metrics(self) -> pd.DataFrame:
+        if 'samples' not in self._tables:
+            self._tables['samples'] = self._finish(self._samples, 'SampleName')
+        return self._tables['samples']
+
+    def marker_metrics(self) -> pd.DataFrame:
+        if 'markers' not in self._tables:
+            self._tables['markers'] = self._finish(self._markers, 'Target ID')
+        return self._tables['markers']
+
+    @staticmethod
+    def _finish(metrics, key):
+        """Turn the cached counts into rates."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = metrics.assign(
+                call_rate=metrics['called'] / metrics['rows'],
+                heterozygous_fraction=metrics['heterozygous'] / metrics['called'],
+                strand_balance=metrics['pos_cov'] / (metrics['pos_cov'] + metrics['neg_cov']),
+            )
+        columns = ['rows', 'called', 'call_rate', 'heterozygous_fraction', 'median_coverage', 'min_coverage',
+                   'median_gq', 'gq_p10', 'low_gq_fraction', 'median_perc_pos_cov', 'strand_balance', 'strand_bias_fraction']
+        return result[columns].rename_axis(key).reset_index()
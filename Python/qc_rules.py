@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from dosage_encoding import apply_row_edits, edited_genotypes, encode_genotypes, normalize_genotype
+
+# Declarative marker QC rules. A rule flags a row when the row's marker is in 'markers' (every marker
+# if omitted) and all of its 'when' conditions hold. Conditions are (column, operator, value) with
+# operators <, <=, >, >=, ==, != or 'in' / 'not in' for a list of values; Genotype values are
+# compared after normalization, so 'AG', 'GA' and 'A/G' are the same genotype, and 'NN' stands for
+# every no-call.
+QC_RULES = [
+    {'name': 'indel', 'markers': ['rs312262906'], 'when': [],
+     'message': "This is an indel marker and you need to check the genotype yourself in IGV."},
+    {'name': 'maf_below_40', 'markers': ['rs2196051'],
+     'when': [('Maj Allele Freq', '<', 40), ('Genotype', 'not in', ['GG', 'NN'])],
+     'message': "MAF < 40 - genotype is probably GG."},
+    {'name': 'maf_40_to_80', 'markers': ['rs2196051'],
+     'when': [('Maj Allele Freq', '>=', 40), ('Maj Allele Freq', '<=', 80), ('Genotype', 'not in', ['AG', 'NN'])],
+     'message': "40 < MAF < 80 - genotype should be AG."},
+    {'name': 'maf_above_80', 'markers': ['rs2196051'],
+     'when': [('Maj Allele Freq', '>', 80), ('Genotype', 'not in', ['AA', 'NN'])],
+     'message': "MAF > 80 - genotype should be AA."},
+    {'name': 'maf_above_80_homozygous', 'markers': ['rs1495085', 'rs2789823', 'rs7148809'],
+     'when': [('Maj Allele Freq', '>', 80), ('Genotype', 'in', ['AC', 'AG', 'AT', 'CG', 'CT', 'GT'])],
+     'message': "80 < MAF - genotype should be homozygous."},
+    {'name': 'untrusted_tt', 'markers': ['rs310644'], 'when': [('Genotype', '==', 'TT')],
+     'message': "C could be lost, don't trust TT."},
+    {'name': 'low_coverage', 'when': [('Coverage', '<', 20)],
+     'message': "Coverage below 20 reads."},
+    {'name': 'low_gq', 'when': [('GQ', '<', 20)],
+     'message': "Genotype quality below 20."},
+    {'name': 'strand_bias', 'when': [('Perc Pos Cov', '<', 10)],
+     'message': "Less than 10% of reads on the positive strand."},
+    {'name': 'strand_bias', 'when': [('Perc Pos Cov', '>', 90)],
+     'message': "More than 90% of reads on the positive strand."},
+]
+
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    'in': lambda values, allowed: np.isin(values, allowed),
+    'not in': lambda values, allowed: ~np.isin(values, allowed),
+}
+
+
+def compile_condition(column, operator, value):
+    """Turn one (column, operator, value) condition into a function of the column arrays."""
+    if operator not in OPERATORS:
+        raise ValueError(f"Unknown QC rule operator: {operator}")
+    compare = OPERATORS[operator]
+    if column == 'Genotype':
+        # Compare normalized genotype codes instead of strings
+        column = 'genotype_codes'
+        if operator in ('in', 'not in'):
+            value = np.array([normalize_genotype(genotype) for genotype in value], dtype=np.uint8)
+        else:
+            value = np.uint8(normalize_genotype(value))
+    elif operator in ('in', 'not in'):
+        value = np.asarray(value)
+    return lambda columns: compare(columns[column], value)
+
+
+def compile_rules(rules):
+    """Compile declarative rules into (name, message, markers, conditions) tuples."""
+    compiled = []
+    for rule in rules:
+        markers = tuple(rule['markers']) if rule.get('markers') else None
+        conditions = [compile_condition(*condition) for condition in rule.get('when', [])]
+        compiled.append((rule['name'], rule['message'], markers, conditions))
+    return compiled
+
+
+COMPILED_QC_RULES = compile_rules(QC_RULES)
+
+
+class _ColumnArrays(dict):
+    """Column arrays of a run, converted on first use and shared by every rule."""
+
+    def __init__(self, data, genotype_codes):
+        super().__init__(genotype_codes=genotype_codes)
+        self.data = data
+
+    def __missing__(self, column):
+        self[column] = self.data[column].to_numpy()
+        return self[column]
+
+
+def run_qc_rules(data, rules=None, genotype_codes=None, row_edits=((), ())) -> pd.DataFrame:
+    """Evaluate every rule across all samples and markers and return one row per flag.
+
+    row_edits are the (sorted positions, genotypes) of EditOverlay.row_edits; the rules see and
+    report the edited genotypes, as they will be saved.
+    """
+    compiled = COMPILED_QC_RULES if rules is None else compile_rules(rules)
+    if genotype_codes is None:
+        genotype_codes = encode_genotypes(data['Genotype'])
+    positions, genotypes = np.asarray(row_edits[0], dtype=np.int64), row_edits[1]
+    genotype_codes = apply_row_edits(genotype_codes, positions, genotypes)
+    columns = _ColumnArrays(data, genotype_codes)
+
+    marker_masks = {}
+    flagged_rows, rule_ids = [], []
+    for rule_id, (_, _, markers, conditions) in enumerate(compiled):
+        if markers is None:
+            mask = np.ones(len(data), dtype=bool)
+        else:
+            if markers not in marker_masks:
+                marker_masks[markers] = data['Target ID'].isin(markers).to_numpy()
+            mask = marker_masks[markers]
+        for condition in conditions:
+            mask = mask & condition(columns)
+        rows = np.flatnonzero(mask)
+        flagged_rows.append(rows)
+        rule_ids.append(np.full(len(rows), rule_id))
+
+    rows = np.concatenate(flagged_rows)
+    rule_ids = np.concatenate(rule_ids)
+    flags = data.iloc[rows][['SampleName', 'Target ID', 'Genotype', 'Maj Allele Freq']].reset_index(drop=True)
+    if len(positions):
+        flags['Genotype'] = edited_genotypes(data['Genotype'], rows, positions, genotypes)
+    flags['Rule'] = np.array([rule[0] for rule in compiled], dtype=object)[rule_ids]
+    flags['Message'] = np.array([rule[1] for rule in compiled], dtype=object)[rule_ids]
+    return flags
+
+
+def marker_messages(marker, rules=QC_RULES):
+    """Return the messages of the rules written for a specific marker."""
+    return [rule['message'] for rule in rules if marker in rule.get('markers', ())]
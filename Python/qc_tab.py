@@ -0,0 +1,204 @@
+from datetime import datetime
+import pandas as pd
+from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QLineEdit, QPushButton, QComboBox, QMessageBox, QTableView
+from qc_metrics import LOW_CALL_RATE
+from concordance import FLAGS
+from log_console import LogConsole
+from table_model import DataFrameModel
+from threads import ComputeQCThread, ConcordanceThread
+
+VIEWS = ["Per sample", "Per marker", "Suspicious pairs"]
+
+class QCTab(QWidget):
+    def __init__(self, prepare_files_tab):
+        super().__init__()
+        self.prepare_files_tab = prepare_files_tab  # Source of the loaded run and its genotype edits
+        self.metrics = None  # QCMetrics of the loaded run
+        self.qc_thread = None
+        self.pairs = None  # Ranked sample pairs of the last concordance check
+        self.pairs_rows = None  # Rows the pairs were computed from
+        self.concordance_thread = None
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QGridLayout()
+
+        # Metrics of every sample and marker of the run loaded in the Prepare Files tab
+        self.compute_button = QPushButton("Compute QC Metrics")
+        self.compute_button.clicked.connect(self.on_compute)
+        layout.addWidget(self.compute_button, 0, 0)
+
+        self.view_selector = QComboBox()
+        self.view_selector.addItems(VIEWS)
+        self.view_selector.currentIndexChanged.connect(self.show_metrics)
+        layout.addWidget(self.view_selector, 0, 1)
+
+        self.export_button = QPushButton("Export Metrics")
+        self.export_button.clicked.connect(self.on_export)
+        layout.addWidget(self.export_button, 0, 2)
+
+        # Compare every sample with every other one, across all loaded runs
+        self.concordance_button = QPushButton("Find Duplicates and Swaps")
+        self.concordance_button.clicked.connect(self.on_concordance)
+        layout.addWidget(self.concordance_button, 0, 3)
+
+        self.summary_label = QLabel("No QC metrics computed.")
+        layout.addWidget(self.summary_label, 1, 0, 1, 4)
+
+        self.filter_column = QComboBox()
+        self.filter_column.currentIndexChanged.connect(self.on_filter_changed)
+        layout.addWidget(self.filter_column, 2, 0)
+
+        self.filter = QLineEdit()
+        self.filter.setPlaceholderText("Filter, e.g. < 0.9")
+        self.filter.textChanged.connect(self.on_filter_changed)
+        layout.addWidget(self.filter, 2, 1, 1, 3)
+
+        self.metrics_model = DataFrameModel(float_format="{:.3f}")
+        self.metrics_table = QTableView()
+        self.metrics_table.setModel(self.metrics_model)
+        self.metrics_table.setSortingEnabled(True)
+        layout.addWidget(self.metrics_table, 3, 0, 1, 4)
+
+        self.text_output_qc = LogConsole(max_lines=1000)
+        layout.addWidget(self.text_output_qc, 4, 0, 1, 4)
+
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        # Pick up genotype edits made in the Prepare Files tab since the tab was last shown
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        if self.pairs is not None and self.pairs_rows is not self.prepare_files_tab.dataset.all_rows:
+            self.pairs = self.pairs_rows = None
+            self.show_metrics()
+        if self.metrics is None:
+            return
+        if self.metrics.store is not self.prepare_files_tab.store:
+            self.metrics = None
+            self.show_metrics()
+            self.summary_label.setText("A different run was loaded; compute the QC metrics again.")
+            return
+        changed = self.metrics.apply_edits(self.prepare_files_tab.modified_genotypes.as_dict())
+        if changed:
+            self.display_message(f"Updated the QC metrics of {len(changed)} edited sample(s).")
+            self.show_metrics()
+
+    def on_compute(self):
+        store = self.prepare_files_tab.store
+        if store is None:
+            QMessageBox.critical(self, "Error", "Load a run in the Prepare Files tab first.")
+            return
+        if self.qc_thread is not None and self.qc_thread.isRunning():
+            self.display_message("QC metrics are already being computed.")
+            return
+
+        self.compute_button.setEnabled(False)
+        self.qc_thread = ComputeQCThread(store)
+        self.qc_thread.qc_computed.connect(self.on_qc_computed)
+        self.qc_thread.error_occurred.connect(self.on_error)
+        self.qc_thread.finished.connect(lambda: self.compute_button.setEnabled(True))
+        self.qc_thread.start()
+
+    def on_qc_computed(self, metrics):
+        self.metrics = metrics
+        self.metrics.apply_edits(self.prepare_files_tab.modified_genotypes.as_dict())
+        self.show_metrics()
+        samples, markers = self.metrics.sample_metrics(), self.metrics.marker_metrics()
+        self.display_message(
+            f"QC metrics of {len(samples)} samples and {len(markers)} markers computed; "
+            f"{(samples['call_rate'] < LOW_CALL_RATE).sum()} samples and {(markers['call_rate'] < LOW_CALL_RATE).sum()} markers "
+            f"have a call rate below {LOW_CALL_RATE:.0%}."
+        )
+
+    def on_concordance(self):
+        all_rows = self.prepare_files_tab.dataset.all_rows
+        if all_rows is None:
+            QMessageBox.critical(self, "Error", "Load a run in the Prepare Files tab first.")
+            return
+        if self.concordance_thread is not None and self.concordance_thread.isRunning():
+            self.display_message("Samples are already being compared.")
+            return
+
+        self.concordance_button.setEnabled(False)
+        self.concordance_thread = ConcordanceThread(all_rows)
+        self.concordance_thread.concordance_computed.connect(lambda pairs: self.on_concordance_computed(all_rows, pairs))
+        self.concordance_thread.error_occurred.connect(self.on_error)
+        self.concordance_thread.finished.connect(lambda: self.concordance_button.setEnabled(True))
+        self.concordance_thread.start()
+
+    def on_concordance_computed(self, all_rows, pairs):
+        self.pairs, self.pairs_rows = pairs, all_rows
+        counts = pairs['flag'].value_counts()
+        self.display_message(
+            f"Compared the samples of {len(self.prepare_files_tab.dataset.runs())} run(s): "
+            f"{counts.get(FLAGS[0], 0)} possible swaps, {counts.get(FLAGS[1], 0)} duplicates, "
+            f"{counts.get(FLAGS[2], 0)} other highly concordant pairs."
+        )
+        if self.view_selector.currentText() == VIEWS[2]:
+            self.show_metrics()
+        else:
+            self.view_selector.setCurrentText(VIEWS[2])
+
+    def current_table(self):
+        view = self.view_selector.currentText()
+        if view == VIEWS[2]:
+            return self.pairs
+        if self.metrics is None:
+            return None
+        return self.metrics.sample_metrics() if view == VIEWS[0] else self.metrics.marker_metrics()
+
+    def show_metrics(self):
+        table = self.current_table()
+        if table is None:
+            self.metrics_model.set_data(pd.DataFrame())
+            self.filter_column.clear()
+            return
+        self.metrics_model.set_data(table)
+
+        # Keep the filter on the same column when switching views
+        column = self.filter_column.currentText()
+        self.filter_column.blockSignals(True)
+        self.filter_column.clear()
+        self.filter_column.addItems([str(name) for name in table.columns])
+        if column in table.columns:
+            self.filter_column.setCurrentText(column)
+        self.filter_column.blockSignals(False)
+        self.on_filter_changed()
+
+        if table is self.pairs:
+            suspicious = table['flag'].isin(FLAGS[:2]).sum()
+            self.summary_label.setText(f"{len(table)} sample pairs listed, {suspicious} flagged as possible swaps or duplicates.")
+        else:
+            low = (table['call_rate'] < LOW_CALL_RATE).sum()
+            kind = 'samples' if self.view_selector.currentText() == VIEWS[0] else 'markers'
+            self.summary_label.setText(f"{len(table)} {kind}, {low} with a call rate below {LOW_CALL_RATE:.0%}.")
+
+    def on_filter_changed(self):
+        if self.filter_column.count():
+            self.metrics_model.set_filter(self.filter_column.currentText(), self.filter.text())
+
+    def on_export(self):
+        self.refresh()
+        if self.metrics is None and self.pairs is None:
+            QMessageBox.critical(self, "Error", "No QC metrics to export.")
+            return
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if self.metrics is not None:
+            sample_path = f"qc_sample_metrics_{timestamp}.csv"
+            marker_path = f"qc_marker_metrics_{timestamp}.csv"
+            self.metrics.sample_metrics().to_csv(sample_path, index=False)
+            self.metrics.marker_metrics().to_csv(marker_path, index=False)
+            self.display_message(f"QC metrics saved to {sample_path} and {marker_path}.")
+        if self.pairs is not None:
+            pairs_path = f"sample_concordance_{timestamp}.csv"
+            self.pairs.to_csv(pairs_path, index=False)
+            self.display_message(f"Sample pairs saved to {pairs_path}.")
+
+    def on_error(self, error_msg: str):
+        self.display_message(f"Error: {error_msg}")
+
+    def display_message(self, message: str):
+        self.text_output_qc.log(message)
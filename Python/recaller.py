@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+from dosage_encoding import apply_row_edits, edited_genotypes, encode_genotypes
+
+READ_COLUMNS = ['A Reads', 'C Reads', 'G Reads', 'T Reads']
+BASES = 'ACGT'
+
+# Genotype string for every (allele, allele) pair of base indices, alleles in alphabetical order like the instrument
+PAIR_GENOTYPES = np.array([[''.join(sorted(a + b)) for b in BASES] for a in BASES], dtype=object)
+
+# Major allele fraction bands: >= hom_min is homozygous, <= het_max heterozygous, in between ambiguous
+DEFAULT_THRESHOLDS = {'hom_min': 0.90, 'het_max': 0.70, 'min_coverage': 10}
+
+# Per-marker overrides, from the review rules in PrepareFilesTab.show_info
+MARKER_THRESHOLDS = {
+    'rs2196051': {'hom_min': 0.80, 'het_max': 0.80},
+    'rs1495085': {'hom_min': 0.80, 'het_max': 0.80},
+    'rs2789823': {'hom_min': 0.80, 'het_max': 0.80},
+    'rs7148809': {'hom_min': 0.80, 'het_max': 0.80},
+}
+
+
+def marker_thresholds(markers, thresholds=None, defaults=None):
+    """Return per-row hom_min, het_max and min_coverage arrays for a column of marker IDs."""
+    thresholds = MARKER_THRESHOLDS if thresholds is None else thresholds
+    defaults = {**DEFAULT_THRESHOLDS, **(defaults or {})}
+    names = list(thresholds)
+    index = pd.Index(names).get_indexer(markers)
+    result = {}
+    for key, default in defaults.items():
+        # Last slot holds the default, so markers without overrides (index -1) pick it up
+        values = np.array([thresholds[name].get(key, default) for name in names] + [default], dtype=np.float64)
+        result[key] = values[index]
+    return result
+
+
+def recall_genotypes(data, thresholds=None, defaults=None, genotype_codes=None, row_edits=((), ())) -> pd.DataFrame:
+    """Re-call every row's genotype from its A/C/G/T read counts.
+
+    Returns 'Suggested Genotype', 'Recall Confidence' (the share of reads that fit the suggested
+    genotype, scaled down for unbalanced heterozygotes and halved in the ambiguous band) and
+    'Recall Disagrees' (the suggestion differs from the current genotype: the instrument call, or
+    the edit of row_edits, the (sorted positions, genotypes) of EditOverlay.row_edits), aligned with data.
+    """
+    reads = data[READ_COLUMNS].to_numpy(dtype=np.float64)
+    rows = np.arange(len(reads))
+    total = reads.sum(axis=1)
+    order = np.argsort(-reads, axis=1, kind='stable')
+    first, second = order[:, 0], order[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        major = np.where(total > 0, reads[rows, first] / total, 0.0)
+        minor = np.where(total > 0, reads[rows, second] / total, 0.0)
+
+    limits = marker_thresholds(data['Target ID'], thresholds, defaults)
+    midpoint = (limits['hom_min'] + limits['het_max']) / 2
+    homozygous = major >= midpoint
+
+    suggested = np.where(homozygous, PAIR_GENOTYPES[first, first], PAIR_GENOTYPES[first, second])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        balance = np.where(major > 0, 2 * minor / (major + minor), 0.0)
+    confidence = np.where(homozygous, major, (major + minor) * balance)
+    ambiguous = (major > limits['het_max']) & (major < limits['hom_min'])
+    confidence = np.where(ambiguous, confidence / 2, confidence)
+
+    no_call = total < limits['min_coverage']
+    suggested = np.where(no_call, 'NN', suggested)
+    confidence = np.where(no_call, 0.0, confidence)
+
+    if genotype_codes is None:
+        genotype_codes = encode_genotypes(data['Genotype'])
+    genotype_codes = apply_row_edits(genotype_codes, np.asarray(row_edits[0], dtype=np.int64), row_edits[1])
+    return pd.DataFrame({
+        'Suggested Genotype': suggested,
+        'Recall Confidence': confidence.astype(np.float32),
+        'Recall Disagrees': encode_genotypes(suggested) != genotype_codes,
+    }, index=data.index)
+
+
+def recall_disagreements(data, thresholds=None, defaults=None, genotype_codes=None, row_edits=((), ())) -> pd.DataFrame:
+    """Return only the rows where the re-call differs from the current genotype, edits applied."""
+    recalled = recall_genotypes(data, thresholds, defaults, genotype_codes, row_edits)
+    rows = np.flatnonzero(recalled['Recall Disagrees'].to_numpy())
+    columns = ['SampleName', 'Target ID', 'Genotype', 'Maj Allele Freq', 'Coverage']
+    disagreements = pd.concat([data[columns].iloc[rows], recalled.iloc[rows]], axis=1)
+    positions = np.asarray(row_edits[0], dtype=np.int64)
+    if len(positions):
+        disagreements['Genotype'] = edited_genotypes(data['Genotype'], rows, positions, row_edits[1])
+    return disagreements.drop(columns='Recall Disagrees')
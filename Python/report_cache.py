@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from config import CACHE_DIRECTORY, CACHE_MAX_BYTES
+from business_logic import REPORT_SCHEMA, ANALYSIS_COLUMNS, read_report
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # Without pyarrow every load parses the CSV
+    feather = None
+
+# Bump when the parsed representation changes so stale cache files are not reused
+CACHE_VERSION = 2
+
+# Reports may be loaded from several threads at once; the index is read and rewritten under this lock
+_INDEX_LOCK = threading.Lock()
+
+
+def file_hash(path, chunk_size=8 * 1024 * 1024):
+    """Return the BLAKE2 digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """Feather copies of parsed run reports with least-recently-used eviction."""
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.json")
+
+    @property
+    def enabled(self):
+        return feather is not None
+
+    def load(self, path, columns=ANALYSIS_COLUMNS):
+        """Load a run report, reusing the cached parse when the file is unchanged.
+
+        Returns the DataFrame and where it came from: 'cache', or the CSV engine that parsed it.
+        A cached report is memory-mapped and converted with a full copy into writable pandas
+        blocks, so loading it takes the memory of one DataFrame but no second copy for Arrow.
+        """
+        if not self.enabled:
+            return read_report(path, columns)
+
+        # Hashing reads the whole file, so it happens outside the lock
+        source_key = os.path.abspath(path)
+        with _INDEX_LOCK:
+            source = self._known_source(path, self._read_index())
+        if source is None:
+            source = self._hash_source(path)
+        entry_name = self._entry_name(source, columns)
+        entry_path = os.path.join(self.directory, entry_name)
+
+        # Parsing and reading happen outside the lock so several reports load side by side
+        data = None
+        try:
+            data = feather.read_table(entry_path, memory_map=True).to_pandas()
+            source_name = 'cache'
+        except FileNotFoundError:  # Not cached, or evicted by another load meanwhile
+            pass
+        if data is None:
+            data, source_name = read_report(path, columns)
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+            feather.write_feather(data, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, entry_path)
+
+        with _INDEX_LOCK:
+            if not os.path.exists(entry_path):
+                # Evicted by another load since it was read or written; the data is loaded all the same
+                return data, source_name
+            index = self._read_index()
+            index['sources'][source_key] = source
+            entry = index['entries'].setdefault(entry_name, {})
+            entry['bytes'] = os.path.getsize(entry_path)
+            entry['last_used'] = time.time()
+            self._evict(index, keep=entry_name)
+            self._write_index(index)
+        return data, source_name
+
+    def clear(self):
+        """Remove every cached report."""
+        with _INDEX_LOCK:
+            index = self._read_index()
+            for entry_name in index['entries']:
+                self._remove(entry_name)
+            self._write_index({'sources': {}, 'entries': {}})
+
+    @staticmethod
+    def _known_source(path, index):
+        """Return the indexed size, mtime and hash of a report, or None when its size or mtime changed."""
+        stat = os.stat(path)
+        source = index['sources'].get(os.path.abspath(path))
+        if source is None or source['size'] != stat.st_size or source['mtime_ns'] != stat.st_mtime_ns:
+            return None
+        return source
+
+    @staticmethod
+    def _hash_source(path):
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': file_hash(path)}
+
+    @staticmethod
+    def _entry_name(source, columns):
+        """Return the cache file name for a report's contents and column selection."""
+        # The column selection and schema are part of the key, so pruned and full loads are cached separately
+        layout = json.dumps([CACHE_VERSION, columns, {column: REPORT_SCHEMA[column] for column in REPORT_SCHEMA}])
+        layout_hash = hashlib.blake2b(layout.encode(), digest_size=4).hexdigest()
+        return f"{source['hash']}_{layout_hash}.feather"
+
+    def _evict(self, index, keep):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = index['entries']
+        total = sum(entry['bytes'] for entry in entries.values())
+        for entry_name in sorted(entries, key=lambda name: entries[name].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            if entry_name == keep:
+                continue
+            total -= entries.pop(entry_name)['bytes']
+            self._remove(entry_name)
+
+        # Forget sources whose cache entries are gone
+        hashes = {entry_name.split('_')[0] for entry_name in entries}
+        index['sources'] = {key: source for key, source in index['sources'].items() if source['hash'] in hashes}
+
+    def _remove(self, entry_name):
+        try:
+            os.remove(os.path.join(self.directory, entry_name))
+        except OSError:
+            pass
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'sources': {}, 'entries': {}}
+
+    def _write_index(self, index):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,142 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from config import MERGE_DEDUP_RULE
+
+# Rows of the merged dataset are identified by run, barcode, sample and marker
+KEY_COLUMNS = ['Run', 'BarcodeName', 'SampleName', 'Target ID']
+
+# Rows are labelled run rank * ROW_STRIDE + row in the report, so sorting on the labels restores first-seen order
+ROW_STRIDE = 2 ** 32
+
+# How to pick the row of a (SampleName, Target ID) pair sequenced more than once:
+# column to maximize, or None to keep the row of the run added last
+DEDUP_RULES = {
+    'coverage': 'Coverage',
+    'gq': 'GQ',
+    'latest': None,
+}
+
+
+def run_name(path):
+    """Return the run name of a report file: its file name without the extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def report_columns(data):
+    """Return the columns of the loaded reports, without the Run column added when merging."""
+    return [column for column in data.columns if column != 'Run']
+
+
+def concat_reports(frames, ignore_index=True):
+    """Concatenate report frames, keeping categorical columns categorical across differing categories."""
+    frames = [frame for frame in frames if frame is not None]
+    data = pd.concat(frames, ignore_index=ignore_index)
+    for column in frames[0].columns:
+        if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            data[column] = union_categoricals([frame[column] for frame in frames], ignore_order=True)
+    return data
+
+
+def load_reports(paths, load, workers=None):
+    """Parse several reports concurrently with load(path); returns {path: result} in input order."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(paths, executor.map(load, paths)))
+
+
+class MergedDataset:
+    """Run reports merged into one dataset with a single row per (SampleName, Target ID).
+
+    Every loaded row is kept in all_rows, so adding or replacing a run only re-decides the pairs
+    that run covers; the other runs are neither re-parsed nor re-deduplicated. Rows stay in the
+    order runs were first added and, within a run, in report order, also when a run is replaced.
+    """
+
+    def __init__(self, dedup_rule=MERGE_DEDUP_RULE):
+        if dedup_rule not in DEDUP_RULES:
+            raise Exception(f"Unknown dedup rule {dedup_rule}; use one of {', '.join(DEDUP_RULES)}.")
+        self.dedup_rule = dedup_rule
+        self.run_order = {}  # run name -> order in which it was added
+        self.run_ranks = {}  # run name -> order in which it was first added; kept when the run is replaced
+        self.run_paths = {}  # run name -> absolute path of the report it was loaded from
+        self.all_rows = None  # Every row of every run
+        self.data = None  # Deduplicated rows
+
+    def runs(self):
+        return list(self.run_order)
+
+    def name_run(self, path):
+        """Return the run name for a report file, unique among the runs loaded from other files.
+
+        Reloading the same file gives the same name, so it replaces its run; another file with the
+        same name, e.g. a second raw_data.csv, gets a numbered name instead.
+        """
+        path = os.path.abspath(path)
+        for run, run_path in self.run_paths.items():
+            if run_path == path:
+                return run
+        base = run = run_name(path)
+        number = 2
+        while run in self.run_order or run in self.run_paths:
+            run = f"{base}_{number}"
+            number += 1
+        self.run_paths[run] = path
+        return run
+
+    def add_run(self, run, report: pd.DataFrame):
+        """Add a run report; a run added again under the same name replaces the earlier one."""
+        report = report.assign(Run=pd.Categorical([run] * len(report)))
+        report = report[['Run'] + [column for column in report.columns if column != 'Run']]
+        rank = self.run_ranks.setdefault(run, len(self.run_ranks))
+        report.index = rank * ROW_STRIDE + np.arange(len(report), dtype=np.int64)
+        new_keys = pd.MultiIndex.from_arrays([report['SampleName'], report['Target ID']])
+
+        if self.all_rows is None:
+            self.run_order[run] = 0
+            self.all_rows = report
+            self.data = self._deduplicate(report)
+            return self.data
+
+        # Pairs of the new run and of the run it replaces have to be decided again
+        replaced = self.all_rows['Run'] == run
+        contested_keys = new_keys
+        if replaced.any():
+            old = self.all_rows[replaced]
+            contested_keys = contested_keys.append(pd.MultiIndex.from_arrays([old['SampleName'], old['Target ID']]))
+            self.all_rows = self.all_rows[~replaced.to_numpy()]
+        self.run_order.pop(run, None)
+        self.run_order[run] = max(self.run_order.values(), default=-1) + 1
+        self.all_rows = concat_reports([self.all_rows, report], ignore_index=False)
+
+        def contested(rows):
+            keys = pd.MultiIndex.from_arrays([rows['SampleName'], rows['Target ID']])
+            return keys.isin(contested_keys)
+
+        kept = self.data[~contested(self.data)]
+        candidates = self.all_rows[contested(self.all_rows)]
+        # Both parts are in label order, so the stable sort only merges them
+        self.data = concat_reports([kept, self._deduplicate(candidates)], ignore_index=False).sort_index(kind='stable')
+        return self.data
+
+    def _deduplicate(self, rows):
+        """Keep one row per (SampleName, Target ID) according to the dedup rule.
+
+        The kept row is labelled with the first-seen row of its pair, so a pair keeps its place
+        whichever run wins it.
+        """
+        order = rows['Run'].astype(object).map(self.run_order).to_numpy()
+        column = DEDUP_RULES[self.dedup_rule]
+        if column is None:
+            sort_keys = [order]
+        else:
+            sort_keys = [order, rows[column].to_numpy()]  # Ties go to the run added last
+        ranking = np.lexsort(sort_keys)[::-1]
+        codes = pd.MultiIndex.from_arrays([rows['SampleName'], rows['Target ID']]).factorize(use_na_sentinel=False)[0]
+        first_seen = pd.Series(rows.index.to_numpy()).groupby(codes, sort=False).transform('min').to_numpy()
+        first = ~pd.Series(codes[ranking]).duplicated().to_numpy()
+        kept = rows.iloc[ranking[first]]
+        kept.index = first_seen[ranking[first]]
+        # Back to first-seen row order so samples stay together
+        return kept.sort_index(kind='stable')
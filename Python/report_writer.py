@@ -0,0 +1,111 @@
+import gzip
+import os
+import numpy as np
+from business_logic import add_genotype_categories
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output needs pyarrow
+    pa = pq = None
+
+WRITE_CHUNK_ROWS = 100_000
+
+
+class EditOverlay:
+    """Genotype edits keyed by (sample, marker), kept apart from the loaded run until it is written."""
+
+    def __init__(self, edits=None):
+        self._edits = dict(edits or {})
+
+    def set(self, sample, marker, genotype):
+        self._edits[(sample, marker)] = genotype
+
+    def get(self, sample, marker, default=None):
+        return self._edits.get((sample, marker), default)
+
+    def for_sample(self, sample):
+        """Return the edits of one sample as {marker: genotype}."""
+        return {marker: genotype for (edited_sample, marker), genotype in self._edits.items() if edited_sample == sample}
+
+    def as_dict(self):
+        return dict(self._edits)
+
+    def copy(self):
+        return EditOverlay(self._edits)
+
+    def row_edits(self, store):
+        """Map the edits onto row positions of the store's data: sorted positions and their genotypes."""
+        positions, genotypes = [], []
+        for (sample, marker), genotype in self._edits.items():
+            pos = store.position(sample, marker)
+            if pos is not None:
+                positions.append(pos)
+                genotypes.append(genotype)
+        order = np.argsort(positions, kind='stable')
+        return np.asarray(positions, dtype=np.int64)[order], np.asarray(genotypes, dtype=object)[order]
+
+    def __len__(self):
+        return len(self._edits)
+
+
+def _edited_chunks(data, positions, genotypes, chunk_rows, progress, columns=None):
+    """Yield consecutive row chunks with the edits merged in; only edited chunks are copied."""
+    genotype_column = data.columns.get_loc('Genotype')
+    for start in range(0, len(data), chunk_rows):
+        stop = min(start + chunk_rows, len(data))
+        chunk = data.iloc[start:stop]
+        first, last = np.searchsorted(positions, [start, stop])
+        if last > first:
+            chunk = chunk.copy()
+            add_genotype_categories(chunk, genotypes[first:last])
+            for pos, genotype in zip(positions[first:last], genotypes[first:last]):
+                chunk.iat[pos - start, genotype_column] = genotype
+        yield chunk if columns is None else chunk[columns]
+        if progress is not None:
+            progress(stop / len(data))
+
+
+def write_report(data, path, positions=(), genotypes=(), chunk_rows=WRITE_CHUNK_ROWS, progress=None, columns=None):
+    """Write the run with edits merged in, chunk by chunk, then atomically rename it into place.
+
+    The format follows the extension: .csv, .csv.gz or .parquet. columns limits the written
+    columns, e.g. to leave out the Run column of a merged dataset.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    genotypes = np.asarray(genotypes, dtype=object)
+    tmp_path = f"{path}.tmp"
+    empty = data.iloc[0:0] if columns is None else data.iloc[0:0][columns]
+    chunks = _edited_chunks(data, positions, genotypes, chunk_rows, progress, columns)
+    try:
+        if path.endswith(".parquet"):
+            if pq is None:
+                raise Exception("Parquet output requires pyarrow.")
+            writer, schema = None, None
+            for chunk in chunks:
+                # Genotype is written as plain strings so edited chunks keep the first chunk's schema
+                chunk = chunk.astype({'Genotype': object})
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(table)
+            if writer is None:
+                empty.to_parquet(tmp_path, index=False)
+            else:
+                writer.close()
+        else:
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(tmp_path, 'wt', newline='') as f:
+                header = True
+                for chunk in chunks:
+                    chunk.to_csv(f, header=header, index=False)
+                    header = False
+                if header:
+                    empty.to_csv(f, index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from business_logic import add_genotype_categories, analyze_sample, create_appearance_input
+from config import SAMPLE_CACHE_MAX_BYTES
+from qc_rules import run_qc_rules
+
+
+class SampleView:
+    """Everything the Prepare Files tab derives for one sample, with that sample's edits applied."""
+
+    def __init__(self, sample, rows, markers, edits):
+        self.sample = sample
+        self.edits = dict(edits)
+
+        # The sample's rows with the edited genotypes written in
+        self.rows = rows.copy()
+        if self.edits:
+            add_genotype_categories(self.rows, self.edits.values())
+            edited = self.rows['Target ID'].map(self.edits)
+            self.rows.loc[edited.notna().to_numpy(), 'Genotype'] = edited.dropna().to_numpy()
+
+        # {marker: (genotype, MAF)} for the markers shown in the tab
+        analysis = analyze_sample(self.rows, markers)
+        self.markers = dict(zip(analysis['Target ID'], zip(analysis['Genotype'], analysis['Maj Allele Freq'])))
+
+        # Appearance input row and QC rule flags
+        self.dosages = create_appearance_input(self.rows, [sample]).iloc[0]
+        self.qc_flags = run_qc_rules(self.rows)
+
+        self.nbytes = int(
+            self.rows.memory_usage(deep=True).sum()
+            + self.dosages.memory_usage(deep=True)
+            + self.qc_flags.memory_usage(deep=True).sum()
+        )
+
+
+class SampleCache:
+    """Least recently used cache of SampleViews, bounded by their estimated memory use."""
+
+    def __init__(self, store, markers, max_bytes=SAMPLE_CACHE_MAX_BYTES):
+        self.store = store
+        self.markers = tuple(markers)
+        self.max_bytes = max_bytes
+        self._views = OrderedDict()
+        self._bytes = 0
+
+    def get(self, sample, edits=None) -> SampleView:
+        """Return the view of a sample, building it on first use; edits are the sample's {marker: genotype}."""
+        view = self._views.get(sample)
+        if view is not None:
+            self._views.move_to_end(sample)
+            return view
+
+        view = SampleView(sample, self.store.sample_data(sample), self.markers, edits or {})
+        self._views[sample] = view
+        self._bytes += view.nbytes
+        self._evict()
+        return view
+
+    def invalidate(self, sample):
+        """Drop the view of a sample, e.g. after one of its genotypes was edited."""
+        view = self._views.pop(sample, None)
+        if view is not None:
+            self._bytes -= view.nbytes
+
+    def clear(self):
+        self._views.clear()
+        self._bytes = 0
+
+    def _evict(self):
+        # The newest view always stays, even when it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._views) > 1:
+            _, view = self._views.popitem(last=False)
+            self._bytes -= view.nbytes
+
+    def __contains__(self, sample):
+        return sample in self._views
+
+    def __len__(self):
+        return len(self._views)
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from business_logic import ANALYSIS_COLUMNS, report_dtypes, create_appearance_input, qc_summary
+
+CHUNK_ROWS = 200_000  # Rows parsed per read_csv chunk
+SPILL_BUCKETS = 64  # Temporary files used when rows are not grouped by sample
+
+
+def read_chunks(filepath, columns=ANALYSIS_COLUMNS, chunksize=CHUNK_ROWS, progress=None):
+    """Yield a run report in chunks, reporting the fraction of the file read so far."""
+    size = max(os.path.getsize(filepath), 1)
+    with open(filepath, 'rb') as f:
+        reader = pd.read_csv(
+            f,
+            encoding='utf-8-sig',
+            usecols=columns,
+            dtype=report_dtypes(columns, categorical=False),
+            chunksize=chunksize,
+        )
+        for chunk in reader:
+            if len(chunk):
+                yield chunk
+            if progress is not None:
+                progress(min(f.tell() / size, 1.0))
+
+
+def is_grouped_by_sample(filepath, chunksize=CHUNK_ROWS):
+    """Return True if all rows of each sample are contiguous in the report."""
+    seen = set()
+    current = None
+    for chunk in read_chunks(filepath, ['SampleName'], chunksize):
+        values = chunk['SampleName'].to_numpy()
+        run_starts = np.r_[0, np.flatnonzero(values[1:] != values[:-1]) + 1]
+        for sample in values[run_starts]:
+            if sample == current:
+                continue
+            if sample in seen:
+                return False
+            seen.add(sample)
+            current = sample
+    return True
+
+
+def _grouped_slices(chunks):
+    """Cut contiguous sample runs out of the chunks, joining runs that span a chunk boundary."""
+    pending = []
+    current = None
+    for chunk in chunks:
+        values = chunk['SampleName'].to_numpy()
+        boundaries = np.flatnonzero(values[1:] != values[:-1]) + 1
+        for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(chunk)]):
+            if values[start] != current and pending:
+                yield pd.concat(pending, ignore_index=True)
+                pending = []
+            current = values[start]
+            pending.append(chunk.iloc[start:end])
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def _spilled_slices(chunks, columns, buckets, spill_directory=None, progress=None):
+    """Partition rows into temporary bucket files by sample, then group one bucket at a time."""
+    with tempfile.TemporaryDirectory(dir=spill_directory) as tmp:
+        bucket_paths = [os.path.join(tmp, f"bucket_{i}.csv") for i in range(buckets)]
+        written = set()
+        for chunk in chunks:
+            bucket_ids = pd.util.hash_pandas_object(chunk['SampleName'], index=False).to_numpy() % buckets
+            for bucket, rows in chunk.groupby(bucket_ids):
+                rows.to_csv(bucket_paths[bucket], mode='a', header=bucket not in written, index=False)
+                written.add(bucket)
+
+        for i, bucket in enumerate(sorted(written)):
+            data = pd.read_csv(bucket_paths[bucket], dtype=report_dtypes(columns, categorical=False))
+            for _, sample_data in data.groupby('SampleName', sort=False):
+                yield sample_data.reset_index(drop=True)
+            if progress is not None:
+                progress((i + 1) / len(written))
+
+
+def iter_samples(filepath, columns=ANALYSIS_COLUMNS, chunksize=CHUNK_ROWS, buckets=SPILL_BUCKETS,
+                 spill_directory=None, progress=None):
+    """Yield one DataFrame per sample while holding at most one sample (or spill bucket) in memory."""
+    if is_grouped_by_sample(filepath, chunksize):
+        yield from _grouped_slices(read_chunks(filepath, columns, chunksize, progress))
+    else:
+        # Rows of a sample are scattered: partitioning is the first half of the work, grouping the second
+        partition_progress = (lambda fraction: progress(fraction / 2)) if progress is not None else None
+        group_progress = (lambda fraction: progress(0.5 + fraction / 2)) if progress is not None else None
+        chunks = read_chunks(filepath, columns, chunksize, partition_progress)
+        yield from _spilled_slices(chunks, columns, buckets, spill_directory, group_progress)
+
+
+def stream_report(filepath, progress=None, **kwargs):
+    """Build the appearance input and QC summary of a run report without loading it whole.
+
+    Returns the appearance input table, the QC summary and the number of rows read.
+    """
+    appearance, qc = [], []
+    n_rows = 0
+    for sample_data in iter_samples(filepath, progress=progress, **kwargs):
+        appearance.append(create_appearance_input(sample_data))
+        qc.append(qc_summary(sample_data))
+        n_rows += len(sample_data)
+    if not appearance:
+        return create_appearance_input(pd.DataFrame(columns=ANALYSIS_COLUMNS)), pd.DataFrame(), 0
+    return pd.concat(appearance, ignore_index=True), pd.concat(qc, ignore_index=True), n_rows
@@ -0,0 +1,146 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from business_logic import APPEARANCE_ALLELES, REPORT_SCHEMA
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Raw_Data", "raw_data_test.csv")
+
+# Allele pairs drawn for markers the template does not have
+ALLELE_PAIRS = [('A', 'G'), ('C', 'T'), ('A', 'C'), ('G', 'T'), ('A', 'T'), ('C', 'G')]
+
+# Calls below this coverage come out as no-calls, like the H2O control in the template
+NO_CALL_COVERAGE = 20
+
+
+def panel(n_markers, template_path=TEMPLATE_PATH, seed=0):
+    """Return n_markers markers with Chrom, Position and (major, minor) alleles.
+
+    Markers come from the template report first (alleles read from its genotypes, the appearance
+    markers from APPEARANCE_ALLELES) and are topped up with made-up markers.
+    """
+    rng = np.random.default_rng(seed)
+    markers = []
+    if template_path and os.path.exists(template_path):
+        template = pd.read_csv(template_path, encoding='utf-8-sig', usecols=['Chrom', 'Position', 'Target ID', 'Genotype'])
+        appearance = {column.split('_')[0]: alleles for column, alleles in APPEARANCE_ALLELES.items()}
+        for marker, rows in template.groupby('Target ID', sort=False):
+            bases = pd.Series(list(''.join(rows['Genotype'].dropna().astype(str)))).value_counts()
+            bases = [base for base in bases.index if base in 'ACGT']
+            if marker in appearance:
+                alleles = appearance[marker]
+            elif len(bases) >= 2:
+                alleles = (bases[0], bases[1])
+            else:
+                alleles = ALLELE_PAIRS[rng.integers(len(ALLELE_PAIRS))]
+            markers.append((rows['Chrom'].iloc[0], int(rows['Position'].iloc[0]), marker, alleles))
+    for i in range(len(markers), n_markers):
+        chrom = f"chr{rng.integers(1, 23)}"
+        markers.append((chrom, int(rng.integers(100_000, 240_000_000)), f"rs9{i:08d}", ALLELE_PAIRS[rng.integers(len(ALLELE_PAIRS))]))
+    return markers[:n_markers]
+
+
+def generate_samples(markers, first_sample, n_samples, duplicate_fraction=0.0, seed=0):
+    """Generate the report rows of n_samples samples over the given markers.
+
+    duplicate_fraction of the (sample, marker) rows are repeated once with fresh read counts,
+    like a marker sequenced twice on a chip.
+    """
+    rng = np.random.default_rng(seed + first_sample)
+    n_markers = len(markers)
+    rows = n_samples * n_markers
+    sample_ids = np.repeat(np.arange(first_sample, first_sample + n_samples), n_markers)
+    marker_ids = np.tile(np.arange(n_markers), n_samples)
+    if duplicate_fraction > 0:
+        extra = rng.random(rows) < duplicate_fraction
+        order = np.argsort(np.concatenate([np.arange(rows), np.flatnonzero(extra)]), kind='stable')
+        sample_ids = np.concatenate([sample_ids, sample_ids[extra]])[order]
+        marker_ids = np.concatenate([marker_ids, marker_ids[extra]])[order]
+        rows = len(sample_ids)
+
+    # Minor allele count from a per-marker frequency under Hardy-Weinberg
+    minor_frequency = np.random.default_rng(seed).uniform(0.05, 0.5, n_markers)
+    minor_count = rng.binomial(2, minor_frequency[marker_ids])
+
+    # Coverage around 2000 reads, with a tail of poorly covered markers
+    coverage = np.round(rng.lognormal(np.log(2100), 0.6, rows) * (rng.random(rows) > 0.03)).astype(np.int32)
+    minor_share = np.select([minor_count == 0, minor_count == 1], [0.01, 0.5], 0.99)
+    minor_share = np.clip(minor_share + rng.normal(0, 0.03, rows), 0, 1)
+    # A few allele-imbalanced calls land in the 65-85 MAF band the QC rules look at
+    imbalanced = rng.random(rows) < 0.02
+    minor_share[imbalanced] = rng.uniform(0.15, 0.35, imbalanced.sum())
+    minor_reads = rng.binomial(coverage, minor_share)
+    major_reads = coverage - minor_reads
+
+    major = np.array([alleles[0] for *_, alleles in markers])[marker_ids]
+    minor = np.array([alleles[1] for *_, alleles in markers])[marker_ids]
+    reads = {base: np.zeros(rows, dtype=np.int32) for base in 'ACGT'}
+    for base in 'ACGT':
+        reads[base] += np.where(major == base, major_reads, 0) + np.where(minor == base, minor_reads, 0)
+
+    heterozygous = np.where(major < minor, np.char.add(major, minor), np.char.add(minor, major))  # Alleles in alphabetical order
+    genotype = np.where(minor_count == 0, np.char.add(major, major),
+                        np.where(minor_count == 1, heterozygous, np.char.add(minor, minor)))
+    genotype = np.where(coverage < NO_CALL_COVERAGE, 'NN', genotype)
+    maj_allele_freq = np.where(coverage > 0, np.maximum(major_reads, minor_reads) / np.maximum(coverage, 1) * 100, 0)
+
+    pos_share = np.clip(rng.normal(0.5, 0.08, rows), 0, 1)
+    strand_biased = rng.random(rows) < 0.03
+    pos_share[strand_biased] = rng.choice([0.04, 0.95], strand_biased.sum())
+    pos_cov = np.round(coverage * pos_share).astype(np.int32)
+    qc = np.full(rows, '', dtype=object)
+    qc[coverage < NO_CALL_COVERAGE] = '_COV;'
+    qc[(maj_allele_freq > 65) & (maj_allele_freq < 85)] = '_MAF;'
+    qc[(pos_share < 0.1) | (pos_share > 0.9)] = '_PPC;'
+
+    names = np.array([f"sample_{i:07d}" for i in range(first_sample, first_sample + n_samples)])
+    barcodes = np.array([f"IonCode_{(i % 96) + 101:04d}" for i in range(first_sample, first_sample + n_samples)])
+    local = sample_ids - first_sample
+    return pd.DataFrame({
+        'BarcodeName': barcodes[local],
+        'SampleName': names[local],
+        'Chrom': np.array([chrom for chrom, *_ in markers])[marker_ids],
+        'Position': np.array([position for _, position, *_ in markers], dtype=np.int32)[marker_ids],
+        'Target ID': np.array([marker for _, _, marker, _ in markers])[marker_ids],
+        'HotSpot ID': np.array([marker for _, _, marker, _ in markers])[marker_ids],
+        'Genotype': genotype,
+        'Coverage': coverage,
+        'A Reads': reads['A'],
+        'C Reads': reads['C'],
+        'G Reads': reads['G'],
+        'T Reads': reads['T'],
+        'Pos Cov': pos_cov,
+        'Neg Cov': coverage - pos_cov,
+        'Perc Pos Cov': pos_share * 100,
+        'GQ': np.where(coverage < NO_CALL_COVERAGE, 0, np.minimum(99, coverage // 10)).astype(np.int32),
+        'Maj Allele Freq': maj_allele_freq,
+        'QC': qc,
+    }, columns=list(REPORT_SCHEMA))
+
+
+def write_synthetic_report(path, n_samples, n_markers=153, duplicate_fraction=0.0, seed=0, samples_per_chunk=2000):
+    """Write a synthetic run report in the schema of Raw_Data/raw_data_test.csv, a block of samples at a time."""
+    markers = panel(n_markers, seed=seed)
+    rows = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        for first in range(0, n_samples, samples_per_chunk):
+            chunk = generate_samples(markers, first, min(samples_per_chunk, n_samples - first), duplicate_fraction, seed)
+            chunk.to_csv(f, header=first == 0, index=False)
+            rows += len(chunk)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Ion Torrent run report.")
+    parser.add_argument("path", help="output CSV file")
+    parser.add_argument("--samples", type=int, default=96)
+    parser.add_argument("--markers", type=int, default=153)
+    parser.add_argument("--duplicates", type=float, default=0.0, help="fraction of rows repeated once")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rows = write_synthetic_report(args.path, args.samples, args.markers, args.duplicates, args.seed)
+    print(f"Wrote {rows} rows to {args.path}.")
+
+
+if __name__ == "__main__":
+    main()
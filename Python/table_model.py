@@ -0,0 +1,96 @@
+import re
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+# Numeric filters: "70", ">65", "<= 85" or a range "65-85"
+_COMPARISON = re.compile(r"^\s*(<=|>=|<|>|=)?\s*(-?\d+(?:\.\d+)?)\s*$")
+_RANGE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*-\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+class DataFrameModel(QAbstractTableModel):
+    """Table model over the column arrays of a DataFrame; only rows the view asks for are formatted.
+
+    Sorting and filtering work on a permutation of row positions computed with numpy/pandas in one
+    pass, instead of a QSortFilterProxyModel calling back into Python for every row comparison.
+    """
+
+    def __init__(self, data=None, float_format="{:.2f}"):
+        super().__init__()
+        self.float_format = float_format
+        self.set_data(pd.DataFrame() if data is None else data)
+
+    def set_data(self, data: pd.DataFrame):
+        self.beginResetModel()
+        self._data = data.reset_index(drop=True)
+        self._arrays = [self._data[column].to_numpy() for column in self._data.columns]
+        self._mask = np.ones(len(self._data), dtype=bool)
+        self._sort_column, self._sort_order = None, Qt.AscendingOrder
+        self._rows = np.arange(len(self._data))
+        self.endResetModel()
+
+    def dataframe(self) -> pd.DataFrame:
+        """Return the rows currently shown, in display order."""
+        return self._data.iloc[self._rows]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._arrays)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self._arrays[index.column()][self._rows[index.row()]]
+        if pd.isna(value):
+            return ""
+        if isinstance(value, (float, np.floating)):
+            return self.float_format.format(value)
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self._data.columns[section])
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column, self._sort_order = column, order
+        self._update_rows()
+
+    def set_filter(self, column, text):
+        """Show only rows whose column matches text; numeric columns accept "70", ">65" or "65-85"."""
+        text = text.strip()
+        if column not in self._data.columns or not text:
+            self._mask = np.ones(len(self._data), dtype=bool)
+        else:
+            self._mask = self._filter_mask(self._data[column], text)
+        self._update_rows()
+
+    def _filter_mask(self, values: pd.Series, text):
+        if pd.api.types.is_numeric_dtype(values):
+            match = _RANGE.match(text)
+            if match:
+                low, high = float(match.group(1)), float(match.group(2))
+                return values.between(low, high).to_numpy()
+            match = _COMPARISON.match(text)
+            if match:
+                operator, number = match.group(1) or '=', float(match.group(2))
+                compare = {'<': values.lt, '<=': values.le, '>': values.gt, '>=': values.ge, '=': values.eq}[operator]
+                return compare(number).to_numpy()
+            return np.zeros(len(values), dtype=bool)
+        return values.astype(str).str.contains(text, case=False, regex=False).to_numpy()
+
+    def _update_rows(self):
+        self.layoutAboutToBeChanged.emit()
+        rows = np.flatnonzero(self._mask)
+        if self._sort_column is not None and len(rows):
+            keys = pd.Series(self._arrays[self._sort_column][rows])
+            order = keys.sort_values(
+                ascending=self._sort_order == Qt.AscendingOrder, kind='mergesort', na_position='last'
+            ).index.to_numpy()
+            rows = rows[order]
+        self._rows = rows
+        self.layoutChanged.emit()
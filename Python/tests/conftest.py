@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The modules import each other by name from the Python directory
+PYTHON_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PYTHON_DIRECTORY)
+
+RAW_DATA_TEST = os.path.join(PYTHON_DIRECTORY, "..", "Raw_Data", "raw_data_test.csv")
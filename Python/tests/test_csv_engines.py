@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+from business_logic import ANALYSIS_COLUMNS, csv_engine, read_report
+from conftest import RAW_DATA_TEST
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("columns", [ANALYSIS_COLUMNS, None], ids=["analysis", "all"])
+def test_arrow_matches_pandas(columns):
+    arrow, used = read_report(RAW_DATA_TEST, columns=columns, engine='arrow')
+    assert used == 'arrow'
+    pandas, used = read_report(RAW_DATA_TEST, columns=columns, engine='pandas')
+    assert used == 'pandas'
+    pd.testing.assert_frame_equal(arrow, pandas, check_exact=True)
+
+
+def test_arrow_keeps_file_column_order():
+    columns = ['Genotype', 'SampleName', 'Target ID']
+    data, _ = read_report(RAW_DATA_TEST, columns=columns, engine='arrow')
+    assert list(data.columns) == ['SampleName', 'Target ID', 'Genotype']
+
+
+def test_missing_cells_match(tmp_path):
+    path = tmp_path / "report.csv"
+    report = pd.read_csv(RAW_DATA_TEST, encoding='utf-8-sig', nrows=20, dtype={'QC': object})
+    report.loc[3, 'Genotype'] = None
+    report.loc[5, 'QC'] = 'NA'
+    report.loc[7, 'Maj Allele Freq'] = None
+    report.to_csv(path, index=False)
+    arrow, _ = read_report(str(path), columns=None, engine='arrow')
+    pandas, _ = read_report(str(path), columns=None, engine='pandas')
+    pd.testing.assert_frame_equal(arrow, pandas, check_exact=True)
+
+
+def test_integer_column_with_gaps_is_rejected(tmp_path):
+    path = tmp_path / "report.csv"
+    report = pd.read_csv(RAW_DATA_TEST, encoding='utf-8-sig', nrows=20)
+    report['Coverage'] = report['Coverage'].astype(object)
+    report.loc[2, 'Coverage'] = None  # arrow hands it to pandas, which refuses it too
+    report.to_csv(path, index=False)
+    with pytest.raises(Exception, match="Failed to load data"):
+        read_report(str(path), engine='arrow')
+
+
+def test_auto_engine_prefers_arrow():
+    assert csv_engine('auto') == 'arrow'
+    assert csv_engine('pandas') == 'pandas'
+    with pytest.raises(Exception):
+        csv_engine('polars')
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from business_logic import APPEARANCE_ALLELES, APPEARANCE_HEADER, create_appearance_input
+from dosage_encoding import MISSING_CODE, NA_DOSAGE, encode_dosages, encode_genotypes, normalize_genotype
+
+# The per-column lookup create_analysis_input_file used before the uint8 encoding
+TRANSFORMATIONS = {
+'rs312262906_A': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
+'rs11547464_A': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs885479_T': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs1805008_T': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
+'rs1805005_T': {'G/G': '0', 'GG': '0', 'T/T': '2', 'TT': '2', 'G/T': '1', 'GT': '1', 'T/G': '1', 'TG': '1'},
+'rs1805006_A': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
+'rs1805007_T': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
+'rs1805009_C': {'G/G': '0', 'GG': '0', 'C/C': '2', 'CC': '2', 'G/C': '1', 'GC': '1', 'C/G': '1', 'CG': '1'},
+'rs201326893_A': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
+'rs2228479_A': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs1110400_C': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
+'rs28777_C': {'A/A': '0', 'AA': '0', 'C/C': '2', 'CC': '2', 'A/C': '1', 'AC': '1', 'C/A': '1', 'CA': '1'},
+'rs16891982_C': {'G/G': '0', 'GG': '0', 'C/C': '2', 'CC': '2', 'G/C': '1', 'GC': '1', 'C/G': '1', 'CG': '1'},
+'rs12821256_G': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
+'rs4959270_A': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
+'rs12203592_T': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
+'rs1042602_T': {'C/C': '0', 'CC': '0', 'A/A': '2', 'AA': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
+'rs1800407_A': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
+'rs2402130_G': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs12913832_T': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs2378249_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
+'rs12896399_T': {'G/G': '0', 'GG': '0', 'T/T': '2', 'TT': '2', 'G/T': '1', 'GT': '1', 'T/G': '1', 'TG': '1'},
+'rs1393350_T': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs683_G': {'A/A': '0', 'AA': '0', 'C/C': '2', 'CC': '2', 'C/A': '1', 'CA': '1', 'A/C': '1', 'AC': '1'},
+'rs3114908_T': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
+'rs1800414_C': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
+'rs10756819_G': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
+'rs2238289_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
+'rs17128291_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
+'rs6497292_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'A/G': '1', 'AG': '1', 'G/A': '1', 'GA': '1'},
+'rs1129038_G': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
+'rs1667394_C': {'T/T': '0', 'TT': '0', 'C/C': '2', 'CC': '2', 'T/C': '1', 'TC': '1', 'C/T': '1', 'CT': '1'},
+'rs1126809_A': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs1470608_A': {'G/G': '0', 'GG': '0', 'T/T': '2', 'TT': '2', 'G/T': '1', 'GT': '1', 'T/G': '1', 'TG': '1'},
+'rs1426654_G': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs6119471_C': {'C/C': '0', 'CC': '0', 'G/G': '2', 'GG': '2', 'C/G': '1', 'CG': '1', 'G/C': '1', 'GC': '1'},
+'rs1545397_T': {'A/A': '0', 'AA': '0', 'T/T': '2', 'TT': '2', 'A/T': '1', 'AT': '1', 'T/A': '1', 'TA': '1'},
+'rs6059655_T': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs12441727_A': {'G/G': '0', 'GG': '0', 'A/A': '2', 'AA': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+'rs3212355_A': {'C/C': '0', 'CC': '0', 'T/T': '2', 'TT': '2', 'C/T': '1', 'CT': '1', 'T/C': '1', 'TC': '1'},
+'rs8051733_C': {'A/A': '0', 'AA': '0', 'G/G': '2', 'GG': '2', 'G/A': '1', 'GA': '1', 'A/G': '1', 'AG': '1'},
+}
+NO_CALLS = ['./.', 'C', 'A', 'G', 'T', 'NN', '-', '', None, np.nan]
+
+
+def test_dosages_match_transformations_table():
+    columns = APPEARANCE_HEADER[1:]
+    assert sorted(columns) == sorted(TRANSFORMATIONS)
+    for column in columns:
+        genotypes = list(TRANSFORMATIONS[column])
+        codes = encode_genotypes(genotypes)[:, None]
+        dosages = encode_dosages(codes, [APPEARANCE_ALLELES[column]])[:, 0]
+        assert [str(dosage) for dosage in dosages] == list(TRANSFORMATIONS[column].values()), column
+
+
+def test_unknown_genotypes_are_missing():
+    codes = encode_genotypes(NO_CALLS)
+    assert codes.dtype == np.uint8
+    assert (codes == MISSING_CODE).all()
+    dosages = encode_dosages(np.repeat(codes[:, None], len(APPEARANCE_ALLELES), axis=1), list(APPEARANCE_ALLELES.values()))
+    assert (dosages == NA_DOSAGE).all()
+
+
+def test_genotype_spellings_share_a_code():
+    assert len({normalize_genotype(genotype) for genotype in ['A/G', 'AG', 'GA', 'G/A', 'ga', ' a|g ']}) == 1
+
+
+def test_appearance_input_matches_transformations_table():
+    columns = APPEARANCE_HEADER[1:]
+    samples = ['S1', 'S2', 'S3']
+    rows = []
+    expected = {sample: {} for sample in samples}
+    for i, column in enumerate(columns):
+        marker = column.split('_')[0]
+        genotypes = list(TRANSFORMATIONS[column]) + ['./.']
+        for j, sample in enumerate(samples):
+            # The third sample has no row for every fourth marker
+            if j == 2 and i % 4 == 0:
+                expected[sample][column] = 'NA'
+                continue
+            genotype = genotypes[(i + j * 3) % len(genotypes)]
+            rows.append({'SampleName': sample, 'Target ID': marker, 'Genotype': genotype})
+            expected[sample][column] = TRANSFORMATIONS[column].get(genotype, 'NA')
+    data = pd.DataFrame(rows)
+
+    output = create_appearance_input(data, samples)
+    assert list(output.columns) == APPEARANCE_HEADER
+    assert output['sampleid'].tolist() == samples
+    for row, sample in zip(output.to_dict('records'), samples):
+        assert {column: row[column] for column in columns} == expected[sample]
@@ -0,0 +1,78 @@
+import json
+import pandas as pd
+from business_logic import read_report
+from edit_journal import EditJournal, read_journal, replay, replay_report
+from conftest import RAW_DATA_TEST
+
+
+def first_rows(data, count):
+    return list(zip(data['SampleName'].astype(str), data['Target ID'].astype(str)))[:count]
+
+
+def test_record_and_read(tmp_path):
+    path = str(tmp_path / "edits.jsonl")
+    journal = EditJournal(path, fsync_interval=0, user='tester')
+    journal.record('S1', 'rs1', 'AA', 'AG')
+    journal.record('S1', 'rs2', 'CC', 'NN')
+    journal.close()
+
+    entries = read_journal(path)
+    assert [(e['sample'], e['marker'], e['old'], e['new']) for e in entries] == [
+        ('S1', 'rs1', 'AA', 'AG'),
+        ('S1', 'rs2', 'CC', 'NN'),
+    ]
+    assert {e['user'] for e in entries} == {'tester'}
+
+
+def test_journal_is_appended_to(tmp_path):
+    path = str(tmp_path / "edits.jsonl")
+    for genotype in ['AG', 'GG']:
+        journal = EditJournal(path)
+        journal.record('S1', 'rs1', 'AA', genotype)
+        journal.close()
+    assert [entry['new'] for entry in read_journal(path)] == ['AG', 'GG']
+
+
+def test_records_reach_the_file_before_close(tmp_path):
+    path = tmp_path / "edits.jsonl"
+    journal = EditJournal(str(path), fsync_interval=3600)
+    journal.record('S1', 'rs1', 'AA', 'AG')
+    assert len(path.read_text().splitlines()) == 1
+    journal.sync_pending()
+    assert not journal._unsynced
+    journal.close()
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "edits.jsonl"
+    entry = {'time': '2024-01-01T00:00:00', 'user': 'tester', 'sample': 'S1', 'marker': 'rs1', 'old': 'AA', 'new': 'AG'}
+    path.write_text(json.dumps(entry) + "\n" + json.dumps(entry)[:25])
+    assert read_journal(str(path)) == [entry]
+
+
+def test_replay_applies_latest_edit(tmp_path):
+    data, _ = read_report(RAW_DATA_TEST, columns=None)
+    (s1, m1), (s2, m2) = first_rows(data, 2)
+    path = str(tmp_path / "edits.jsonl")
+    journal = EditJournal(path)
+    journal.record(s1, m1, 'AG', 'GG')
+    journal.record(s2, m2, 'AA', 'A/T')
+    journal.record(s1, m1, 'GG', 'NN')
+    journal.record('no_such_sample', m1, 'AA', 'TT')
+    journal.close()
+
+    edited = replay(data, read_journal(path))
+    assert edited['Genotype'].iloc[:2].tolist() == ['NN', 'A/T']
+    unchanged = edited.index >= 2
+    assert (edited.loc[unchanged, 'Genotype'].astype(str) == data.loc[unchanged, 'Genotype'].astype(str)).all()
+    pd.testing.assert_frame_equal(edited.drop(columns='Genotype'), data.drop(columns='Genotype'))
+    # The loaded run is left as it was
+    assert data['Genotype'].iloc[0] != 'NN'
+
+    rebuilt = replay_report(RAW_DATA_TEST, path)
+    assert rebuilt['Genotype'].astype(str).tolist() == edited['Genotype'].astype(str).tolist()
+
+
+def test_replay_without_entries():
+    data, _ = read_report(RAW_DATA_TEST)
+    pd.testing.assert_frame_equal(replay(data, []), data)
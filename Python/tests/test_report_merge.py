@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+from report_merge import MergedDataset, report_columns
+
+
+def report(rows):
+    """Build a small report from (sample, marker, genotype, coverage, gq) tuples."""
+    data = pd.DataFrame(rows, columns=['SampleName', 'Target ID', 'Genotype', 'Coverage', 'GQ'])
+    data.insert(0, 'BarcodeName', 'IonCode_0101')
+    for column in ['BarcodeName', 'SampleName', 'Target ID', 'Genotype']:
+        data[column] = data[column].astype('category')
+    return data
+
+
+RUN_A = report([
+    ('S2', 'rs1', 'AA', 100, 50),
+    ('S2', 'rs2', 'AG', 100, 50),
+    ('S1', 'rs1', 'CC', 100, 50),
+    ('S1', 'rs2', 'CT', 100, 50),
+])
+RUN_B = report([
+    ('S1', 'rs2', 'TT', 300, 10),
+    ('S2', 'rs1', 'AG', 50, 90),
+    ('S3', 'rs1', 'GG', 10, 10),
+])
+
+
+def pairs(data):
+    return list(zip(data['SampleName'].astype(str), data['Target ID'].astype(str), data['Genotype'].astype(str)))
+
+
+@pytest.mark.parametrize("rule, expected", [
+    ('coverage', [('S2', 'rs1', 'AA'), ('S2', 'rs2', 'AG'), ('S1', 'rs1', 'CC'), ('S1', 'rs2', 'TT'), ('S3', 'rs1', 'GG')]),
+    ('gq', [('S2', 'rs1', 'AG'), ('S2', 'rs2', 'AG'), ('S1', 'rs1', 'CC'), ('S1', 'rs2', 'CT'), ('S3', 'rs1', 'GG')]),
+    ('latest', [('S2', 'rs1', 'AG'), ('S2', 'rs2', 'AG'), ('S1', 'rs1', 'CC'), ('S1', 'rs2', 'TT'), ('S3', 'rs1', 'GG')]),
+])
+def test_dedup_rules_keep_first_seen_order(rule, expected):
+    dataset = MergedDataset(rule)
+    dataset.add_run('A', RUN_A)
+    data = dataset.add_run('B', RUN_B)
+    assert pairs(data) == expected
+    assert len(dataset.all_rows) == len(RUN_A) + len(RUN_B)
+
+
+def test_ties_go_to_the_run_added_last():
+    dataset = MergedDataset('coverage')
+    dataset.add_run('A', report([('S1', 'rs1', 'AA', 100, 50)]))
+    data = dataset.add_run('B', report([('S1', 'rs1', 'AG', 100, 50)]))
+    assert pairs(data) == [('S1', 'rs1', 'AG')]
+    assert data['Run'].tolist() == ['B']
+
+
+@pytest.mark.parametrize("rule", ['coverage', 'gq', 'latest'])
+def test_incremental_merge_matches_full_dedup(rule):
+    runs = {'A': RUN_A, 'B': RUN_B, 'C': report([('S3', 'rs1', 'AA', 500, 1), ('S1', 'rs1', 'CT', 1, 99)])}
+    dataset = MergedDataset(rule)
+    for run, rows in runs.items():
+        data = dataset.add_run(run, rows)
+    full = dataset._deduplicate(dataset.all_rows)
+    pd.testing.assert_frame_equal(data, full)
+
+
+def test_replacing_a_run_keeps_its_place():
+    dataset = MergedDataset('coverage')
+    dataset.add_run('A', RUN_A)
+    dataset.add_run('B', RUN_B)
+    replacement = report([('S1', 'rs2', 'CC', 1, 10), ('S3', 'rs1', 'GT', 10, 10)])
+    data = dataset.add_run('A', replacement)
+
+    # Run A now only covers two pairs; S2 rs1 falls back to run B, S1 rs2 and S3 rs1 are decided again
+    assert pairs(data) == [('S1', 'rs2', 'TT'), ('S3', 'rs1', 'GT'), ('S2', 'rs1', 'AG')]
+    assert dataset.runs() == ['B', 'A']
+    assert len(dataset.all_rows) == len(RUN_B) + len(replacement)
+    pd.testing.assert_frame_equal(data, dataset._deduplicate(dataset.all_rows))
+
+
+def test_report_columns_drops_run():
+    dataset = MergedDataset()
+    data = dataset.add_run('A', RUN_A)
+    assert data.columns[0] == 'Run'
+    assert report_columns(data) == list(RUN_A.columns)
+
+
+def test_name_run_numbers_other_files_with_the_same_name(tmp_path):
+    dataset = MergedDataset()
+    first = tmp_path / "one" / "raw_data.csv"
+    second = tmp_path / "two" / "raw_data.csv"
+    run = dataset.name_run(str(first))
+    dataset.add_run(run, RUN_A)
+    assert run == 'raw_data'
+    assert dataset.name_run(str(second)) == 'raw_data_2'
+    assert dataset.name_run(str(first)) == 'raw_data'
+
+
+def test_unknown_rule():
+    with pytest.raises(Exception, match="Unknown dedup rule"):
+        MergedDataset('quality')
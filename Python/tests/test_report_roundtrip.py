@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+from business_logic import csv_engine, read_report
+from genotype_store import GenotypeStore
+from report_writer import EditOverlay, write_report
+from conftest import RAW_DATA_TEST
+
+ENGINES = [engine for engine in ('pandas', 'arrow') if csv_engine(engine) == engine]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_save_changes_only_edited_genotypes(tmp_path, engine):
+    data, _ = read_report(RAW_DATA_TEST, columns=None, engine=engine)
+    store = GenotypeStore(data)
+    sample = store.samples()[0]
+    markers = data.loc[data['SampleName'] == sample, 'Target ID'].astype(str).tolist()[:3]
+    edits = EditOverlay()
+    for marker, genotype in zip(markers, ['GT', 'NN', 'A/C']):
+        edits.set(sample, marker, genotype)
+    positions, genotypes = edits.row_edits(store)
+
+    path = str(tmp_path / "saved.csv")
+    write_report(data, path, positions, genotypes)
+
+    raw = pd.read_csv(RAW_DATA_TEST, encoding='utf-8-sig')
+    saved = pd.read_csv(path)
+    assert list(saved.columns) == list(raw.columns)
+    assert saved.loc[positions, 'Genotype'].tolist() == list(genotypes)
+    unedited = ~raw.index.isin(positions)
+    pd.testing.assert_frame_equal(saved[unedited], raw[unedited], check_exact=True)
+    pd.testing.assert_frame_equal(saved.drop(columns='Genotype'), raw.drop(columns='Genotype'), check_exact=True)
@@ -0,0 +1,100 @@
+import os
+import pandas as pd
+import pytest
+from business_logic import read_report
+from genotype_store import GenotypeStore
+from report_writer import EditOverlay, write_report
+from conftest import RAW_DATA_TEST
+
+
+@pytest.fixture(scope="module")
+def run():
+    data, _ = read_report(RAW_DATA_TEST, columns=None, engine='pandas')
+    return data
+
+
+@pytest.fixture(scope="module")
+def store(run):
+    return GenotypeStore(run)
+
+
+def sample_markers(store, sample, count):
+    return store.sample_data(sample)['Target ID'].astype(str).tolist()[:count]
+
+
+def test_row_edits_are_sorted_positions(store):
+    sample = store.samples()[0]
+    first, second, third = sample_markers(store, sample, 3)
+    edits = EditOverlay()
+    edits.set(sample, third, 'TT')
+    edits.set(sample, first, 'AA')
+    edits.set(sample, 'rs_not_in_panel', 'GG')
+    edits.set(sample, first, 'AC')  # The later edit of a pair wins
+    edits.set(sample, second, 'NN')
+
+    positions, genotypes = edits.row_edits(store)
+    assert positions.tolist() == sorted(positions.tolist())
+    assert positions.tolist() == [store.position(sample, marker) for marker in (first, second, third)]
+    assert genotypes.tolist() == ['AC', 'NN', 'TT']
+    assert len(edits) == 4
+
+
+def test_overlay_leaves_the_run_alone(run, store):
+    sample = store.samples()[0]
+    marker = sample_markers(store, sample, 1)[0]
+    before = store.get(sample, marker, 'Genotype')
+    edits = EditOverlay()
+    edits.set(sample, marker, 'ZZ')
+    copy = edits.copy()
+    copy.set(sample, marker, 'AA')
+    assert edits.get(sample, marker) == 'ZZ'
+    assert edits.for_sample(sample) == {marker: 'ZZ'}
+    assert store.get(sample, marker, 'Genotype') == before
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".csv.gz"])
+@pytest.mark.parametrize("chunk_rows", [7, 100_000])
+def test_write_merges_edits(tmp_path, run, store, suffix, chunk_rows):
+    sample = store.samples()[0]
+    markers = sample_markers(store, sample, 20)
+    edits = EditOverlay()
+    # Edits on both sides of several chunk boundaries, with a genotype the run has never seen
+    for marker in markers[5:9] + markers[13:15]:
+        edits.set(sample, marker, 'A/T')
+    positions, genotypes = edits.row_edits(store)
+
+    before = run['Genotype'].copy()
+    progress = []
+    path = str(tmp_path / f"saved{suffix}")
+    assert write_report(run, path, positions, genotypes, chunk_rows=chunk_rows, progress=progress.append) == path
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+    assert progress[-1] == 1.0
+
+    saved = pd.read_csv(path)
+    expected = run.astype({'Genotype': object}).copy()
+    expected.iloc[positions, expected.columns.get_loc('Genotype')] = genotypes
+    assert saved['Genotype'].tolist() == expected['Genotype'].tolist()
+    assert saved['SampleName'].tolist() == run['SampleName'].astype(str).tolist()
+    # The run itself is not edited
+    pd.testing.assert_series_equal(run['Genotype'], before)
+
+
+def test_write_selected_columns(tmp_path, run):
+    path = str(tmp_path / "saved.csv")
+    write_report(run.iloc[0:0], path, columns=['SampleName', 'Genotype'])
+    assert list(pd.read_csv(path).columns) == ['SampleName', 'Genotype']
+    write_report(run, path, columns=['SampleName', 'Genotype'])
+    assert len(pd.read_csv(path)) == len(run)
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, run):
+    path = tmp_path / "saved.csv"
+    path.write_text("previous save\n")
+
+    def fail(fraction):
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        write_report(run, str(path), chunk_rows=10, progress=fail)
+    assert path.read_text() == "previous save\n"
+    assert os.listdir(tmp_path) == ["saved.csv"]
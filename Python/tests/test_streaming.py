@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+from business_logic import create_appearance_input, qc_summary, read_report
+from streaming import is_grouped_by_sample, iter_samples, stream_report
+from synthetic_report import write_synthetic_report
+from conftest import RAW_DATA_TEST
+
+
+def in_memory(path):
+    data, _ = read_report(path, engine='pandas')
+    return create_appearance_input(data), qc_summary(data), len(data)
+
+
+def assert_same_results(streamed, expected, sort=False):
+    (appearance, qc, n_rows), (expected_appearance, expected_qc, expected_rows) = streamed, expected
+    if sort:
+        # Spilled samples come out in bucket order
+        appearance = appearance.sort_values('sampleid', ignore_index=True)
+        expected_appearance = expected_appearance.sort_values('sampleid', ignore_index=True)
+        qc = qc.sort_values('SampleName', ignore_index=True)
+        expected_qc = expected_qc.sort_values('SampleName', ignore_index=True)
+    assert n_rows == expected_rows
+    pd.testing.assert_frame_equal(appearance, expected_appearance)
+    qc = qc.astype({'SampleName': object})
+    expected_qc = expected_qc.astype({'SampleName': object})
+    pd.testing.assert_frame_equal(qc, expected_qc)
+
+
+@pytest.fixture(scope="module")
+def synthetic(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("reports") / "synthetic.csv")
+    write_synthetic_report(path, n_samples=40, duplicate_fraction=0.01, seed=3)
+    return path
+
+
+@pytest.fixture(scope="module")
+def shuffled(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("reports") / "shuffled.csv")
+    report = pd.read_csv(RAW_DATA_TEST, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    report.sample(frac=1, random_state=0).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("chunksize", [50, 200_000])
+def test_grouped_report_matches_in_memory(chunksize):
+    assert is_grouped_by_sample(RAW_DATA_TEST, chunksize)
+    assert_same_results(stream_report(RAW_DATA_TEST, chunksize=chunksize), in_memory(RAW_DATA_TEST))
+
+
+def test_synthetic_report_matches_in_memory(synthetic):
+    assert_same_results(stream_report(synthetic, chunksize=997), in_memory(synthetic))
+
+
+def test_scattered_report_matches_in_memory(shuffled, tmp_path):
+    assert not is_grouped_by_sample(shuffled)
+    progress = []
+    streamed = stream_report(shuffled, progress=progress.append, chunksize=100, buckets=2, spill_directory=str(tmp_path))
+    assert_same_results(streamed, in_memory(shuffled), sort=True)
+    assert progress == sorted(progress) and progress[-1] == 1.0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_one_sample_at_a_time():
+    samples = [sample_data['SampleName'].unique().tolist() for sample_data in iter_samples(RAW_DATA_TEST, chunksize=50)]
+    assert samples == [[sample] for sample in pd.read_csv(RAW_DATA_TEST, encoding='utf-8-sig')['SampleName'].unique()]
@@ -1,8 +1,48 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-import pandas as pd
+from genotype_store import GenotypeStore
+from report_cache import ReportCache
+from report_merge import load_reports
+from streaming import stream_report
+from report_writer import write_report
+from ancestry import infer_ancestry
+from appearance import predict_appearance
+from qc_metrics import QCMetrics
+from concordance import run_sample_matrix, sample_concordance
+from perf import span
 
 class LoadDataThread(QThread):
-    data_loaded = pyqtSignal(pd.DataFrame)
+    data_loaded = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, filepaths, dataset):
+        super().__init__()
+        self.filepaths = filepaths
+        self.dataset = dataset  # MergedDataset the reports are added to
+        self.sources = {}  # Report path -> 'cache', or the CSV engine that parsed it
+        self.run_names = {}  # Report path -> name of its run in the dataset
+        self.from_cache = False
+
+    def run(self):
+        try:
+            # Parse the reports side by side; keep every report column so "Save Changes to CSV" writes the full report back
+            cache = ReportCache()
+            with span("load_reports", files=len(self.filepaths)) as s:
+                loaded = load_reports(self.filepaths, lambda filepath: cache.load(filepath, columns=None))
+                s.count(sum(len(data) for data, _ in loaded.values()))
+            with span("merge_runs") as s:
+                for filepath, (data, _) in loaded.items():
+                    self.run_names[filepath] = self.dataset.name_run(filepath)
+                    self.dataset.add_run(self.run_names[filepath], data)
+                s.count(len(self.dataset.data))
+            self.sources = {filepath: source for filepath, (_, source) in loaded.items()}
+            self.from_cache = all(source == 'cache' for source in self.sources.values())
+            self.data_loaded.emit(GenotypeStore(self.dataset.data))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+class StreamReportThread(QThread):
+    progress = pyqtSignal(int)
+    report_streamed = pyqtSignal(object, object, int)
     error_occurred = pyqtSignal(str)
 
     def __init__(self, filepath):
@@ -11,32 +51,98 @@ class LoadDataThread(QThread):
 
     def run(self):
         try:
-            data = pd.read_csv(self.filepath)
-            self.data_loaded.emit(data)
+            with span("stream_report") as s:
+                appearance, qc, n_rows = stream_report(self.filepath, progress=lambda fraction: self.progress.emit(int(fraction * 100)))
+                s.count(n_rows)
+            self.report_streamed.emit(appearance, qc, n_rows)
         except Exception as e:
             self.error_occurred.emit(str(e))
 
-class AnalyzeDataThread(QThread):
-    analysis_completed = pyqtSignal(pd.DataFrame)
+class SaveReportThread(QThread):
+    progress = pyqtSignal(int)
+    report_saved = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, data, sample, genotype_entries):
+    def __init__(self, data, path, positions, genotypes, columns=None):
         super().__init__()
         self.data = data
-        self.sample = sample
-        self.genotype_entries = genotype_entries
+        self.path = path
+        self.positions = positions
+        self.genotypes = genotypes
+        self.columns = columns  # Columns to write; None writes them all
+
+    def run(self):
+        try:
+            with span("write_report", rows=len(self.data), edited=len(self.positions)):
+                write_report(self.data, self.path, self.positions, self.genotypes, columns=self.columns,
+                             progress=lambda fraction: self.progress.emit(int(fraction * 100)))
+            self.report_saved.emit(self.path)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+class InferAncestryThread(QThread):
+    ancestry_inferred = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, store, reference, edits):
+        super().__init__()
+        self.store = store
+        self.reference = reference
+        self.edits = edits
+
+    def run(self):
+        try:
+            # Every sample of the run in one batch
+            with span("infer_ancestry", rows=len(self.store.data)):
+                result = infer_ancestry(self.store.data, self.reference, self.store.samples(), self.edits, self.store.genotype_codes)
+            self.ancestry_inferred.emit(result)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+class PredictAppearanceThread(QThread):
+    appearance_predicted = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, store, model, edits):
+        super().__init__()
+        self.store = store
+        self.model = model
+        self.edits = edits
 
     def run(self):
         try:
-            for marker, entry in self.genotype_entries.items():
-                self.data.loc[self.data['Target ID'] == marker, 'Genotype'] = entry.text()
-
-            markers = self.genotype_entries.keys()
-            sample_filtered = self.data[
-                (self.data['Target ID'].isin(markers)) &
-                (self.data['SampleName'] == self.sample)
-            ]
-            result = sample_filtered[['Target ID', 'Genotype', 'Maj Allele Freq']]
-            self.analysis_completed.emit(result)
+            with span("predict_appearance", rows=len(self.store.data)):
+                result = predict_appearance(self.store.data, self.model, self.store.samples(), self.edits, self.store.genotype_codes)
+            self.appearance_predicted.emit(result)
         except Exception as e:
-            self.error_occurred.emit(str(e))
\ No newline at end of file
+            self.error_occurred.emit(str(e))
+
+class ComputeQCThread(QThread):
+    qc_computed = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def run(self):
+        try:
+            self.qc_computed.emit(QCMetrics(self.store))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+class ConcordanceThread(QThread):
+    concordance_computed = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, all_rows):
+        super().__init__()
+        self.all_rows = all_rows  # Every row of every loaded run
+
+    def run(self):
+        try:
+            # Each sample of each run is compared, so a sample sequenced twice is also compared with itself
+            matrix, names, runs = run_sample_matrix(self.all_rows)
+            self.concordance_computed.emit(sample_concordance(matrix, names, runs))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
@@ -0,0 +1,244 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import DATA_DIRECTORY, DATA_DIRECTORY_INPUT, WATCH_INTERVAL, WATCH_QUEUE_SIZE, WATCH_WORKERS
+from batch import process_report
+from report_cache import file_hash
+
+MANIFEST_NAME = ".ingest_manifest.json"
+
+
+class ReportWatcher:
+    """Ingest new or changed run reports from a directory into derived outputs.
+
+    The directory is polled. A report is queued once its size and mtime held still for one poll
+    and its content hash differs from the manifest. The manifest is written next to the outputs,
+    so unchanged reports are never processed twice, also across restarts. Reports go through a
+    bounded queue to a fixed number of worker processes; when the queue is full the scan waits.
+    """
+
+    def __init__(self, directory=DATA_DIRECTORY, output_directory=DATA_DIRECTORY_INPUT, interval=WATCH_INTERVAL,
+                 workers=WATCH_WORKERS, queue_size=WATCH_QUEUE_SIZE, reference_path=None, model_path=None, log=print):
+        self.directory = directory
+        self.output_directory = output_directory
+        self.interval = interval
+        self.workers = workers
+        self.reference_path = reference_path
+        self.model_path = model_path
+        self.log = log
+        self.manifest_path = os.path.join(output_directory, MANIFEST_NAME)
+        self.manifest = self._read_manifest()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._queued = set()  # Paths waiting in or taken from the queue, not yet recorded
+        self._settling = {}  # path -> (size, mtime_ns) seen on the previous poll
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._executor = None
+        self._stopping = None  # Thread winding down the previous start()
+
+    def _new_executor(self):
+        # Spawned rather than forked: forking a process that runs Qt and worker threads is unsafe
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self):
+        """Start polling and the workers in the background."""
+        os.makedirs(self.output_directory, exist_ok=True)
+        self.join()
+        self._stop.clear()
+        self._executor = self._new_executor()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._poll, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        self.log(f"Watching {self.directory} every {self.interval:g} s.")
+
+    def stop(self, wait=False):
+        """Stop polling, let the workers finish the report they are on and drop what is still queued.
+
+        Returns at once and winds down in a background thread, so it can be called from the GUI
+        thread; wait=True blocks until the workers are done.
+        """
+        self._stop.set()
+        threads, executor = self._threads, self._executor
+        self._threads, self._executor = [], None
+        self._stopping = threading.Thread(target=self._wind_down, args=(threads, executor), daemon=True)
+        self._stopping.start()
+        if wait:
+            self.join()
+
+    def join(self):
+        """Wait until a stop has wound down: the workers finished their reports and the pool exited."""
+        if self._stopping is not None:
+            self._stopping.join()
+            self._stopping = None
+
+    def _wind_down(self, threads, executor):
+        for thread in threads:
+            thread.join()
+        # Dropped reports are not in the manifest, so the next scan queues them again
+        dropped = self._drain()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.log(f"Stopped watching; {dropped} queued report(s) left for the next scan." if dropped else "Stopped watching.")
+
+    def _drain(self):
+        """Empty the queue once no thread takes from it; returns the number of reports dropped."""
+        dropped = 0
+        while True:
+            try:
+                path, _, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._queued.discard(path)
+            self._queue.task_done()
+            dropped += 1
+        return dropped
+
+    def run_once(self):
+        """Ingest every new or changed report once and return when all are processed."""
+        os.makedirs(self.output_directory, exist_ok=True)
+        with self._new_executor() as self._executor:
+            workers = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+            for thread in workers:
+                thread.start()
+            self.scan(settle=False)
+            self._queue.join()
+            self._stop.set()
+            for thread in workers:
+                thread.join()
+        self._executor = None
+        self._stop.clear()
+
+    def scan(self, settle=True):
+        """Queue the reports that are new or changed since they were last ingested."""
+        seen = set()
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.csv"))):
+            path = os.path.abspath(path)
+            seen.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            entry = self.manifest.get(path)
+            with self._lock:
+                if path in self._queued:
+                    continue
+            if entry is not None and (entry['size'], entry['mtime_ns']) == signature:
+                continue
+
+            # A report still being copied keeps changing; wait until it holds still for one poll
+            if settle and self._settling.get(path) != signature:
+                self._settling[path] = signature
+                continue
+            self._settling.pop(path, None)
+
+            digest = file_hash(path)
+            if entry is not None and entry['hash'] == digest:
+                # Touched but not changed
+                self._record(path, signature, digest, entry.get('error'))
+                continue
+            with self._lock:
+                self._queued.add(path)
+            if not self._put((path, signature, digest)):
+                with self._lock:
+                    self._queued.discard(path)
+                return
+        self._settling = {path: signature for path, signature in self._settling.items() if path in seen}
+
+    def _put(self, item):
+        # Blocks while the queue is full, which throttles a burst of new reports
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _poll(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                self.log(f"Error: scanning {self.directory}: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                path, signature, digest = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                future = self._executor.submit(process_report, path, self.output_directory, self.reference_path, self.model_path)
+                _, n_samples, n_rows, seconds = future.result()
+                self._record(path, signature, digest)
+                self.log(f"Ingested {os.path.basename(path)}: {n_samples} samples, {n_rows} rows in {seconds:.2f} s.")
+            except Exception as e:
+                # Recorded with the error, so an unchanged broken report is not retried on every poll
+                self._record(path, signature, digest, str(e))
+                self.log(f"Error: {os.path.basename(path)}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._queued.discard(path)
+                self._queue.task_done()
+
+    def _record(self, path, signature, digest, error=None):
+        with self._lock:
+            self.manifest[path] = {
+                'size': signature[0],
+                'mtime_ns': signature[1],
+                'hash': digest,
+                'ingested': time.time(),
+                'error': error,
+            }
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.manifest, f, indent=1)
+            os.replace(tmp_path, self.manifest_path)
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest new and changed run reports from a directory as they arrive.")
+    parser.add_argument("directory", nargs="?", default=DATA_DIRECTORY, help="directory to watch for run report CSV files")
+    parser.add_argument("--output", default=DATA_DIRECTORY_INPUT, help="directory for the derived files and the manifest")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="seconds between polls")
+    parser.add_argument("--workers", type=int, default=WATCH_WORKERS, help="number of worker processes")
+    parser.add_argument("--queue-size", type=int, default=WATCH_QUEUE_SIZE, help="reports waiting at most before the scan pauses")
+    parser.add_argument("--ancestry-reference", default=None, help="reference allele frequency table; also write ancestry posteriors")
+    parser.add_argument("--appearance-model", default=None, help="appearance model coefficients; also write trait predictions")
+    parser.add_argument("--once", action="store_true", help="ingest what is there now and exit")
+    args = parser.parse_args()
+
+    watcher = ReportWatcher(args.directory, args.output, args.interval, args.workers, args.queue_size,
+                            args.ancestry_reference, args.appearance_model)
+    if args.once:
+        watcher.run_once()
+        return
+    watcher.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop(wait=True)
+
+
+if __name__ == "__main__":
+    main()